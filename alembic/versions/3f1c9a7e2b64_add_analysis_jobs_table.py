@@ -0,0 +1,56 @@
+"""add analysis_jobs table
+
+Revision ID: 3f1c9a7e2b64
+Revises: a88a8a4d6b36
+Create Date: 2025-06-02 12:10:41.512331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7e2b64'
+down_revision: Union[str, None] = 'a88a8a4d6b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('resume_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('completed_steps', sa.JSON(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_kind'), 'analysis_jobs', ['kind'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_status'), 'analysis_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_resume_id'), 'analysis_jobs', ['resume_id'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_run_after'), 'analysis_jobs', ['run_after'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_lease_expires_at'), 'analysis_jobs', ['lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analysis_jobs_lease_expires_at'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_run_after'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_resume_id'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_status'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_kind'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,44 @@
+"""add llm_cache table
+
+Revision ID: 5d8f3b1e7c20
+Revises: 9b5e0d2c4a17
+Create Date: 2025-06-09 11:03:26.904118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f3b1e7c20'
+down_revision: Union[str, None] = '9b5e0d2c4a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('task', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_llm_cache_task'), 'llm_cache', ['task'], unique=False)
+    op.create_index(op.f('ix_llm_cache_last_hit_at'), 'llm_cache', ['last_hit_at'], unique=False)
+    op.create_index(op.f('ix_llm_cache_expires_at'), 'llm_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_llm_cache_expires_at'), table_name='llm_cache')
+    op.drop_index(op.f('ix_llm_cache_last_hit_at'), table_name='llm_cache')
+    op.drop_index(op.f('ix_llm_cache_task'), table_name='llm_cache')
+    op.drop_table('llm_cache')
@@ -0,0 +1,32 @@
+"""add content hash to resumes
+
+Revision ID: 9b5e0d2c4a17
+Revises: c72e4d1a9f03
+Create Date: 2025-06-05 14:18:52.630417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b5e0d2c4a17'
+down_revision: Union[str, None] = 'c72e4d1a9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('resumes', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('resumes', sa.Column('scoring_fingerprint', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_resumes_content_sha256'), 'resumes', ['content_sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resumes_content_sha256'), table_name='resumes')
+    op.drop_column('resumes', 'scoring_fingerprint')
+    op.drop_column('resumes', 'content_sha256')
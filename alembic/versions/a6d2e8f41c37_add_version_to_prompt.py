@@ -0,0 +1,64 @@
+"""add version to prompt
+
+Revision ID: a6d2e8f41c37
+Revises: e41a7c9d2f58
+Create Date: 2025-06-11 10:14:02.512771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2e8f41c37'
+down_revision: Union[str, None] = 'e41a7c9d2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('prompt'):
+        op.create_table('prompt',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('profession_title', sa.String(), nullable=False),
+        sa.Column('prompt_for_cv', sa.Text(), nullable=True),
+        sa.Column('prompt_for_media', sa.Text(), nullable=True),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_prompt_id'), 'prompt', ['id'], unique=False)
+        op.create_index(op.f('ix_prompt_profession_title'), 'prompt', ['profession_title'], unique=True)
+        return
+
+    # Одна строка на профессию. Дубликаты не удаляем молча — какой промпт верный, решает человек
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT profession_title, count(*) FROM prompt GROUP BY profession_title HAVING count(*) > 1"
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"{title} ({count} rows)" for title, count in duplicates)
+        raise RuntimeError(
+            f"prompt has several rows for the same profession: {listed}. "
+            "Keep one row per profession_title and run the migration again."
+        )
+
+    # Таблица создана create_all по старой модели: индексы по тексту промптов не влезают в btree
+    op.execute("DROP INDEX IF EXISTS ix_prompt_prompt_for_cv")
+    op.execute("DROP INDEX IF EXISTS ix_prompt_prompt_for_media")
+    op.alter_column('prompt', 'prompt_for_cv', type_=sa.Text(), nullable=True)
+    op.alter_column('prompt', 'prompt_for_media', type_=sa.Text(), nullable=True)
+    op.add_column('prompt', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('prompt', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("DROP INDEX IF EXISTS ix_prompt_profession_title")
+    op.create_index(op.f('ix_prompt_profession_title'), 'prompt', ['profession_title'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prompt_profession_title'), table_name='prompt')
+    op.create_index(op.f('ix_prompt_profession_title'), 'prompt', ['profession_title'], unique=False)
+    op.drop_column('prompt', 'updated_at')
+    op.drop_column('prompt', 'version')
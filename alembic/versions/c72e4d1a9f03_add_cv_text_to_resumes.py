@@ -0,0 +1,28 @@
+"""add cv_text to resumes
+
+Revision ID: c72e4d1a9f03
+Revises: 3f1c9a7e2b64
+Create Date: 2025-06-03 10:42:17.208614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c72e4d1a9f03'
+down_revision: Union[str, None] = '3f1c9a7e2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('resumes', sa.Column('cv_text', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('resumes', 'cv_text')
@@ -0,0 +1,30 @@
+"""add profession to job_postings
+
+Revision ID: e41a7c9d2f58
+Revises: 5d8f3b1e7c20
+Create Date: 2025-06-10 16:27:45.118392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41a7c9d2f58'
+down_revision: Union[str, None] = '5d8f3b1e7c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_postings', sa.Column('profession', sa.String(length=50), nullable=True))
+    # analyze_proffesion сейчас возвращает только "salesman" — backfill совпадает с тем, что дал бы классификатор
+    op.execute("UPDATE job_postings SET profession = 'salesman' WHERE profession IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job_postings', 'profession')
@@ -3,24 +3,22 @@ import os
 from google import genai
 from google.genai import types
 import json
+from dataclasses import replace
 from app.schemas.vacancy_schema import SkillSchema
 from typing import List # Используем TypedDict для SkillSchema, если не импортирована
-import openai
+from app.ai.gateway import llm_gateway
+from app.ai.hedging import request_hedger
+from app.ai.hard_skill_scorer import HARD_SKILL_RULES_ENABLED, score_hard_skills
+from app.schemas.resume_schema import ResumeCreate
+from app.ai.llm_cache import llm_cache
+from app.services.text_compaction import truncate_for_prompt
+from app.ai.task_configs import TaskConfig, build_task_config, register_task
+from app.ai.prompt_registry import prompt_registry
 # from sentence_transformers import SentenceTransformer, util
 
 # model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
 
 load_dotenv()
-client_GPT = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# --- Клиент GenAI ---
-try:
-    client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-    if not client:
-         raise ValueError("Failed to initialize genai.Client.")
-except Exception as e:
-    print(f"Ошибка инициализации genai.Client: {e}")
-    exit()
 
 
 # def match_profession_semantic(vacancy_title: str, professions: list[str]) -> str:
@@ -30,9 +28,26 @@ except Exception as e:
 #     return professions[best_index]
 
 
+ANALYZE_RESUME_MODEL = "gemini-2.5-flash-preview-04-17"
+
+
+def _json_object(text: str):
+    # В кэш попадают только ответы, которые разбираются в JSON-объект
+    if not isinstance(json.loads(text), dict):
+        raise ValueError("AI response is not a JSON object")
+
+
+def _skill_titles(skills) -> list[str]:
+    return [skill['title'] if isinstance(skill, dict) else skill.title for skill in skills]
+
+
+def _skills_list_str(skills) -> str:
+    # Все навыки вакансии уже оценены правилами (hard_skill_scorer) — модели остаётся только извлечение
+    return ", ".join(_skill_titles(skills)) or "None (already scored, return an empty skills array)"
+
+
 async def analyze_resume_chatgpt(user_prompt: str, skills: List[SkillSchema], requirements: str):
-    required_skill_titles = [skill['title'] if isinstance(skill, dict) else skill.title for skill in skills]
-    skills_list_str = ", ".join(required_skill_titles)
+    skills_list_str = _skills_list_str(skills)
 
     system_prompt = """BE ONE OF THE MOST STRICT RESUME ANALYZER IN THE WORLD ,You are an expert resume analyzer comparing a candidate against a specific job vacancy. Your tasks are:
 
@@ -95,7 +110,7 @@ Don't include any explanation or intro text. Just return the JSON.
 
     user_input = f"""
 Resume Text:
-{user_prompt}
+{truncate_for_prompt(user_prompt)}
 
 Required Skills for Evaluation:
 {skills_list_str}
@@ -105,14 +120,15 @@ General Job Requirements:
 """
 
     try:
-        response = await client_GPT.chat.completions.create(
+        response = await llm_gateway.chat_completion(
             model="gpt-4o",  # можно и gpt-3.5-turbo, если бюджет важен
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_input},
             ],
             temperature=0.3,
-            response_format={ "type": "json_object" }
+            response_format={ "type": "json_object" },
+            site="analyze_resume",
         )
         raw_json = response.choices[0].message.content
         return json.loads(raw_json)
@@ -120,48 +136,7 @@ General Job Requirements:
     except Exception as e:
         raise ValueError(f"ChatGPT API error: {type(e).__name__}: {e}")
 
-async def analyze_resume(user_prompt: str, skills: List[SkillSchema], requirements: str):
-    """
-    Анализирует резюме по заданным навыкам и требованиям, возвращая структурированный JSON,
-    используя асинхронный client.aio.models.generate_content.
-
-    Args:
-        user_prompt: Текст резюме.
-        skills: Список объектов SkillSchema (должен содержать как минимум 'title').
-        requirements: Строка с общими требованиями вакансии.
-
-    Returns:
-        Словарь с данными из резюме и оценками.
-
-    Raises:
-        ValueError: Если ответ ИИ не может быть декодирован как JSON или произошла ошибка API.
-    """
-    # Вы можете выбрать модель 'gemini-1.5-pro-latest' для лучших результатов, если Flash не справляется
-    model_name = "gemini-2.5-flash-preview-04-17" # Используем flash
-
-    # 1. Подготовка входных данных для ИИ
-    required_skill_titles = [skill['title'] if isinstance(skill, dict) else skill.title for skill in skills]
-    skills_list_str = ", ".join(required_skill_titles)
-    combined_prompt = f"""
-Resume Text:
----
-{user_prompt}
----
-
-Required Skills for Evaluation :
----
-{skills_list_str}
----
-
-General Job Requirements (consider for context, but NOT directly for 'hard_total' score calculation):
----
-{requirements}
----
-
-Instruction: Analyze the 'Resume Text' based *only* on the 'Required Skills for Evaluation' list and the 'General Job Requirements'. Extract information and evaluate suitability strictly according to the provided JSON schema and scoring rules defined in the system instructions. Output a single JSON object.
-"""
-
-    system_instruction_text = f"""You are an extremely strict resume analyzer. You must compare a candidate’s resume to a vacancy using only the indicators below. Each parameter must be scored based on the following rule: 
+ANALYZE_RESUME_INSTRUCTION = """You are an extremely strict resume analyzer. You must compare a candidate’s resume to a vacancy using only the indicators below. Each parameter must be scored based on the following rule: 
 - If a required indicator is present in the resume and matches the vacancy requirement exactly → score 100. 
 - If a related indicator is present in the resume but differs from the vacancy requirement → score 50. 
 - If no relevant indicator is found in the resume → score 0. 
@@ -269,30 +244,31 @@ Evaluate only the following indicators grouped by category:
 
 4. Return result in strict JSON format:
 
-{{
+{
   "fullname": "",
   "location": "",
   "experience": "",
   "education": "",
   "skills": [
-    {{
+    {
       "skill": "",
       "type": "HARD",
       "level": 0,
       "justification": ""
-    }}
+    }
   ],
   "hard_total": 0,
   "justification": ""
-}}
+}
 
 Important rules:
 - No assumptions — only explicit content in the resume counts.
 - Skip any indicator not listed in the job requirements when calculating hard_total.
 - Do not explain outside of the JSON output.
 - All output must be in Russian.
-"""    # 2. Обновленная системная инструкция
-#     system_instruction_text = f"""BE ONE OF THE MOST STRICT RESUME ANALYZER IN THE WORLD ,You are an expert resume analyzer comparing a candidate against a specific job vacancy. Your tasks are:
+"""
+# Прежний вариант инструкции:
+# ANALYZE_RESUME_INSTRUCTION = """BE ONE OF THE MOST STRICT RESUME ANALYZER IN THE WORLD ,You are an expert resume analyzer comparing a candidate against a specific job vacancy. Your tasks are:
 
 # 0. **Determine Expected Level (Seniority) from Job Requirements**
 #    - Carefully read the 'General Job Requirements' to identify the expected position level (e.g., "Junior", "Middle", "Senior", "Lead").
@@ -343,14 +319,8 @@ Important rules:
 #    - Do **not** include any extra explanations — return only the JSON.
 # """
 
-    # 3. Конфигурация запроса к ИИ
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=combined_prompt)],
-        ),
-    ]
 
+def _build_analyze_resume_task(instruction: str = ANALYZE_RESUME_INSTRUCTION) -> TaskConfig:
     # Определяем схему ответа (с обновленным hard_total)
     response_schema = types.Schema(
         type=types.Type.OBJECT,
@@ -412,38 +382,91 @@ Important rules:
             ),
         },
     )
-
-    generate_content_config = types.GenerateContentConfig(
+    return build_task_config(
+        ANALYZE_RESUME_MODEL,
         temperature=0.1,
-        response_mime_type="application/json",
+        system_instruction=instruction,
         response_schema=response_schema,
-        system_instruction=[
-            types.Part.from_text(text=system_instruction_text)
-        ]
     )
 
+
+# Схема, инструкция и GenerateContentConfig собираются один раз при импорте
+ANALYZE_RESUME_TASK = register_task("analyze_resume", _build_analyze_resume_task)
+# prompt_for_cv из таблицы prompt: задача собирается при загрузке реестра, а не на вызов
+prompt_registry.register_builder(
+    "cv", lambda profession, instruction: replace(_build_analyze_resume_task(instruction), name="analyze_resume"),
+)
+
+
+def resume_analysis_task(profession: str | None) -> TaskConfig:
+    """Задача analyze_resume, которой сейчас оценивается резюме на вакансию этой профессии."""
+    return prompt_registry.task("cv", profession) or ANALYZE_RESUME_TASK
+
+
+async def analyze_resume(user_prompt: str, skills: List[SkillSchema], requirements: str,
+                         profession: str | None = None):
+    """
+    Анализирует резюме по заданным навыкам и требованиям, возвращая структурированный JSON,
+    используя асинхронный вызов Gemini через llm_gateway.
+
+    Args:
+        user_prompt: Текст резюме.
+        skills: Список объектов SkillSchema (должен содержать как минимум 'title').
+        requirements: Строка с общими требованиями вакансии.
+        profession: Профессия вакансии; её prompt_for_cv из таблицы prompt заменяет встроенную инструкцию.
+
+    Returns:
+        Словарь с данными из резюме и оценками.
+
+    Raises:
+        ValueError: Если ответ ИИ не может быть декодирован как JSON или произошла ошибка API.
+    """
+    # Вы можете выбрать модель 'gemini-1.5-pro-latest' для лучших результатов, если Flash не справляется
+    model_name = ANALYZE_RESUME_MODEL # Используем flash
+    task = resume_analysis_task(profession)
+
+    # 1. Подготовка входных данных для ИИ
+    skills_list_str = _skills_list_str(skills)
+    combined_prompt = f"""
+Resume Text:
+---
+{truncate_for_prompt(user_prompt)}
+---
+
+Required Skills for Evaluation :
+---
+{skills_list_str}
+---
+
+General Job Requirements (consider for context, but NOT directly for 'hard_total' score calculation):
+---
+{requirements}
+---
+
+Instruction: Analyze the 'Resume Text' based *only* on the 'Required Skills for Evaluation' list and the 'General Job Requirements'. Extract information and evaluate suitability strictly according to the provided JSON schema and scoring rules defined in the system instructions. Output a single JSON object.
+"""
+
     # 4. Асинхронный вызов ИИ
-    try:
-        # !!! Используем await и client.aio !!!
-        response = await client.aio.models.generate_content(
-             # Убираем 'models/' префикс для aio вызова, как в вашем коде
-            model=f'{model_name}',
-            contents=contents,
-            config=generate_content_config,
-        )
+    async def _generate() -> str:
+        response = await task.generate(combined_prompt)
 
         # Анализ ответа
         if hasattr(response, 'text') and response.text:
-             json_text = response.text
-        else:
-             try:
-                  json_text = response.candidates[0].content.parts[0].text
-             except (AttributeError, IndexError, TypeError) as e:
-                  print(f"Error accessing response parts via candidates structure. Response: {response}. Error: {e}")
-                  raise ValueError("Could not extract text from AI response using known methods.")
-
+             return response.text
+        try:
+             return response.candidates[0].content.parts[0].text
+        except (AttributeError, IndexError, TypeError) as e:
+             print(f"Error accessing response parts via candidates structure. Response: {response}. Error: {e}")
+             raise ValueError("Could not extract text from AI response using known methods.")
+
+    # Повторная оценка того же резюме по неизменной вакансии не идёт в Gemini
+    cache_key = task.cache_key(combined_prompt)
+    try:
+        json_text = await llm_cache.get_or_generate(
+            "analyze_resume", cache_key, model_name, _generate, validate=_json_object,
+        )
     except Exception as e:
-        print(f"Error during Gemini API call with client.aio.models.generate_content: {type(e).__name__}: {e}")
+        print(f"Error during Gemini API call: {type(e).__name__}: {e}")
         raise ValueError(f"Error during AI generation: {e}")
 
     # 5. Парсинг ответа
@@ -459,4 +482,29 @@ Important rules:
         print(f"Unexpected error during JSON parsing: {e}")
         raise ValueError(f"Unexpected error parsing JSON: {e}")
 
-    return parsed_json
\ No newline at end of file
+    return parsed_json
+
+
+def _resume_conforms(parsed: dict):
+    # Побеждает только ответ, из которого собирается ResumeCreate
+    ResumeCreate(**parsed)
+
+
+async def analyze_resume_hedged(user_prompt: str, skills: List[SkillSchema], requirements: str,
+                                profession: str | None = None):
+    """
+    analyze_resume (Gemini) с подстраховкой: если ответа нет дольше перцентиля задержки
+    Gemini или он упал, тот же запрос уходит в analyze_resume_chatgpt. Политика — HEDGE_POLICIES["analyze_resume"].
+    Навыки из рубрики оцениваются правилами (hard_skill_scorer), hard_total считается там же.
+    """
+    local = score_hard_skills(user_prompt, _skill_titles(skills), requirements) if HARD_SKILL_RULES_ENABLED else None
+    if local is not None:
+        # В модель уходят только навыки, которые правила не смогли оценить уверенно
+        skills = [{"title": title} for title in local.unresolved_titles()]
+    parsed = await request_hedger.run(
+        "analyze_resume",
+        lambda: analyze_resume(user_prompt, skills, requirements, profession),
+        lambda: analyze_resume_chatgpt(user_prompt, skills, requirements),
+        validate=_resume_conforms,
+    )
+    return local.merge(parsed) if local is not None else parsed
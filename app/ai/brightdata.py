@@ -0,0 +1,219 @@
+"""
+BrightData dataset scraping of candidates' social-media profiles.
+
+One pooled httpx.AsyncClient serves the whole process. It is created in
+the lifespan (or lazily by the worker) and closed on shutdown. For each
+resume all platform snapshots are triggered concurrently. A single loop
+then polls the progress of every pending snapshot. The loop waits between
+rounds with capped exponential backoff: BRIGHTDATA_POLL_INITIAL, doubled
+up to BRIGHTDATA_POLL_MAX. A snapshot's data is fetched as soon as it
+reports ready, without waiting for the others.
+
+A failed snapshot is re-triggered up to BRIGHTDATA_MAX_ATTEMPTS times.
+Every snapshot still pending after BRIGHTDATA_DEADLINE_SECONDS is reported
+as timed out, so a stuck snapshot can no longer hold an analysis job
+forever.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import httpx
+
+from app.ai.replay import replay_harness
+
+logger = logging.getLogger(__name__)
+
+BRIGHTDATA_API_KEY = os.getenv("BRIGHTDATA_API_KEY")
+BRIGHTDATA_S3_BUCKET = os.getenv("BRIGHTDATA_S3_BUCKET", "start_up")
+BRIGHTDATA_BASE_URL = os.getenv("BRIGHTDATA_BASE_URL", "https://api.brightdata.com/datasets/v3")
+BRIGHTDATA_MAX_CONNECTIONS = int(os.getenv("BRIGHTDATA_MAX_CONNECTIONS", "20"))
+BRIGHTDATA_TIMEOUT = float(os.getenv("BRIGHTDATA_TIMEOUT", "30"))
+BRIGHTDATA_POLL_INITIAL = float(os.getenv("BRIGHTDATA_POLL_INITIAL", "1"))
+BRIGHTDATA_POLL_MAX = float(os.getenv("BRIGHTDATA_POLL_MAX", "15"))
+BRIGHTDATA_DEADLINE_SECONDS = float(os.getenv("BRIGHTDATA_DEADLINE_SECONDS", "300"))
+BRIGHTDATA_MAX_ATTEMPTS = int(os.getenv("BRIGHTDATA_MAX_ATTEMPTS", "3"))
+
+DATASET_IDS = {
+    "instagram": "gd_l1vikfch901nx3by4",
+    "linkedin": "gd_l1viktl72bvl7bjuj0",
+    "facebook": "gd_lkaxegm826bjpoo9m5",
+    "x": "gd_lwxmeb2u1cniijd7t4",
+}
+
+
+@dataclass
+class _Snapshot:
+    platform: str
+    link: str
+    attempt: int
+    snapshot_id: str | None = None
+
+
+def _summary(platform: str, data) -> str:
+    if not data:
+        return f"{platform}: Empty result."
+    # По 3 элемента из каждого списка (посты, комментарии) — остальное модели не нужно
+    cleaned_data = {
+        key: (value[:3] if isinstance(value, list) and value else value)
+        for key, value in data[0].items()
+    }
+    return f"\"{platform}\": " + json.dumps(cleaned_data, ensure_ascii=False, indent=4) + "\n"
+
+
+class BrightDataClient:
+    def __init__(self, api_key: str | None = BRIGHTDATA_API_KEY, bucket_name: str = BRIGHTDATA_S3_BUCKET,
+                 deadline: float = BRIGHTDATA_DEADLINE_SECONDS, max_attempts: int = BRIGHTDATA_MAX_ATTEMPTS):
+        self.api_key = api_key
+        self.bucket_name = bucket_name
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self._client: httpx.AsyncClient | None = None
+        self.stats = {"triggered": 0, "polls": 0, "ready": 0, "failed": 0, "timed_out": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if not self.api_key:
+                logger.warning("BRIGHTDATA_API_KEY is not set, social-media scraping requests will be rejected")
+            self._client = httpx.AsyncClient(
+                base_url=BRIGHTDATA_BASE_URL,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=BRIGHTDATA_TIMEOUT,
+                limits=httpx.Limits(max_connections=BRIGHTDATA_MAX_CONNECTIONS,
+                                    max_keepalive_connections=BRIGHTDATA_MAX_CONNECTIONS),
+                transport=replay_harness.http_transport("brightdata"),
+            )
+        return self._client
+
+    async def start(self):
+        self.client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def snapshot(self) -> dict:
+        return dict(self.stats)
+
+    async def _trigger(self, snapshot: _Snapshot):
+        payload = {
+            "deliver": {
+                "type": "s3",
+                "filename": {"template": f"{snapshot.platform}_{{[snapshot_id]}}", "extension": "json"},
+                "bucket": self.bucket_name,
+                "directory": "",
+            },
+            "input": [{"url": snapshot.link}],
+        }
+        response = await self.client.post(
+            "/trigger", params={"dataset_id": DATASET_IDS[snapshot.platform], "include_errors": "true"}, json=payload,
+        )
+        response.raise_for_status()
+        snapshot.snapshot_id = response.json().get("snapshot_id")
+        if not snapshot.snapshot_id:
+            raise ValueError("Missing snapshot_id in trigger response")
+        self.stats["triggered"] += 1
+
+    async def _progress(self, snapshot: _Snapshot) -> str:
+        response = await self.client.get(f"/progress/{snapshot.snapshot_id}")
+        response.raise_for_status()
+        return response.json().get("status", "unknown")
+
+    async def _fetch(self, snapshot: _Snapshot) -> str:
+        response = await self.client.get(
+            f"/snapshot/{snapshot.snapshot_id}", params={"format": "json", "batch_size": 1500},
+        )
+        response.raise_for_status()
+        self.stats["ready"] += 1
+        logger.info(f"✅ BrightData {snapshot.platform} snapshot {snapshot.snapshot_id} ready")
+        return _summary(snapshot.platform, response.json())
+
+    async def scrape(self, links: dict[str, str]) -> dict[str, str]:
+        """
+        platform -> ссылка; возвращает platform -> текст профиля или строку с причиной,
+        по которой его нет (как раньше process_platform).
+        """
+        results: dict[str, str] = {}
+        expires = time.monotonic() + self.deadline
+        pending: list[_Snapshot] = []
+        for platform, link in links.items():
+            if platform not in DATASET_IDS:
+                results[platform] = f"  -> Warning: No dataset_id configured for platform '{platform}'. Skipping.\n"
+            else:
+                pending.append(_Snapshot(platform, link, attempt=1))
+
+        async def trigger(snapshot: _Snapshot) -> _Snapshot | None:
+            """Trigger с повторами; None — платформа уже получила итог в results."""
+            while True:
+                try:
+                    await self._trigger(snapshot)
+                    return snapshot
+                except Exception as e:
+                    logger.warning(f"BrightData trigger for {snapshot.platform} failed "
+                                   f"(attempt {snapshot.attempt}): {type(e).__name__}: {e}")
+                    if snapshot.attempt >= self.max_attempts or time.monotonic() >= expires:
+                        self.stats["failed"] += 1
+                        results[snapshot.platform] = (f"{snapshot.platform}: Failed after {snapshot.attempt} "
+                                                      f"attempts. Last error: {e}")
+                        return None
+                    snapshot.attempt += 1
+                    await asyncio.sleep(min(BRIGHTDATA_POLL_MAX, BRIGHTDATA_POLL_INITIAL * 2 ** snapshot.attempt))
+
+        async def check(snapshot: _Snapshot) -> _Snapshot | None:
+            """Один опрос; снимок возвращается, если его надо опрашивать дальше."""
+            try:
+                status = await self._progress(snapshot)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500 and e.response.status_code != 429:
+                    status = "failed"
+                else:
+                    logger.warning(f"BrightData progress for {snapshot.platform} failed, will poll again: {e}")
+                    return snapshot
+            except httpx.TransportError as e:
+                logger.warning(f"BrightData progress for {snapshot.platform} failed, will poll again: {e}")
+                return snapshot
+
+            if status == "ready":
+                try:
+                    results[snapshot.platform] = await self._fetch(snapshot)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    results[snapshot.platform] = f"{snapshot.platform}: Failed to download snapshot: {e}"
+                return None
+            if status in ("failed", "unknown"):
+                logger.warning(f"BrightData snapshot {snapshot.snapshot_id} for {snapshot.platform} is '{status}'")
+                if snapshot.attempt >= self.max_attempts:
+                    self.stats["failed"] += 1
+                    results[snapshot.platform] = (f"{snapshot.platform}: Failed after {snapshot.attempt} attempts. "
+                                                  f"Last error: Status for {snapshot.platform} is '{status}'")
+                    return None
+                snapshot.attempt += 1
+                return await trigger(snapshot)
+            return snapshot
+
+        pending = [s for s in await asyncio.gather(*[trigger(s) for s in pending]) if s is not None]
+        delay = BRIGHTDATA_POLL_INITIAL
+        while pending:
+            left = expires - time.monotonic()
+            if left <= 0:
+                break
+            await asyncio.sleep(min(delay, left))
+            delay = min(BRIGHTDATA_POLL_MAX, delay * 2)
+            self.stats["polls"] += 1
+            pending = [s for s in await asyncio.gather(*[check(s) for s in pending]) if s is not None]
+
+        for snapshot in pending:
+            self.stats["timed_out"] += 1
+            logger.warning(f"⏰ BrightData snapshot {snapshot.snapshot_id} for {snapshot.platform} "
+                           f"not ready after {self.deadline:.0f}s")
+            results[snapshot.platform] = (f"{snapshot.platform}: Timed out after {self.deadline:.0f}s "
+                                          f"waiting for snapshot {snapshot.snapshot_id}")
+        return {platform: results[platform] for platform in links}
+
+
+brightdata_client = BrightDataClient()
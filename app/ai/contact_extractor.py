@@ -0,0 +1,226 @@
+"""
+Deterministic extraction of contacts from CV text: emails, phones and
+LinkedIn/Instagram/Facebook/X profile links.
+
+All patterns are compiled once at import, and one pass over a compacted CV
+takes microseconds, so most resumes never need a Gemini call for contacts.
+Obfuscated forms ("name [at] domain [dot] com", "name собака domain.kg",
+"linkedin.com/in/name" without a scheme, "Instagram: @name") are normalized.
+The LLM is only needed when emails are found but cannot be attributed to the
+candidate or to employers with confidence (see ContactExtraction.ambiguous).
+"""
+import re
+from dataclasses import dataclass, field
+
+SOCIAL_PLATFORMS = ("facebook", "instagram", "linkedin", "x")
+
+# Начало резюме, где обычно стоят контакты кандидата
+HEADER_LINES = 12
+
+# Адрес ищем от «@»: str.find в C, а регулярки проверяют только окрестность
+_EMAIL_LOCAL_RE = re.compile(r"[a-z0-9][\w.+-]{0,63}$")
+_EMAIL_DOMAIN_RE = re.compile(r"[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,24}(?![\w-])")
+_AT = r"(?:\s*[\[\(\{<]\s*(?:at|@|собака)\s*[\]\)\}>]\s*|\s+(?:собака|at)\s+)"
+_DOT = r"(?:\s*[\[\(\{<]\s*(?:dot|точка|\.)\s*[\]\)\}>]\s*|\s+(?:dot|точка)\s+|\.)"
+_OBFUSCATED_EMAIL_RE = re.compile(
+    rf"(?<![\w.+-])(?P<local>[a-z0-9][\w.+-]*){_AT}(?P<domain>[a-z0-9-]+(?:{_DOT}[a-z0-9-]+)+)",
+)
+# Без этих маркеров обфусцированного адреса в тексте нет — полную регулярку не запускаем
+_OBFUSCATION_BRACKET_RE = re.compile(r"[\[\(\{<]\s*(?:at|@)\s*[\]\)\}>]")
+_OBFUSCATION_WORDS = ("собака", " dot ", " точка ")
+_DOT_SEPARATOR_RE = re.compile(_DOT)
+_TLD_RE = re.compile(r"\.[a-z]{2,24}$")
+_PHONE_RE = re.compile(r"[+\d][\d\s().-]{7,18}\d(?!\w)")
+_DATE_LIKE_RE = re.compile(r"(?:19|20)\d\d\s*[-–.]\s*(?:19|20)\d\d|\d\d\.\d\d\.(?:19|20)\d\d")
+
+_SOCIAL_URL_RE = re.compile(
+    r"(?P<domain>linkedin\.com|instagram\.com|instagr\.am|facebook\.com|fb\.com|twitter\.com|x\.com)"
+    r"/(?P<path>[^\s,;()<>\[\]\"']+)"
+)
+_SOCIAL_DOMAINS = {
+    "linkedin.com": "linkedin", "instagram.com": "instagram", "instagr.am": "instagram",
+    "facebook.com": "facebook", "fb.com": "facebook", "twitter.com": "x", "x.com": "x",
+}
+# Путь, который считаем ссылкой на профиль
+_SOCIAL_PATH_RES = {
+    "linkedin": re.compile(r"(?:in|company|pub)/[\w%.-]+"),
+    "instagram": re.compile(r"[\w.]+"),
+    "facebook": re.compile(r"profile\.php\?id=\d+|[\w.-]+"),
+    "x": re.compile(r"\w+"),
+}
+# «Instagram: @name» без ссылки
+_SOCIAL_HANDLE_RES = {
+    "instagram": (("insta", "инстаграм"), re.compile(r"(?:instagram|insta|инстаграм)\s*[:\-–—]\s*@?([a-z0-9_.]{2,30})"),
+                  "https://instagram.com/{}"),
+    "x": (("twitter", "твиттер"), re.compile(r"(?:twitter|твиттер)\s*[:\-–—]\s*@?([a-z0-9_]{2,15})"), "https://x.com/{}"),
+}
+# Служебные пути, а не профили
+_RESERVED_PATHS = {"p", "reel", "reels", "explore", "stories", "sharer", "sharer.php", "share", "intent",
+                   "home", "login", "search", "hashtag", "groups", "pages", "events", "i"}
+_PLATFORM_MENTIONS = {
+    "linkedin": ("linkedin", "линкедин"),
+    "instagram": ("instagram", "инстаграм"),
+    "facebook": ("facebook", "фейсбук"),
+    "x": ("twitter", "твиттер"),
+}
+
+_FREE_MAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "mail.ru", "inbox.ru", "list.ru", "bk.ru", "internet.ru", "yandex.ru",
+    "yandex.kg", "yandex.com", "ya.ru", "rambler.ru", "outlook.com", "hotmail.com", "live.com", "msn.com",
+    "yahoo.com", "icloud.com", "me.com", "proton.me", "protonmail.com", "gmx.com", "aol.com", "zoho.com",
+})
+_ROLE_LOCAL_PARTS = frozenset({
+    "hr", "info", "office", "jobs", "job", "career", "careers", "recruitment", "recruiting", "personal",
+    "kadry", "reception", "admin", "contact", "contacts", "support", "sales", "secretary",
+})
+# Признаки контактов работодателя/рекомендателя в той же строке
+_EMPLOYER_CONTEXT_RE = re.compile(
+    r"\bhr\b|reference|recommend|supervisor|manager|director|employer|руководител|рекоменд|директор|"
+    r"менеджер|работодател|начальник|отдел кадров|\bооо\b|\bосоо\b|\bао\b|\bllc\b|\bltd\b",
+)
+
+
+@dataclass
+class ContactExtraction:
+    employee_email: str | None = None
+    employer_emails: list[str] = field(default_factory=list)
+    phones: list[str] = field(default_factory=list)
+    social_links: dict[str, str] = field(default_factory=dict)
+    # Найдены адреса, которые не удалось однозначно отнести к кандидату или работодателю
+    ambiguous: bool = False
+    # Соцсеть упомянута, но ссылку на профиль не распознали
+    unresolved_social: bool = False
+
+    def emails(self) -> dict:
+        """Тот же формат, что возвращает extract_emails_from_resume."""
+        return {"employee_email": self.employee_email, "employer_emails": list(self.employer_emails)}
+
+
+def _normalize_domain(domain: str) -> str | None:
+    domain = _DOT_SEPARATOR_RE.sub(".", domain).strip(".")
+    return domain if _TLD_RE.search(domain) else None
+
+
+def _find_emails(text: str) -> list[tuple[int, str]]:
+    found: dict[str, int] = {}
+    at = text.find("@")
+    while at != -1:
+        local = _EMAIL_LOCAL_RE.search(text, max(0, at - 64), at)
+        domain = _EMAIL_DOMAIN_RE.match(text, at + 1)
+        if local and domain and not _preceded_by(text, local.start(), "_.+-"):
+            found.setdefault(f"{local.group(0)}@{domain.group(0)}", local.start())
+        at = text.find("@", at + 1)
+    if _OBFUSCATION_BRACKET_RE.search(text) or any(word in text for word in _OBFUSCATION_WORDS):
+        for match in _OBFUSCATED_EMAIL_RE.finditer(text):
+            raw = match.group(0)
+            # «worked at company.com» — не адрес: голое «at» принимаем только вместе с «dot»/«точка»
+            if not ("[" in raw or "(" in raw or "{" in raw or "<" in raw or "собака" in raw
+                    or " dot " in raw or " точка " in raw):
+                continue
+            domain = _normalize_domain(match.group("domain"))
+            if domain:
+                found.setdefault(f"{match.group('local')}@{domain}", match.start())
+    return sorted((pos, email) for email, pos in found.items())
+
+
+def _find_phones(text: str) -> list[str]:
+    phones: list[str] = []
+    for match in _PHONE_RE.finditer(text):
+        raw = match.group(0)
+        if _preceded_by(text, match.start(), "_+"):
+            continue
+        digits = re.sub(r"\D", "", raw)
+        # Не телефоны: годы «2019-2021», даты «01.02.2020»
+        if not 9 <= len(digits) <= 15 or _DATE_LIKE_RE.search(raw):
+            continue
+        phone = ("+" if raw.startswith("+") else "") + digits
+        if phone not in phones:
+            phones.append(phone)
+    return phones
+
+
+def _preceded_by(text: str, pos: int, chars: str) -> bool:
+    return pos > 0 and (text[pos - 1].isalnum() or text[pos - 1] in chars)
+
+
+def _social_links(text: str) -> dict[str, str]:
+    links: dict[str, str] = {}
+    for match in _SOCIAL_URL_RE.finditer(text):
+        domain = match.group("domain")
+        platform = _SOCIAL_DOMAINS[domain]
+        # «fox.com/...» — не x.com; «www.x.com» и «//x.com» подходят
+        if platform in links or _preceded_by(text, match.start(), "_-"):
+            continue
+        path = _SOCIAL_PATH_RES[platform].match(match.group("path"))
+        if path is None or path.group(0).split("/")[0] in _RESERVED_PATHS:
+            continue
+        links[platform] = f"https://{domain}/{path.group(0).rstrip('/.')}"
+    for platform, (words, pattern, template) in _SOCIAL_HANDLE_RES.items():
+        if platform in links or not any(word in text for word in words):
+            continue
+        match = pattern.search(text)
+        if match:
+            links[platform] = template.format(match.group(1).rstrip("."))
+    return links
+
+
+def extract_social_links(text: str) -> dict[str, str]:
+    """Первая ссылка на профиль для каждой платформы, https:// и без завершающего слэша."""
+    return _social_links((text or "").lower())
+
+
+def has_unresolved_social(text: str, links: dict[str, str]) -> bool:
+    """Платформа упомянута в тексте, но ссылки на профиль для неё нет."""
+    text = (text or "").lower()
+    return any(
+        platform not in links and any(word in text for word in words)
+        for platform, words in _PLATFORM_MENTIONS.items()
+    )
+
+
+def _line_at(text: str, pos: int) -> str:
+    end = text.find("\n", pos)
+    return text[text.rfind("\n", 0, pos) + 1: len(text) if end == -1 else end]
+
+
+def _attribute_emails(text: str, emails: list[tuple[int, str]], result: ContactExtraction):
+    header_end = 0
+    for _ in range(HEADER_LINES):
+        next_break = text.find("\n", header_end)
+        if next_break == -1:
+            header_end = len(text)
+            break
+        header_end = next_break + 1
+
+    undecided: list[tuple[int, str]] = []
+    for pos, email in emails:
+        local = email.split("@", 1)[0]
+        if local in _ROLE_LOCAL_PARTS or (pos >= header_end and _EMPLOYER_CONTEXT_RE.search(_line_at(text, pos))):
+            result.employer_emails.append(email)
+        else:
+            undecided.append((pos, email))
+
+    if len(undecided) == 1:
+        result.employee_email = undecided[0][1]
+        return
+    in_header = [email for pos, email in undecided if pos < header_end]
+    if in_header:
+        # Контакты кандидата идут в шапке; первый адрес в шапке — его
+        result.employee_email = in_header[0]
+        rest = [email for _, email in undecided if email != result.employee_email]
+        result.employer_emails.extend(e for e in rest if e.split("@", 1)[1] not in _FREE_MAIL_DOMAINS)
+        # Личные адреса вне шапки могут быть и вторым адресом кандидата, и рекомендателем
+        result.ambiguous = any(e.split("@", 1)[1] in _FREE_MAIL_DOMAINS for e in rest)
+    elif undecided:
+        result.ambiguous = True
+
+
+def extract_contacts(text: str) -> ContactExtraction:
+    # Регулярки без IGNORECASE и без lookbehind в начале: так re ищет по первому символу, а не пробует каждую позицию
+    text = (text or "").lower()
+    result = ContactExtraction(phones=_find_phones(text), social_links=_social_links(text))
+    result.unresolved_social = has_unresolved_social(text, result.social_links)
+    emails = _find_emails(text)
+    if emails:
+        _attribute_emails(text, emails, result)
+    return result
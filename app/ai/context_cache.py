@@ -0,0 +1,197 @@
+"""
+Gemini context caching for long static system instructions.
+
+The scoring rubrics (the analyze_resume instruction, SELLER_INSTRUCTION) are
+identical on every call. Each one is registered once per model with
+caches.create. Requests then reference it by name through
+GenerateContentConfig.cached_content instead of re-sending the text. A cache
+is extended with caches.update shortly before it expires.
+
+Gemini rejects cached content below a minimum size (1024 tokens for the
+Flash models, more for Pro). Whether an instruction qualifies is decided by
+models.count_tokens, once per instruction and model, not by the local
+word-based estimate_tokens: the rubrics estimate at about 860-880 "words"
+while Cyrillic text tokenizes to noticeably more Gemini tokens. The count
+goes through the gateway (semaphore, rate buckets, telemetry) and is made
+under the same per-key lock as caches.create, so a burst of first calls
+counts once. An instruction the tokenizer puts below the minimum is always
+sent inline and counted in stats["below_minimum"]. If a cache cannot be
+created (unsupported model, quota, API error), the instruction is sent
+inline and creation is not retried for that key for a while. A request
+that fails because the cache was deleted is re-sent inline by the gateway.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from google import genai
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+GEMINI_CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Продлеваем кэш, когда до истечения осталось меньше этого
+GEMINI_CONTEXT_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_MARGIN", "300"))
+# Минимальный размер cached content у Gemini (по count_tokens) — короче инструкции не кэшируем.
+# Для Pro-моделей минимум выше — задаётся через env
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# После неудачного create не пробуем снова столько секунд
+GEMINI_CONTEXT_CACHE_RETRY_AFTER = int(os.getenv("GEMINI_CONTEXT_CACHE_RETRY_AFTER", "600"))
+
+
+@dataclass
+class _CacheEntry:
+    name: str | None
+    # time.monotonic(): до какого момента пользуемся name (или не пытаемся создать снова, если name нет)
+    valid_until: float
+
+
+def _instruction_text(system_instruction) -> str:
+    if system_instruction is None:
+        return ""
+    if isinstance(system_instruction, str):
+        return system_instruction
+    if isinstance(system_instruction, (list, tuple)):
+        return "\n".join(_instruction_text(part) for part in system_instruction)
+    parts = getattr(system_instruction, "parts", None)
+    if parts is not None:
+        return "\n".join(_instruction_text(part) for part in parts)
+    return getattr(system_instruction, "text", None) or ""
+
+
+class GeminiContextCache:
+    def __init__(self, client_factory: Callable[[], genai.Client], count_tokens: Callable[[str, str], Awaitable[int]],
+                 enabled: bool = GEMINI_CONTEXT_CACHE_ENABLED, ttl: int = GEMINI_CONTEXT_CACHE_TTL,
+                 min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS):
+        self._client_factory = client_factory
+        # count_tokens(model, text) — через шлюз, чтобы счёт шёл в тех же лимитах и метриках
+        self._count = count_tokens
+        self.enabled = enabled
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self._entries: dict[str, _CacheEntry] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        # key -> число токенов инструкции по count_tokens модели
+        self._token_counts: dict[str, int] = {}
+        self.stats = {"hits": 0, "created": 0, "refreshed": 0, "unavailable": 0, "invalidated": 0,
+                      "below_minimum": 0}
+
+    def snapshot(self) -> dict:
+        return {"entries": sum(1 for e in self._entries.values() if e.name), **self.stats}
+
+    @staticmethod
+    def _key(model: str, instruction: str) -> str:
+        return hashlib.sha256(f"{model}|{instruction}".encode("utf-8")).hexdigest()
+
+    async def apply(self, model: str, config: types.GenerateContentConfig | None):
+        """
+        Возвращает (config, key): копию config с cached_content вместо system_instruction
+        или исходный config и None, если кэш не применим.
+        """
+        if not self.enabled or config is None or config.cached_content or not config.system_instruction:
+            return config, None
+        instruction = _instruction_text(config.system_instruction)
+        key = self._key(model, instruction)
+        name = await self._get_or_create(key, model, config.system_instruction, instruction)
+        if name is None:
+            return config, None
+        self.stats["hits"] += 1
+        return config.model_copy(update={"system_instruction": None, "cached_content": name}), key
+
+    async def _count_tokens(self, key: str, model: str, instruction: str) -> int | None:
+        """Размер инструкции токенизатором модели; вызывается под блокировкой ключа. None — пока неизвестен."""
+        try:
+            tokens = await self._count(model, instruction)
+        except Exception as e:
+            # Без точного счёта не рискуем заведомо отклонённым create — шлём inline и пробуем позже
+            self.stats["unavailable"] += 1
+            logger.warning(f"Gemini count_tokens failed for {model}, sending instruction inline: {e}")
+            self._entries[key] = _CacheEntry(name=None, valid_until=time.monotonic() + GEMINI_CONTEXT_CACHE_RETRY_AFTER)
+            return None
+        self._token_counts[key] = tokens
+        if tokens < self.min_tokens:
+            logger.info(f"Instruction of {tokens} tokens is below the {self.min_tokens}-token context cache "
+                        f"minimum for {model}, sending it inline")
+        return tokens
+
+    def _below_minimum(self, key: str) -> bool:
+        tokens = self._token_counts.get(key)
+        if tokens is not None and tokens < self.min_tokens:
+            self.stats["below_minimum"] += 1
+            return True
+        return False
+
+    async def _get_or_create(self, key: str, model: str, system_instruction, instruction: str) -> str | None:
+        if self._below_minimum(key):
+            return None
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry.valid_until - now > GEMINI_CONTEXT_CACHE_REFRESH_MARGIN:
+            return entry.name
+        if entry is not None and entry.name is None and entry.valid_until > now:
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and entry.valid_until - now > GEMINI_CONTEXT_CACHE_REFRESH_MARGIN:
+                return entry.name
+            if key not in self._token_counts:
+                # Первый вызов с этой инструкцией: считаем один раз, ждущие за блокировкой берут готовый счёт
+                if await self._count_tokens(key, model, instruction) is None:
+                    return None
+            if self._below_minimum(key):
+                return None
+            client = self._client_factory()
+            if entry is not None and entry.name and entry.valid_until > now:
+                # Кэш ещё жив — продлеваем, имя не меняется
+                try:
+                    await client.aio.caches.update(
+                        name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+                    )
+                    entry.valid_until = time.monotonic() + self.ttl
+                    self.stats["refreshed"] += 1
+                    return entry.name
+                except Exception as e:
+                    logger.warning(f"Gemini context cache refresh failed for {model}: {e}")
+            try:
+                cached = await client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        ttl=f"{self.ttl}s",
+                        display_name=f"instruction-{key[:12]}",
+                    ),
+                )
+            except Exception as e:
+                self.stats["unavailable"] += 1
+                logger.warning(f"Gemini context cache unavailable for {model}, sending instruction inline: {e}")
+                self._entries[key] = _CacheEntry(name=None, valid_until=time.monotonic() + GEMINI_CONTEXT_CACHE_RETRY_AFTER)
+                return None
+            self._entries[key] = _CacheEntry(name=cached.name, valid_until=time.monotonic() + self.ttl)
+            self.stats["created"] += 1
+            logger.info(f"🗄️ Gemini context cache {cached.name} created for {model}")
+            return cached.name
+
+    def invalidate(self, key: str):
+        """Кэш удалён или истёк на стороне Gemini — следующий вызов создаст новый."""
+        if self._entries.pop(key, None) is not None:
+            self.stats["invalidated"] += 1
+
+    async def close(self):
+        """Удаляет созданные кэши, чтобы не платить за хранение до истечения TTL."""
+        names = [entry.name for entry in self._entries.values() if entry.name]
+        self._entries.clear()
+        if not names:
+            return
+        client = self._client_factory()
+        results = await asyncio.gather(*[client.aio.caches.delete(name=name) for name in names],
+                                       return_exceptions=True)
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        logger.info(f"🧹 Gemini context caches deleted: {len(names) - failed}/{len(names)}")
@@ -0,0 +1,388 @@
+"""
+Single entry point for every LLM call (Gemini and OpenAI).
+
+Each model gets its own concurrency semaphore and two token buckets, one for
+requests per minute and one for tokens per minute. A burst of uploads then
+waits in the gateway queue instead of tripping 429s. Rate limits, timeouts
+and 5xx responses are retried with jittered exponential backoff, within one
+deadline per call. The deadline covers queueing, retries and backoff sleeps.
+snapshot() reports queue depth, in-flight calls, retries and latency per
+model. Every finished call is also reported to telemetry.py for the
+Prometheus metrics and the per-resume trace. With REPLAY_MODE set, the
+provider calls are recorded to or served from fixtures (see replay.py).
+
+Limits per model are in LLM_MODEL_LIMITS. They can be overridden with the
+LLM_LIMITS env var, for example
+'{"gemini-2.0-flash": {"concurrency": 8, "rpm": 1000, "tpm": 1000000}}'.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable
+
+import openai
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+from openai.types.chat import ChatCompletion
+
+from app.ai.context_cache import GeminiContextCache
+from app.ai.replay import fixture_key, replay_harness
+from app.ai.telemetry import (
+    LLM_IN_FLIGHT, LLM_QUEUED, LLM_QUEUE_SECONDS, LLM_RETRIES, LLMUsage, gemini_usage, openai_usage, record_call,
+)
+from app.services.text_compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "8"))
+LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "300"))
+LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "1000000"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "20"))
+# Сколько последних вызовов держим для перцентилей задержки
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    concurrency: int = LLM_DEFAULT_CONCURRENCY
+    rpm: int = LLM_DEFAULT_RPM
+    tpm: int = LLM_DEFAULT_TPM
+
+
+LLM_MODEL_LIMITS: dict[str, ModelLimits] = {
+    "gemini-2.5-flash-preview-04-17": ModelLimits(concurrency=8, rpm=1000, tpm=1000000),
+    "gemini-2.0-flash": ModelLimits(concurrency=16, rpm=2000, tpm=4000000),
+    "gemini-1.5-flash-8b": ModelLimits(concurrency=16, rpm=4000, tpm=4000000),
+    "gpt-4o": ModelLimits(concurrency=8, rpm=500, tpm=300000),
+}
+
+
+def _load_limits() -> dict[str, ModelLimits]:
+    limits = dict(LLM_MODEL_LIMITS)
+    raw = os.getenv("LLM_LIMITS")
+    if raw:
+        for model, overrides in json.loads(raw).items():
+            limits[model] = replace(limits.get(model, ModelLimits()), **overrides)
+    return limits
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    """capacity единиц, пополняется равномерно за минуту; acquire ждёт, пока хватит."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Запрос больше ёмкости ведра иначе ждал бы вечно — ограничиваем ёмкостью
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def debit(self, amount: float):
+        """Списывает фактический расход сверх оценки; баланс может уйти в минус."""
+        self._refill()
+        self.tokens -= amount
+
+
+class _ModelChannel:
+    def __init__(self, model: str, limits: ModelLimits):
+        self.model = model
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(max(1, limits.concurrency))
+        self.requests = TokenBucket(limits.rpm)
+        self.tokens = TokenBucket(limits.tpm)
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"calls": 0, "errors": 0, "retries": 0, "rate_limited": 0, "deadline_exceeded": 0,
+                         "prompt_tokens": 0, "total_tokens": 0}
+        self.latencies: deque[float] = deque(maxlen=LLM_LATENCY_WINDOW)
+        self.queue_waits: deque[float] = deque(maxlen=LLM_LATENCY_WINDOW)
+
+    def snapshot(self) -> dict:
+        return {
+            "limits": {"concurrency": self.limits.concurrency, "rpm": self.limits.rpm, "tpm": self.limits.tpm},
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            **self.counters,
+            "latency_ms": _percentiles(self.latencies),
+            "queue_wait_ms": _percentiles(self.queue_waits),
+        }
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 1)}
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, genai_errors.APIError):
+        return error.code in _RETRYABLE_STATUS
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in _RETRYABLE_STATUS
+    return False
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return (isinstance(error, genai_errors.APIError) and error.code == 429) or isinstance(error, openai.RateLimitError)
+
+
+def _retry_reason(error: Exception) -> str:
+    if _is_rate_limit(error):
+        return "rate_limit"
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return "timeout"
+    return "server_error"
+
+
+def _contents_text(contents) -> str:
+    """Текст промпта для оценки токенов до вызова: строки, Content и Part из google.genai."""
+    if contents is None:
+        return ""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_contents_text(item) for item in contents)
+    if isinstance(contents, dict):
+        return str(contents.get("content") or "")
+    parts = getattr(contents, "parts", None)
+    if parts is not None:
+        return "\n".join(_contents_text(part) for part in parts)
+    return getattr(contents, "text", None) or ""
+
+
+class LLMGateway:
+    def __init__(self, limits: dict[str, ModelLimits] | None = None, deadline: float = LLM_DEADLINE_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.limits = limits if limits is not None else _load_limits()
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self._channels: dict[str, _ModelChannel] = {}
+        self._gemini: genai.Client | None = None
+        self._openai: openai.AsyncOpenAI | None = None
+        self.context_cache = GeminiContextCache(lambda: self.gemini_client, self.count_tokens)
+
+    @property
+    def gemini_client(self) -> genai.Client:
+        if self._gemini is None:
+            self._gemini = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+        return self._gemini
+
+    @property
+    def openai_client(self) -> openai.AsyncOpenAI:
+        if self._openai is None:
+            # Ретраи делает шлюз, у клиента свои выключаем, чтобы не умножать попытки
+            self._openai = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._openai
+
+    def channel(self, model: str) -> _ModelChannel:
+        channel = self._channels.get(model)
+        if channel is None:
+            channel = self._channels[model] = _ModelChannel(model, self.limits.get(model, ModelLimits()))
+        return channel
+
+    def snapshot(self) -> dict:
+        return {model: channel.snapshot() for model, channel in self._channels.items()}
+
+    async def close(self):
+        await self.context_cache.close()
+
+    def latency_percentile(self, model: str, q: float, min_samples: int = 1) -> float | None:
+        """Перцентиль задержки успешных вызовов модели в секундах; None, пока выборка мала."""
+        channel = self._channels.get(model)
+        if channel is None or len(channel.latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(channel.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    async def call(self, model: str, invoke: Callable[[], Awaitable], prompt_tokens: int = 0,
+                   deadline: float | None = None, usage: Callable[[object], LLMUsage | None] | None = None,
+                   site: str = "unknown"):
+        """
+        Вызывает invoke() в лимитах модели. prompt_tokens — оценка для TPM-ведра;
+        usage(response) возвращает фактический расход токенов, разница списывается после ответа.
+        site — место вызова (имя задачи) для метрик и трейса резюме.
+        """
+        channel = self.channel(model)
+        expires = time.monotonic() + (deadline or self.deadline)
+        started = time.monotonic()
+        outcome, spent = "error", None
+
+        def remaining() -> float:
+            left = expires - time.monotonic()
+            if left <= 0:
+                channel.counters["deadline_exceeded"] += 1
+                raise LLMDeadlineExceeded(f"LLM call to {model} exceeded its {deadline or self.deadline}s deadline")
+            return left
+
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                queued_at = time.monotonic()
+                channel.queued += 1
+                LLM_QUEUED.labels(model).inc()
+                try:
+                    await asyncio.wait_for(channel.semaphore.acquire(), timeout=remaining())
+                except asyncio.TimeoutError:
+                    channel.counters["deadline_exceeded"] += 1
+                    raise LLMDeadlineExceeded(f"LLM call to {model} timed out waiting in the queue") from None
+                finally:
+                    channel.queued -= 1
+                    LLM_QUEUED.labels(model).dec()
+                try:
+                    await asyncio.wait_for(channel.requests.acquire(1), timeout=remaining())
+                    await asyncio.wait_for(channel.tokens.acquire(prompt_tokens), timeout=remaining())
+                    channel.queue_waits.append(time.monotonic() - queued_at)
+                    LLM_QUEUE_SECONDS.labels(model).observe(time.monotonic() - queued_at)
+
+                    channel.in_flight += 1
+                    LLM_IN_FLIGHT.labels(model).inc()
+                    attempt_started = time.monotonic()
+                    try:
+                        response = await asyncio.wait_for(invoke(), timeout=remaining())
+                    finally:
+                        channel.in_flight -= 1
+                        LLM_IN_FLIGHT.labels(model).dec()
+                    channel.latencies.append(time.monotonic() - attempt_started)
+                    channel.counters["calls"] += 1
+                    spent = usage(response) if usage is not None else None
+                    channel.counters["prompt_tokens"] += spent.prompt_tokens if spent else prompt_tokens
+                    if spent:
+                        channel.counters["total_tokens"] += spent.total_tokens
+                        if spent.total_tokens > prompt_tokens:
+                            channel.tokens.debit(spent.total_tokens - prompt_tokens)
+                    outcome = "ok"
+                    return response
+                except LLMDeadlineExceeded:
+                    raise
+                except asyncio.TimeoutError:
+                    channel.counters["deadline_exceeded"] += 1
+                    raise LLMDeadlineExceeded(f"LLM call to {model} exceeded its deadline") from None
+                except Exception as e:
+                    channel.counters["errors"] += 1
+                    if _is_rate_limit(e):
+                        channel.counters["rate_limited"] += 1
+                    if attempt > self.max_retries or not _is_retryable(e):
+                        raise
+                    # Full jitter: одновременно упавшие вызовы не повторяют запрос синхронно
+                    delay = random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * 2 ** (attempt - 1)))
+                    if delay >= expires - time.monotonic():
+                        raise
+                    channel.counters["retries"] += 1
+                    LLM_RETRIES.labels(model, site, _retry_reason(e)).inc()
+                    logger.warning(f"🔁 {model} attempt {attempt} failed ({type(e).__name__}: {e}), retry in {delay:.1f}s")
+                finally:
+                    channel.semaphore.release()
+                await asyncio.sleep(delay)
+        except LLMDeadlineExceeded:
+            outcome = "deadline"
+            raise
+        except asyncio.CancelledError:
+            # Проигравший хеджированный запрос или отменённая задача
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = "rate_limited" if _is_rate_limit(e) else "error"
+            raise
+        finally:
+            record_call(model, site, outcome, time.monotonic() - started, attempt - 1, spent)
+
+    async def generate_content(self, model: str, contents, config=None, deadline: float | None = None,
+                               site: str = "unknown"):
+        """
+        client.aio.models.generate_content через лимиты шлюза. Длинная system_instruction
+        передаётся как Gemini context cache (см. context_cache.py), если он доступен.
+        """
+        # Ключ фикстуры — по исходному config: имя context cache меняется от запуска к запуску
+        fixture = fixture_key("gemini", model, contents, config) if replay_harness.active else None
+        if not replay_harness.replaying:
+            cached_config, cache_key = await self.context_cache.apply(model, config)
+            if cache_key is not None:
+                try:
+                    return await self._generate_content(model, contents, cached_config, deadline, site, fixture)
+                except genai_errors.APIError as e:
+                    if e.code not in (400, 403, 404):
+                        raise
+                    # Кэш удалили или он истёк раньше срока — повторяем с инструкцией в запросе
+                    logger.warning(f"Gemini context cache rejected for {model} ({e.code}), retrying inline")
+                    self.context_cache.invalidate(cache_key)
+        return await self._generate_content(model, contents, config, deadline, site, fixture)
+
+    async def count_tokens(self, model: str, contents, deadline: float | None = None,
+                           site: str = "count_tokens") -> int:
+        """client.aio.models.count_tokens через лимиты шлюза; TPM-ведро не расходует."""
+        response = await self.call(
+            model, lambda: self.gemini_client.aio.models.count_tokens(model=model, contents=contents),
+            deadline=deadline, site=site,
+        )
+        return response.total_tokens or 0
+
+    async def _generate_content(self, model: str, contents, config, deadline: float | None, site: str,
+                                fixture: str | None = None):
+        prompt = _contents_text(contents)
+        if config is not None and getattr(config, "system_instruction", None):
+            prompt += _contents_text(config.system_instruction)
+
+        invoke = replay_harness.wrap(
+            "gemini", fixture, {"model": model, "site": site},
+            lambda: self.gemini_client.aio.models.generate_content(model=model, contents=contents, config=config),
+            types.GenerateContentResponse,
+        )
+        return await self.call(
+            model, invoke, prompt_tokens=estimate_tokens(prompt), deadline=deadline, usage=gemini_usage, site=site,
+        )
+
+    async def chat_completion(self, model: str, messages: list[dict], deadline: float | None = None,
+                              site: str = "unknown", **kwargs):
+        """client.chat.completions.create через лимиты шлюза."""
+        fixture = fixture_key("openai", model, messages, kwargs) if replay_harness.active else None
+        invoke = replay_harness.wrap(
+            "openai", fixture, {"model": model, "site": site},
+            lambda: self.openai_client.chat.completions.create(model=model, messages=messages, **kwargs),
+            ChatCompletion,
+        )
+        return await self.call(
+            model, invoke,
+            prompt_tokens=estimate_tokens(_contents_text(messages)), deadline=deadline, usage=openai_usage,
+            site=site,
+        )
+
+
+llm_gateway = LLMGateway()
@@ -3,7 +3,7 @@ import tempfile
 import os
 from dotenv import load_dotenv
 import plotly.graph_objects as go
-from google.cloud import storage
+from app.services.storage import storage_gateway
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, HRFlowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import A4
@@ -196,15 +196,4 @@ async def generate_pdf_for_single_resume(resume) -> str:
     return pdf_path
 
 async def upload_pdf_to_gcs(local_path: str, destination_blob_name: str) -> str:
-    credentials_path = "school-kg-7bd58d53b816.json"
-    bucket_name = os.getenv("GCS_BUCKET_NAME", "your-default-bucket-name")
-
-    def _upload():
-        client = storage.Client.from_service_account_json(credentials_path)
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(destination_blob_name)
-        blob.upload_from_filename(local_path, content_type="application/pdf")
-        return f"gs://{bucket_name}/{destination_blob_name}"
-
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _upload)  
+    return await storage_gateway.upload_file(local_path, destination_blob_name, content_type="application/pdf")
@@ -0,0 +1,668 @@
+"""
+Rule-based scoring of the hard-skill rubric from the analyze_resume instruction.
+
+Most of the rubric is mechanical. It covers sales and service years, education
+level, a fixed list of software, training courses, driver's licence categories,
+driving experience, languages, age, marital status and desired salary. These
+indicators are extracted from the CV text with regexes compiled at import, in
+about a millisecond per CV. Each vacancy skill is then scored with the same
+100 / 50 / 0 rule as the instruction.
+
+A skill whose title maps to no rubric category (for example "Excel"), or whose
+indicator the rules cannot read with confidence (for example a sales job
+without dates), is left to the LLM. analyze_resume_hedged sends only those
+titles to the model and merges the answer with HardSkillScore.merge.
+hard_total is always computed here.
+"""
+import os
+import re
+from datetime import date
+from dataclasses import dataclass, field
+
+HARD_SKILL_RULES_ENABLED = os.getenv("HARD_SKILL_RULES_ENABLED", "true").lower() == "true"
+
+# Начало резюме, где обычно стоят возраст, дата рождения и семейное положение
+HEADER_LINES = 15
+
+_MONTHS = {
+    "янв": 1, "фев": 2, "мар": 3, "апр": 4, "май": 5, "мая": 5, "июн": 6, "июл": 7, "авг": 8, "сен": 9,
+    "окт": 10, "ноя": 11, "дек": 12, "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6, "jul": 7,
+    "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH_NAMES = (r"(?:янв|фев|мар|апр|ма[йя]|июн|июл|авг|сен|окт|ноя|дек|jan|feb|mar|apr|may|jun|jul|aug|sep|oct"
+                r"|nov|dec)[a-zа-я]*\.?")
+_POINT = rf"(?:(?:0?[1-9]|1[0-2])[./](?:19|20)\d\d|{_MONTH_NAMES}\s*(?:19|20)\d\d|(?:19|20)\d\d)"
+_PRESENT = (r"(?:по\s+)?(?:настоящее\s+время|наст\.?\s*вр\.?|н\.\s*в\.?|сейчас|текущее\s+время|по\s+сей\s+день"
+            r"|present|now|current|till\s+now|until\s+now)")
+_RANGE_RE = re.compile(
+    rf"(?<!\d)(?:с\s+)?(?P<start>{_POINT})\s*(?:г\.?\s*)?(?:[-–—]+|по|до|to|till|until)\s*(?P<end>{_POINT}|{_PRESENT})(?!\d)"
+)
+_POINT_MONTH_RE = re.compile(r"(?:(\d{1,2})[./]|([a-zа-я]{3})[a-zа-я]*\.?\s*)?((?:19|20)\d\d)")
+
+_SALES_WORDS = ("продаж", "продав", "sales", "торговый представитель", "торговый агент", "консультант",
+                "seller", "salesman")
+_SERVICE_WORDS = ("официант", "бариста", "бармен", "администратор", "хостес", "кассир", "колл-центр",
+                  "call-центр", "call center", "оператор", "ресепшн", "ресепшен", "reception", "горничн",
+                  "обслуживан", "сервис", "service", "waiter", "cashier", "hostess")
+_EDUCATION_WORDS = ("университет", "институт", "колледж", "техникум", "училищ", "школ", "лицей", "гимнази",
+                    "академи", "факультет", "специальность", "бакалавр", "магистр", "university", "college",
+                    "faculty", "bachelor", "master of", "образовани")
+# Заголовки разделов резюме: на них заканчивается запись о месте работы
+_SECTION_HEADING_RE = re.compile(
+    r"^(?:опыт\s+работы|трудовая\s+деятельность|образование|дополнительное\s+образование|курсы|тренинги"
+    r"|навыки|ключевые\s+навыки|знание\s+языков|языки|о\s+себе|личные\s+качества|дополнительная\s+информация"
+    r"|контакты|сертификаты|рекомендации|experience|work\s+experience|employment|education|skills|languages"
+    r"|courses|certificates|about\s+me|additional\s+information|references)\s*:?$"
+)
+_EDUCATION_HEADINGS = ("образование", "дополнительное образование", "курсы", "тренинги", "education", "courses")
+_EXPLICIT_YEARS = {
+    "sales": re.compile(r"(?:опыт\w*(?:\s+работы)?\s+(?:в\s+)?(?:сфере\s+|области\s+)?(?:продаж\w*|торговл\w*)"
+                        r"|sales\s+experience)[^\d\n]{0,25}(\d{1,2}(?:[.,]\d)?)\s*\+?\s*(?:год|лет|г\.|years?)"
+                        r"|(\d{1,2}(?:[.,]\d)?)\s*\+?\s*years?\s+(?:of\s+)?(?:experience\s+in\s+)?sales"),
+    "service": re.compile(r"(?:опыт\w*(?:\s+работы)?\s+(?:в\s+)?(?:сфере\s+)?(?:обслуживан\w*|сервис\w*)"
+                          r"|service\s+experience)[^\d\n]{0,25}(\d{1,2}(?:[.,]\d)?)\s*\+?\s*(?:год|лет|г\.|years?)"
+                          r"|(\d{1,2}(?:[.,]\d)?)\s*\+?\s*years?\s+(?:of\s+)?(?:experience\s+in\s+)?(?:customer\s+)?service"),
+}
+
+# (уровень, название): чем больше уровень, тем выше образование
+_EDUCATION_LEVELS = (
+    (3, "высшее", ("высшее", "университет", "институт", "академи", "бакалавр", "магистр", "специалитет",
+                   "university", "bachelor", "master", "higher education")),
+    (2, "колледж", ("колледж", "техникум", "училищ", "среднее специальное", "средне-специальное",
+                    "среднее профессиональное", "college")),
+    (1, "лицей", ("лицей", "lyceum")),
+    (1, "школа", ("школ", "гимнази", "среднее общее", "high school", "secondary school")),
+)
+_EDUCATION_FIELDS = {
+    "техническое": ("техническ", "инженер", "информат", "программ", "строител", "энергет", "механ", "автомат",
+                    "технолог", "technical", "engineer", "computer"),
+    "экономическое": ("эконом", "финанс", "бухгалт", "менеджмент", "маркетинг", "коммерц", "бизнес", "торгов",
+                      "economic", "finance", "business", "accounting", "management"),
+    "медицинское": ("медиц", "фармац", "биолог", "хими", "естествен", "сестрин", "medical", "pharma", "biology",
+                    "chemistry", "natural science"),
+    "гуманитарное": ("гуманитар", "педагог", "филолог", "юрид", "юриспруден", "право", "психолог", "истори",
+                     "журналист", "лингв", "перевод", "социолог", "humanit", "law", "pedagog", "linguist"),
+}
+
+# Каноническое название: синонимы в тексте
+SOFTWARE = {
+    "СБИС": ("сбис", "saby", "sbis"),
+    "МойСклад": ("мойсклад", "мой склад", "moysklad", "moy sklad"),
+    "Контур": ("контур", "kontur"),
+    "SUBTOTAL": ("subtotal", "сабтотал"),
+    "LiteBox": ("litebox", "лайтбокс"),
+    "Антисклад": ("антисклад", "antisklad"),
+    "CloudShop": ("cloudshop", "клаудшоп"),
+    "1С Торговля и склад": ("1с: торговля", "1с торговля", "1c: торговля", "1c торговля", "1с:торговля",
+                            "1c:торговля", "торговля и склад", "1c trade"),
+}
+# «1С» без конфигурации — родственный навык для «1С Торговля и склад»
+_ONE_C_RE = re.compile(r"(?<![\w])1[сc](?![\w])")
+
+_COURSE_MARKER_RE = re.compile(r"тренинг|курс|семинар|мастер-класс|training|course|seminar|workshop")
+COURSES = {
+    "Тренинг по продажам": ("продаж", "sales", "sell"),
+    "Тренинг по деловой коммуникации": ("делов", "коммуникац", "business communication", "communication"),
+    "Тренинг по переговорам": ("переговор", "negotiat"),
+}
+
+# Категории ищем только в строках о правах: кириллические «в»/«с» иначе совпадают с предлогами
+_LICENSE_WORDS = ("права", "водительск", "удостоверени", "licen")
+_CATEGORIES = r"(?P<cats>{letters}(?:\s*(?:,|/|и|and)\s*{letters})*)(?![\w])"
+_LICENSE_CATEGORY_RE = re.compile(
+    r"(?:кат\w*\.?|category|categories)\s*[:\-–]?\s*[«\"]?" + _CATEGORIES.format(letters="[a-eавсде]")
+)
+_LICENSE_RE = re.compile(
+    r"(?:права|удостоверени\w*|licen[cs]e)\s*(?:[:\-–]\s*" + _CATEGORIES.format(letters="[a-eавсде]")
+    + r"|" + _CATEGORIES.format(letters="[a-e]").replace("?P<cats>", "?P<latin>") + ")"
+)
+_CYRILLIC_CATEGORIES = str.maketrans({"а": "a", "в": "b", "с": "c", "д": "d", "е": "e"})
+_DRIVING_YEARS_RE = re.compile(
+    r"(?:стаж\s+вождения|водительский\s+стаж|опыт\s+вождения|driving\s+experience)[^\d\n]{0,20}"
+    r"(\d{1,2}(?:[.,]\d)?)\s*\+?\s*(?:год|лет|г\.|years?)"
+)
+
+LANGUAGES = {
+    "Кыргызский": ("кыргызск", "киргизск", "kyrgyz"),
+    "Русский": ("русск", "russian"),
+    "Английский": ("английск", "english"),
+    "Китайский": ("китайск", "chinese", "mandarin"),
+    "Узбекский": ("узбекск", "uzbek"),
+    "Казахский": ("казахск", "kazakh"),
+}
+_LANGUAGE_CONTEXT_RE = re.compile(r"язык|language|владе|родной|свободно|разговорн|native|fluent|intermediate"
+                                  r"|beginner|advanced|upper|\b[abc][12]\b")
+_LANGUAGE_HEADER_RE = re.compile(r"^(?:знание\s+)?(?:иностранных\s+)?(?:языки|языков|languages)\s*:?\s*$")
+
+_AGE_RE = re.compile(r"(?:возраст|age)\s*[:\-–]?\s*(\d{2})|(?<!\d)(\d{2})\s*(?:год|года|лет)\b")
+_NOT_AGE_WORDS = ("опыт", "стаж", "experience", "работ")
+_BIRTH_RE = re.compile(
+    r"(?:дата\s+рождения|родил\w*|д\.\s*р\.|date\s+of\s+birth|born|birth\s+date)[^\d\n]{0,15}"
+    r"(?:(\d{1,2})[./](\d{1,2})[./])?((?:19|20)\d\d)"
+    r"|((?:19|20)\d\d)\s*г\.?\s*р\.?"
+)
+
+_MARRIED_RE = re.compile(r"\b(?:женат|замужем|married)\b")
+_SINGLE_RE = re.compile(r"\b(?:холост\w*|не\s+женат|не\s+замужем|single|unmarried)\b")
+
+_SALARY_LINE_RE = re.compile(r"(?:желаем\w*|ожидаем\w*|зарплатн\w*\s+ожидани\w*|желательн\w*)\s+(?:уров\w+\s+)?"
+                             r"(?:зарплат\w*|заработн\w*|доход\w*|оплат\w*|з/п)[^\n]*"
+                             r"|(?:desired|expected)\s+salary[^\n]*|salary\s+expectations?[^\n]*")
+_MONEY_RE = re.compile(r"(\d{1,3}(?:[  ]\d{3})+|\d+(?:[.,]\d+)?)\s*(тыс\.?|к\b|k\b|000\b)?")
+_FOREIGN_CURRENCY_RE = re.compile(r"\$|usd|долл|€|eur|руб|rub|₽|тенге|kzt")
+
+# Ключевые слова в названии навыка вакансии → категория рубрики (порядок важен)
+_TITLE_RULES = tuple((category, re.compile(pattern)) for category, pattern in (
+    ("salary", r"зарплат|заработн|оклад|salary|kgs|% от продаж|% from sales|доход"),
+    ("course", r"тренинг|курс|training|семинар|course"),
+    ("driving_experience", r"стаж вождения|водительский стаж|опыт вождения|driving experience"),
+    ("license", r"права|водительск|licen|категори"),
+    ("sales_experience", r"продаж|sales|продав|торгов"),
+    ("service_experience", r"обслуживан|сервис|service"),
+    ("education", r"образован|education|вуз|колледж|лицей|школ|высшее|college|university"),
+    ("age", r"возраст|\bage\b"),
+    ("marital", r"семейн|женат|замуж|married|marital|холост|single"),
+))
+_NO_PREFERENCE_RE = re.compile(r"no preference|не важно|не имеет значения|любой|не указ|not specified")
+_NUMBER_RANGE_RE = re.compile(
+    r"(\d+(?:[.,]\d+)?)\s*(?:[-–—]|до|to)\s*(\d+(?:[.,]\d+)?)|(?:от|более|больше|from|over)\s*(\d+(?:[.,]\d+)?)"
+    r"|(\d+(?:[.,]\d+)?)\s*(?:\+|и более|и выше|or more)|(\d+(?:[.,]\d+)?)"
+)
+
+# Сопоставление уровня вакансии и кандидата (п. 2 инструкции)
+_SENIORITY_WORDS = {
+    2: ("senior", "старш", "ведущ", "lead", "head of"),
+    0: ("junior", "стажер", "стажёр", "без опыта", "intern", "начинающ", "trainee"),
+    1: ("middle",),
+}
+_SENIORITY_NAMES = {0: "junior", 1: "middle", 2: "senior"}
+SENIORITY_MATCH_MULTIPLIER = 0.9
+SENIORITY_BELOW_MULTIPLIER = 0.6
+SENIORITY_MISMATCH_MULTIPLIER = 0.5
+
+
+@dataclass
+class ResumeIndicators:
+    # None — упоминания есть, но стаж не посчитать (нет дат)
+    sales_years: float | None = 0.0
+    service_years: float | None = 0.0
+    total_years: float | None = None
+    education_level: int = 0
+    education_name: str | None = None
+    education_fields: set[str] = field(default_factory=set)
+    software: set[str] = field(default_factory=set)
+    knows_one_c: bool = False
+    courses: set[str] = field(default_factory=set)
+    license_categories: set[str] = field(default_factory=set)
+    license_mentioned: bool = False
+    driving_years: float | None = None
+    languages: set[str] = field(default_factory=set)
+    # Язык упомянут вне раздела о языках («Кыргызская Республика»): сами не решаем
+    languages_uncertain: bool = False
+    age: int | None = None
+    married: bool | None = None
+    salary: float | None = None
+    salary_percent: bool = False
+    # Строка о зарплате есть, но сумму в сомах прочитать не удалось
+    salary_uncertain: bool = False
+
+
+@dataclass
+class SkillScore:
+    title: str
+    category: str | None
+    level: int = 0
+    justification: str = ""
+    # False — решает LLM
+    confident: bool = False
+    # «No preference»: не входит в hard_total
+    ignored: bool = False
+
+    def as_skill(self) -> dict:
+        return {"title": self.title, "level": self.level, "justification": self.justification, "type": "HARD"}
+
+
+@dataclass
+class HardSkillScore:
+    skills: list[SkillScore]
+    multiplier: float
+    seniority_note: str
+
+    def unresolved_titles(self) -> list[str]:
+        return [s.title for s in self.skills if not s.confident and not s.ignored]
+
+    def merge(self, parsed: dict) -> dict:
+        """
+        Ответ LLM (оценки только по unresolved_titles) + оценки правил. hard_total —
+        среднее по всем навыкам вакансии, кроме «No preference», умноженное на коэффициент уровня.
+        Каждый навык, вошедший в среднее, есть и в skills — пропущенный моделью с уровнем 0.
+        """
+        llm_skills = [s for s in parsed.get("skills") or [] if isinstance(s, dict)]
+        remaining = list(llm_skills)
+        skills, levels, by_rules, by_llm = [], [], 0, 0
+        for score in self.skills:
+            if score.ignored:
+                continue
+            if score.confident:
+                skills.append(score.as_skill())
+                levels.append(score.level)
+                by_rules += 1
+                continue
+            match = _take_llm_skill(remaining, score.title)
+            if match is None:
+                # Модель пропустила навык: по рубрике «не найдено» — 0, и в списке навыков он тоже есть
+                skills.append({"title": score.title, "level": 0, "type": "HARD",
+                               "justification": "Не найдено в резюме: ни правила, ни модель не дали оценку."})
+                levels.append(0)
+                continue
+            skills.append({**match, "title": score.title, "type": "HARD"})
+            levels.append(float(match.get("level") or 0))
+            by_llm += 1
+
+        if not levels:
+            return {**parsed, "skills": skills or llm_skills}
+        total = round(sum(levels) / len(levels) * self.multiplier)
+        justification = f"{self.seniority_note} По правилам: {by_rules}, моделью: {by_llm}, не найдено: {len(levels) - by_rules - by_llm}."
+        llm_total = parsed.get("hard_total")
+        if by_llm and isinstance(llm_total, dict) and llm_total.get("justification"):
+            justification = f"{justification} {llm_total['justification']}"
+        return {**parsed, "skills": skills, "hard_total": {"total": total, "justification": justification}}
+
+
+def _take_llm_skill(skills: list[dict], title: str) -> dict | None:
+    key = title.casefold().strip()
+    for exact in (True, False):
+        for skill in skills:
+            other = str(skill.get("title", "")).casefold().strip()
+            if other == key or (not exact and other and (other in key or key in other)):
+                skills.remove(skill)
+                return skill
+    return None
+
+
+def _point_months(raw: str) -> tuple[int, bool] | None:
+    """(год*12 + месяц, указан ли месяц)"""
+    match = _POINT_MONTH_RE.search(raw)
+    if not match:
+        return None
+    year = int(match.group(3))
+    month = int(match.group(1)) if match.group(1) else _MONTHS.get((match.group(2) or "")[:3])
+    return year * 12 + (month or 1) - 1, month is not None
+
+
+def _merged_years(intervals: list[tuple[int, int]]) -> float:
+    months, end = 0, None
+    for start, stop in sorted(intervals):
+        if end is not None and start <= end:
+            if stop > end:
+                months += stop - end
+                end = stop
+            continue
+        months += stop - start
+        end = stop
+    return round(months / 12, 1)
+
+
+def _entries(lines: list[str]):
+    """
+    (совпадение диапазона дат, текст его записи, в разделе ли об образовании).
+    Запись — от строки с датами до следующей строки с датами или заголовка раздела,
+    чтобы слова соседних мест работы не попадали в чужую запись.
+    """
+    ranges = [list(_RANGE_RE.finditer(line)) if any(ch.isdigit() for ch in line) else [] for line in lines]
+    in_education = False
+    for i, matches in enumerate(ranges):
+        heading = _SECTION_HEADING_RE.match(lines[i])
+        if heading:
+            in_education = heading.group(0).startswith(_EDUCATION_HEADINGS)
+        # «2018–2020 Кассир; 2020–2022 Продавец» — текст после дат, иначе («Кассир, 2018–2020; ...») — до них
+        dates_first = bool(matches) and not lines[i][:matches[0].start()].strip(" •-–—:")
+        for k, match in enumerate(matches):
+            if dates_first:
+                segment = lines[i][match.start(): matches[k + 1].start() if k + 1 < len(matches) else None]
+            else:
+                segment = lines[i][matches[k - 1].end() if k else 0: match.end()]
+            block = [segment]
+            if k + 1 == len(matches):
+                if not dates_first:
+                    block.append(lines[i][match.end():])
+                for j in range(i + 1, len(lines)):
+                    if ranges[j] or _SECTION_HEADING_RE.match(lines[j]):
+                        break
+                    block.append(lines[j])
+            yield match, " ".join(block), in_education
+
+
+def _experience(lines: list[str], text: str, result: ResumeIndicators):
+    today = date.today()
+    now = today.year * 12 + today.month - 1
+    intervals: dict[str, list[tuple[int, int]]] = {"sales": [], "service": [], "total": []}
+    for match, context, in_education in _entries(lines):
+        start = _point_months(match.group("start"))
+        # «по настоящее время» года не содержит
+        end = _point_months(match.group("end")) or (now, True)
+        if start is None or end[0] < start[0] or end[0] > now + 1:
+            continue
+        if in_education or any(word in context for word in _EDUCATION_WORDS):
+            continue
+        # «2019–2021»: без месяцев — считаем по годам, минимум полгода
+        stop = end[0] + 1 if start[1] and end[1] else max(end[0], start[0] + 6)
+        interval = (start[0], stop)
+        intervals["total"].append(interval)
+        if any(word in context for word in _SALES_WORDS):
+            intervals["sales"].append(interval)
+        if any(word in context for word in _SERVICE_WORDS):
+            intervals["service"].append(interval)
+
+    if intervals["total"]:
+        result.total_years = _merged_years(intervals["total"])
+    for kind, words in (("sales", _SALES_WORDS), ("service", _SERVICE_WORDS)):
+        explicit = _EXPLICIT_YEARS[kind].search(text)
+        if explicit:
+            years = float((explicit.group(1) or explicit.group(2)).replace(",", "."))
+        elif intervals[kind]:
+            years = _merged_years(intervals[kind])
+        elif any(word in text for word in words):
+            years = None
+        else:
+            years = 0.0
+        setattr(result, f"{kind}_years", years)
+
+
+def _education(lines: list[str], result: ResumeIndicators):
+    # Только раздел об образовании: «Торговля» и «Институт» в местах работы не в счёт
+    context = set()
+    for i, line in enumerate(lines):
+        if any(word in line for word in _EDUCATION_WORDS):
+            context.update(range(i, min(i + 3, len(lines))))
+    text = "\n".join(lines[i] for i in sorted(context))
+    for level, name, words in _EDUCATION_LEVELS:
+        if any(word in text for word in words):
+            result.education_level, result.education_name = level, name
+            break
+    if result.education_level >= 2:
+        result.education_fields = {name for name, words in _EDUCATION_FIELDS.items()
+                                   if any(word in text for word in words)}
+
+
+def _licenses(lines: list[str], text: str, result: ResumeIndicators):
+    for line in lines:
+        if not any(word in line for word in _LICENSE_WORDS):
+            continue
+        for pattern in (_LICENSE_CATEGORY_RE, _LICENSE_RE):
+            for match in pattern.finditer(line):
+                cats = re.findall(r"[a-eавсде]", match.group("cats") or match.groupdict().get("latin") or "")
+                result.license_categories.update(cat.translate(_CYRILLIC_CATEGORIES).upper() for cat in cats)
+    result.license_mentioned = bool(result.license_categories) or "водительск" in text or "licen" in text
+    driving = _DRIVING_YEARS_RE.search(text)
+    if driving:
+        result.driving_years = float(driving.group(1).replace(",", "."))
+
+
+def _languages(lines: list[str], result: ResumeIndicators):
+    in_section = 0
+    for line in lines:
+        if _LANGUAGE_HEADER_RE.match(line):
+            in_section = 6
+            continue
+        found = {name for name, words in LANGUAGES.items() if any(word in line for word in words)}
+        if found:
+            if in_section or _LANGUAGE_CONTEXT_RE.search(line):
+                result.languages |= found
+            else:
+                result.languages_uncertain = True
+        if in_section:
+            in_section -= 1
+    if result.languages:
+        result.languages_uncertain = False
+
+
+def _age(lines: list[str], text: str, result: ResumeIndicators):
+    today = date.today()
+    birth = _BIRTH_RE.search(text)
+    if birth:
+        year = int(birth.group(3) or birth.group(4))
+        age = today.year - year
+        if birth.group(1) and (today.month, today.day) < (int(birth.group(2)), int(birth.group(1))):
+            age -= 1
+        if 14 <= age <= 80:
+            result.age = age
+            return
+    for line in lines[:HEADER_LINES]:
+        if any(word in line for word in _NOT_AGE_WORDS):
+            continue
+        for match in _AGE_RE.finditer(line):
+            age = int(match.group(1) or match.group(2))
+            if 14 <= age <= 80:
+                result.age = age
+                return
+
+
+def _salary(text: str, result: ResumeIndicators):
+    line = _SALARY_LINE_RE.search(text)
+    if not line:
+        return
+    raw = line.group(0)
+    if "%" in raw or "процент" in raw:
+        result.salary_percent = True
+    if _FOREIGN_CURRENCY_RE.search(raw):
+        result.salary_uncertain = True
+        return
+    for money in _MONEY_RE.finditer(raw):
+        value = float(re.sub(r"\s", "", money.group(1)).replace(",", "."))
+        if money.group(2) in ("тыс.", "тыс", "к", "k"):
+            value *= 1000
+        elif money.group(2) == "000":
+            value *= 1000
+        if value >= 1000:
+            result.salary = value
+            return
+    if not result.salary_percent:
+        result.salary_uncertain = True
+
+
+def extract_indicators(text: str) -> ResumeIndicators:
+    text = (text or "").lower().replace("ё", "е")
+    lines = [line.strip() for line in text.split("\n")]
+    result = ResumeIndicators()
+    _experience(lines, text, result)
+    _education(lines, result)
+    result.software = {name for name, words in SOFTWARE.items() if any(word in text for word in words)}
+    result.knows_one_c = bool(_ONE_C_RE.search(text))
+    for line in lines:
+        if _COURSE_MARKER_RE.search(line):
+            result.courses |= {name for name, words in COURSES.items() if any(word in line for word in words)}
+    _licenses(lines, text, result)
+    _languages(lines, result)
+    _age(lines, text, result)
+    if _SINGLE_RE.search(text):
+        result.married = False
+    elif _MARRIED_RE.search(text):
+        result.married = True
+    _salary(text, result)
+    return result
+
+
+def _required_range(title: str) -> tuple[float, float] | None:
+    match = _NUMBER_RANGE_RE.search(title.replace(" ", " "))
+    if not match:
+        return None
+    number = lambda raw: float(raw.replace(",", "."))  # noqa: E731
+    if match.group(1):
+        return number(match.group(1)), number(match.group(2))
+    if match.group(3) or match.group(4):
+        return number(match.group(3) or match.group(4)), float("inf")
+    return number(match.group(5)), number(match.group(5))
+
+
+def _categorize(title: str) -> str | None:
+    if any(word in title for words in SOFTWARE.values() for word in words) or _ONE_C_RE.search(title):
+        return "software"
+    if any(word in title for words in LANGUAGES.values() for word in words):
+        return "language"
+    for category, pattern in _TITLE_RULES:
+        if pattern.search(title):
+            return category
+    return None
+
+
+def _years_score(title: str, years: float | None, label: str) -> tuple[int, str, bool]:
+    if years is None:
+        return 0, f"{label}: упоминается, но стаж не указан", False
+    if years <= 0:
+        return 0, f"{label}: нет", True
+    required = _required_range(title)
+    if required is None or required[0] - 0.25 <= years <= required[1] + 0.5:
+        return 100, f"{label}: ~{years:g} г.", True
+    return 50, f"{label}: ~{years:g} г., требуется {_range_text(required)}", True
+
+
+def _range_text(required: tuple[float, float]) -> str:
+    lo, hi = required
+    if hi == float("inf"):
+        return f"от {lo:g}"
+    return f"{lo:g}" if lo == hi else f"{lo:g}–{hi:g}"
+
+
+def _score_skill(title: str, ind: ResumeIndicators) -> SkillScore:
+    key = title.lower().replace("ё", "е")
+    category = _categorize(key)
+    score = SkillScore(title=title, category=category)
+    if category is None:
+        return score
+    if category in ("age", "marital", "salary") and _NO_PREFERENCE_RE.search(key):
+        score.ignored = score.confident = True
+        return score
+
+    level, note, confident = 0, "", True
+    if category == "sales_experience":
+        level, note, confident = _years_score(key, ind.sales_years, "Опыт продаж")
+    elif category == "service_experience":
+        level, note, confident = _years_score(key, ind.service_years, "Опыт в сфере обслуживания")
+    elif category == "driving_experience":
+        if ind.driving_years is None:
+            level, note, confident = 0, "Стаж вождения не указан", not ind.license_mentioned
+        else:
+            level, note, confident = _years_score(key, ind.driving_years, "Стаж вождения")
+    elif category == "education":
+        level, note, confident = _education_score(key, ind)
+    elif category == "software":
+        wanted = {name for name, words in SOFTWARE.items() if any(word in key for word in words)}
+        if not wanted and _ONE_C_RE.search(key):
+            wanted = {"1С Торговля и склад"}
+        if wanted & ind.software:
+            level, note = 100, f"Указано: {', '.join(sorted(wanted & ind.software))}"
+        elif "1С Торговля и склад" in wanted and ind.knows_one_c:
+            level, note = 50, "Указан 1С без конфигурации «Торговля и склад»"
+        elif ind.software:
+            level, note = 50, f"Другие программы: {', '.join(sorted(ind.software))}"
+        else:
+            note = "Программы из списка не указаны"
+    elif category == "course":
+        wanted = {name for name, words in COURSES.items() if any(word in key for word in words)}
+        if wanted & ind.courses:
+            level, note = 100, f"Пройдено: {', '.join(sorted(wanted & ind.courses))}"
+        elif ind.courses:
+            level, note = 50, f"Другие тренинги: {', '.join(sorted(ind.courses))}"
+        else:
+            note = "Тренинги не указаны"
+    elif category == "license":
+        wanted = {cat.translate(_CYRILLIC_CATEGORIES).upper()
+                  for cat in re.findall(r"(?<![a-zа-я])[abcdeавсде](?![a-zа-я])", key)}
+        if ind.license_categories and (not wanted or wanted <= ind.license_categories):
+            level, note = 100, f"Категории: {', '.join(sorted(ind.license_categories))}"
+        elif ind.license_categories:
+            level, note = 50, f"Категории: {', '.join(sorted(ind.license_categories))}, требуется {', '.join(sorted(wanted))}"
+        else:
+            # «Есть права» без категории — пусть решает модель
+            note, confident = "Водительские права не указаны", not ind.license_mentioned
+    elif category == "language":
+        wanted = {name for name, words in LANGUAGES.items() if any(word in key for word in words)}
+        if wanted <= ind.languages:
+            level, note = 100, f"Языки: {', '.join(sorted(ind.languages))}"
+        elif ind.languages:
+            level, note = 50, f"Языки: {', '.join(sorted(ind.languages))}"
+        else:
+            note, confident = "Языки не указаны", not ind.languages_uncertain
+    elif category == "age":
+        required = _required_range(key)
+        if ind.age is None:
+            note = "Возраст не указан"
+        elif required is None or required[0] <= ind.age <= required[1]:
+            level, note = 100, f"Возраст: {ind.age}"
+        else:
+            level, note = 50, f"Возраст: {ind.age}, требуется {_range_text(required)}"
+    elif category == "marital":
+        wants_married = not re.search(r"холост|single|не\s+женат|не\s+замуж", key)
+        if ind.married is None:
+            note = "Семейное положение не указано"
+        elif ind.married == wants_married:
+            level, note = 100, "Женат/замужем" if ind.married else "Холост/не замужем"
+        else:
+            level, note = 50, "Женат/замужем" if ind.married else "Холост/не замужем"
+    elif category == "salary":
+        level, note, confident = _salary_score(key, ind)
+
+    score.level, score.justification, score.confident = level, note, confident
+    return score
+
+
+def _education_score(key: str, ind: ResumeIndicators) -> tuple[int, str, bool]:
+    if not ind.education_level:
+        return 0, "Образование не указано", True
+    wanted_level = next((level for level, _, words in _EDUCATION_LEVELS if any(word in key for word in words)), 0)
+    wanted_fields = {name for name, words in _EDUCATION_FIELDS.items() if any(word in key for word in words)}
+    note = f"Образование: {ind.education_name}"
+    if ind.education_fields:
+        note += f" ({', '.join(sorted(ind.education_fields))})"
+    if wanted_fields and ind.education_level >= 2 and not ind.education_fields:
+        # Направление по тексту не определить
+        return 0, note, False
+    if ind.education_level >= wanted_level and (not wanted_fields or wanted_fields & ind.education_fields):
+        return 100, note, True
+    return 50, note, True
+
+
+def _salary_score(key: str, ind: ResumeIndicators) -> tuple[int, str, bool]:
+    if ind.salary_uncertain:
+        return 0, "Ожидания по зарплате указаны не в сомах", False
+    if "%" in key or "процент" in key:
+        if ind.salary_percent:
+            return 100, "Согласен на % от продаж", True
+        return (50, f"Ожидания: {ind.salary:,.0f} KGS", True) if ind.salary else (0, "Ожидания не указаны", True)
+    if ind.salary is None:
+        return (50, "Ожидания: % от продаж", True) if ind.salary_percent else (0, "Ожидания не указаны", True)
+    required = _required_range(key.replace(" ", "").replace(",", ""))
+    if required is not None and required[1] < 1000:
+        # «30–40 тыс.»
+        required = (required[0] * 1000, required[1] * 1000)
+    if required is None or required[0] <= ind.salary <= required[1]:
+        return 100, f"Ожидания: {ind.salary:,.0f} KGS", True
+    return 50, f"Ожидания: {ind.salary:,.0f} KGS, вакансия: {_range_text(required)}", True
+
+
+def _seniority(requirements: str, ind: ResumeIndicators) -> tuple[float, str]:
+    text = (requirements or "").lower().replace("ё", "е")
+    wanted = next((level for level, words in _SENIORITY_WORDS.items() if any(word in text for word in words)), None)
+    if wanted is None:
+        return SENIORITY_MATCH_MULTIPLIER, f"Уровень в вакансии не указан (×{SENIORITY_MATCH_MULTIPLIER:g})."
+    years = max((y for y in (ind.total_years, ind.sales_years, ind.service_years) if y is not None), default=None)
+    if years is None:
+        return SENIORITY_MATCH_MULTIPLIER, (f"Вакансия {_SENIORITY_NAMES[wanted]}, стаж кандидата не определён "
+                                            f"(×{SENIORITY_MATCH_MULTIPLIER:g}).")
+    candidate = 0 if years < 1 else 1 if years < 4 else 2
+    gap = wanted - candidate
+    multiplier = (SENIORITY_MATCH_MULTIPLIER if gap <= 0 else
+                  SENIORITY_BELOW_MULTIPLIER if gap == 1 else SENIORITY_MISMATCH_MULTIPLIER)
+    return multiplier, (f"Вакансия {_SENIORITY_NAMES[wanted]}, кандидат {_SENIORITY_NAMES[candidate]} "
+                        f"(~{years:g} г.) (×{multiplier:g}).")
+
+
+def score_hard_skills(text: str, skill_titles: list[str], requirements: str) -> HardSkillScore:
+    indicators = extract_indicators(text)
+    multiplier, note = _seniority(requirements, indicators)
+    return HardSkillScore(
+        skills=[_score_skill(title, indicators) for title in skill_titles],
+        multiplier=multiplier,
+        seniority_note=note,
+    )
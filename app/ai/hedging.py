@@ -0,0 +1,155 @@
+"""
+Hedged LLM requests with failover between providers.
+
+The primary provider gets a head start. If it has not answered within a
+latency percentile of the primary's recent answers at the same call site,
+the same request also goes to the secondary provider. The samples are kept
+per site, not per model: one model serves prompts of very different sizes,
+and a short call site would otherwise pull the threshold of a long one
+down. They are measured from the start of the attempt, so they include
+the wait in the gateway queue, which the hedge timer also counts. An
+answer served from llm_cache without a model call is not a sample: cache
+hits would pull the threshold down to milliseconds. The first answer that
+passes validation wins and the other request is cancelled. If the primary
+fails or returns an invalid answer first, the secondary is started at once.
+
+Policies are set per call site in HEDGE_POLICIES. They can be overridden
+with the LLM_HEDGING env var, for example
+'{"analyze_resume": {"enabled": false}}'.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, TypeVar
+
+from app.ai.gateway import LLM_LATENCY_WINDOW
+from app.ai.telemetry import LLM_HEDGE_EVENTS, CallCounter, count_llm_calls
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    enabled: bool = True
+    percentile: float = 0.95
+    # Порог, пока у места вызова меньше min_samples ответов primary
+    default_delay: float = 20.0
+    min_delay: float = 3.0
+    max_delay: float = 60.0
+    min_samples: int = 20
+
+
+HEDGE_POLICIES: dict[str, HedgePolicy] = {
+    "analyze_resume": HedgePolicy(),
+}
+
+
+def _load_policies() -> dict[str, HedgePolicy]:
+    policies = dict(HEDGE_POLICIES)
+    raw = os.getenv("LLM_HEDGING")
+    if raw:
+        for site, overrides in json.loads(raw).items():
+            policies[site] = replace(policies.get(site, HedgePolicy()), **overrides)
+    return policies
+
+
+class HedgeFailed(ValueError):
+    """Ни один из провайдеров не дал валидного ответа."""
+
+    def __init__(self, site: str, errors: dict[str, BaseException]):
+        self.errors = errors
+        details = "; ".join(f"{name}: {type(e).__name__}: {e}" for name, e in errors.items())
+        super().__init__(f"All providers failed for {site}: {details}")
+
+
+class RequestHedger:
+    def __init__(self, policies: dict[str, HedgePolicy] | None = None):
+        self.policies = policies if policies is not None else _load_policies()
+        self.stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # site -> задержки primary в секундах
+        self.latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=LLM_LATENCY_WINDOW))
+
+    def _count(self, site: str, event: str):
+        self.stats[site][event] += 1
+        LLM_HEDGE_EVENTS.labels(site, event).inc()
+
+    def policy(self, site: str) -> HedgePolicy:
+        return self.policies.get(site, HedgePolicy(enabled=False))
+
+    def snapshot(self) -> dict:
+        """calls, hedged (сработал порог), failover (primary упал), primary_wins, secondary_wins, failed."""
+        return {site: dict(counters) for site, counters in self.stats.items()}
+
+    def threshold(self, site: str) -> float:
+        policy = self.policy(site)
+        samples = self.latencies.get(site)
+        if samples is not None and len(samples) >= max(1, policy.min_samples):
+            ordered = sorted(samples)
+            delay = ordered[min(len(ordered) - 1, int(policy.percentile * len(ordered)))]
+        else:
+            delay = policy.default_delay
+        return min(policy.max_delay, max(policy.min_delay, delay))
+
+    async def run(self, site: str, primary: Callable[[], Awaitable[T]], secondary: Callable[[], Awaitable[T]],
+                  validate: Callable[[T], object] | None = None) -> T:
+        """
+        primary/secondary — фабрики корутин одного и того же запроса у разных провайдеров.
+        validate(result) бросает исключение для ответа, который нельзя вернуть.
+        """
+        self._count(site, "calls")
+        if not self.policy(site).enabled:
+            return await primary()
+
+        # Каждая попытка — своя задача со своим счётчиком ответов модели
+        reached: dict[str, CallCounter] = {}
+
+        async def attempt(name, factory):
+            with count_llm_calls() as calls:
+                reached[name] = calls
+                result = await factory()
+            if validate is not None:
+                validate(result)
+            return result
+
+        started = time.monotonic()
+        tasks = {asyncio.create_task(attempt("primary", primary)): "primary"}
+        errors: dict[str, BaseException] = {}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.threshold(site))
+            if not done:
+                self._count(site, "hedged")
+                logger.info(f"⏱️ {site}: no primary answer after {time.monotonic() - started:.1f}s, hedging")
+                tasks[asyncio.create_task(attempt("secondary", secondary))] = "secondary"
+
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        if (name == "primary" and reached["primary"].ok) or "primary" in tasks.values():
+                            # Задержка primary; если он ещё не ответил — не меньше прошедшего времени,
+                            # иначе медленные ответы выпадали бы из выборки и порог полз вниз.
+                            # Ответ primary из llm_cache (модель не вызывалась) в выборку не идёт
+                            self.latencies[site].append(time.monotonic() - started)
+                        self._count(site, f"{name}_wins")
+                        return task.result()
+                    errors[name] = task.exception()
+                    logger.warning(f"⚠️ {site}: {name} failed: {type(errors[name]).__name__}: {errors[name]}")
+                if "secondary" not in errors and "secondary" not in tasks.values():
+                    self._count(site, "failover")
+                    tasks[asyncio.create_task(attempt("secondary", secondary))] = "secondary"
+            self._count(site, "failed")
+            raise HedgeFailed(site, errors)
+        finally:
+            # Проигравший запрос больше не нужен
+            for task in tasks:
+                task.cancel()
+
+
+request_hedger = RequestHedger()
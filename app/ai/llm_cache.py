@@ -0,0 +1,229 @@
+"""
+Two-tier cache of LLM responses.
+
+Entries are keyed on (model, system instruction hash, prompt hash, response
+schema hash), so a byte-identical request never goes to the model twice:
+an in-process LRU answers repeats on the same instance, and the llm_cache
+table shares results across Cloud Run instances. Both tiers expire entries
+after a TTL; the table is also pruned to LLM_CACHE_DB_MAX_ENTRIES by last hit.
+Only responses that pass the caller's validation are stored, and a failing
+persistent tier never fails the LLM call itself.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import AsyncSessionLocal
+from app.models.llm_cache import LLMCacheEntry
+from app.ai.telemetry import LLM_CACHE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "2000"))
+LLM_CACHE_DB_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "50000"))
+# Чистим таблицу раз в столько записей, а не на каждую
+LLM_CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", "200"))
+
+
+def digest(value) -> str:
+    if value is None:
+        value = ""
+    elif hasattr(value, "model_dump_json"):
+        # google.genai types (Schema, Content, ...) — pydantic-модели
+        value = value.model_dump_json(exclude_none=True)
+    elif not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def make_key(model: str, system_instruction, prompt, schema=None) -> str:
+    """
+    schema — всё, что определяет формат ответа: response_schema, mime type,
+    параметры генерации. Передаётся как один объект/кортеж.
+    """
+    return key_from_digests(model, digest(system_instruction), digest(prompt), digest(schema))
+
+
+def key_from_digests(model: str, instruction_digest: str, prompt_digest: str, schema_digest: str) -> str:
+    """make_key для заранее посчитанных дайджестов статичных частей (см. task_configs.py)."""
+    return hashlib.sha256("|".join((model, instruction_digest, prompt_digest, schema_digest)).encode("utf-8")).hexdigest()
+
+
+class _MemoryTier:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int | None = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LLMCache:
+    def __init__(self, enabled: bool = LLM_CACHE_ENABLED, ttl: int = LLM_CACHE_TTL_SECONDS,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES, db_max_entries: int = LLM_CACHE_DB_MAX_ENTRIES):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.db_max_entries = db_max_entries
+        self.memory = _MemoryTier(memory_entries, ttl)
+        self.stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._writes = 0
+
+    def _count(self, task: str, event: str):
+        self.stats[task][event] += 1
+        LLM_CACHE_EVENTS.labels(task, event).inc()
+
+    def snapshot(self) -> dict:
+        """Счётчики по задачам: memory_hits, db_hits, misses, writes, errors."""
+        return {
+            "memory_entries": len(self.memory),
+            "tasks": {task: dict(counters) for task, counters in self.stats.items()},
+        }
+
+    async def _db_get(self, key: str, task: str) -> str | None:
+        try:
+            async with AsyncSessionLocal() as db:
+                now = datetime.now(timezone.utc)
+                entry = await db.scalar(
+                    select(LLMCacheEntry).where(LLMCacheEntry.key == key, LLMCacheEntry.expires_at > now)
+                )
+                if entry is None:
+                    return None
+                await db.execute(
+                    update(LLMCacheEntry)
+                    .where(LLMCacheEntry.key == key)
+                    .values(hits=LLMCacheEntry.hits + 1, last_hit_at=now)
+                )
+                await db.commit()
+                return entry.response
+        except Exception as e:
+            self._count(task, "errors")
+            logger.warning(f"LLM cache read failed ({task}): {e}")
+            return None
+
+    async def _db_set(self, key: str, task: str, model: str, value: str, ttl: int) -> bool:
+        """True — запись дошла до БД; ошибка считается в errors и не мешает вернуть ответ."""
+        try:
+            async with AsyncSessionLocal() as db:
+                now = datetime.now(timezone.utc)
+                values = dict(key=key, task=task, model=model, response=value, hits=0,
+                              created_at=now, last_hit_at=now, expires_at=now + timedelta(seconds=ttl))
+                insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+                stmt = insert(LLMCacheEntry).values(**values)
+                # Гонка двух инстансов за один ключ — побеждает последняя запись, ответ тот же
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[LLMCacheEntry.key],
+                    set_={"response": value, "expires_at": values["expires_at"], "last_hit_at": now},
+                )
+                await db.execute(stmt)
+                await db.commit()
+        except Exception as e:
+            self._count(task, "errors")
+            logger.warning(f"LLM cache write failed ({task}): {e}")
+            return False
+        self._writes += 1
+        if self._writes % LLM_CACHE_PRUNE_EVERY == 0:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.warning(f"LLM cache prune failed: {e}")
+        return True
+
+    async def prune(self):
+        """Удаляет просроченные записи и самые давно не использованные сверх лимита."""
+        async with AsyncSessionLocal() as db:
+            now = datetime.now(timezone.utc)
+            expired = await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now))
+            total = await db.scalar(select(func.count()).select_from(LLMCacheEntry))
+            evicted = 0
+            if total > self.db_max_entries:
+                oldest = select(LLMCacheEntry.key).order_by(LLMCacheEntry.last_hit_at).limit(total - self.db_max_entries)
+                result = await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+                evicted = result.rowcount
+            await db.commit()
+        logger.info(f"🧹 LLM cache pruned: {expired.rowcount} expired, {evicted} evicted")
+
+    async def get_or_generate(self, task: str, key: str, model: str, generate: Callable[[], Awaitable[str]],
+                              validate: Callable[[str], object] | None = None, ttl: int | None = None) -> str:
+        """
+        Возвращает закэшированный ответ или вызывает generate(). Одинаковые запросы,
+        пришедшие одновременно, ждут один вызов модели. validate(text) должен бросить
+        исключение для ответа, который нельзя кэшировать.
+        """
+        if not self.enabled:
+            return await generate()
+
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(task, "memory_hits")
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # Отменили того, кто вызывал модель, а не нас — пробуем сами
+                return await self.get_or_generate(task, key, model, generate, validate, ttl)
+            self._count(task, "memory_hits")
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._db_get(key, task)
+            if value is not None:
+                self._count(task, "db_hits")
+            else:
+                self._count(task, "misses")
+                value = await generate()
+                if validate is not None:
+                    validate(value)
+                if await self._db_set(key, task, model, value, ttl or self.ttl):
+                    self._count(task, "writes")
+            self.memory.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # ожидающих может не быть — не логируем "never retrieved"
+            raise
+        finally:
+            del self._inflight[key]
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,176 @@
+"""
+Prompt overrides per profession, loaded from the prompt table.
+
+The built-in instructions in analyzer.py and social_analyzer.py are the
+defaults. A row in the prompt table replaces them for one profession:
+prompt_for_cv replaces the analyze_resume instruction and prompt_for_media
+replaces the analyze_social instruction.
+
+At startup all rows are loaded once. For every override the module that owns
+the prompt builds a TaskConfig (schema, GenerateContentConfig, cache key
+digests). The TaskConfigs go into an immutable snapshot, so a lookup on the
+request path is a dict lookup with no DB query and no config building.
+
+Every PROMPT_REGISTRY_POLL_SECONDS the registry reads the table's version
+stamp, which is (row count, max(version)). When the stamp changes, it builds
+a new snapshot and swaps it in. PromptService.upsert_prompt bumps version.
+A row edited by hand needs a version above the current max.
+
+Operators can also run:
+
+    python -m app.ai.prompt_registry list
+    python -m app.ai.prompt_registry set salesman --media-file seller.txt
+    python -m app.ai.prompt_registry delete salesman
+"""
+import os
+import time
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+from app.database import AsyncSessionLocal
+from app.services.prompt_services import PromptService
+from app.ai.task_configs import TaskConfig
+
+logger = logging.getLogger(__name__)
+
+PROMPT_REGISTRY_ENABLED = os.getenv("PROMPT_REGISTRY_ENABLED", "true").lower() == "true"
+PROMPT_REGISTRY_POLL_SECONDS = float(os.getenv("PROMPT_REGISTRY_POLL_SECONDS", "30"))
+
+# Вид промпта -> колонка таблицы prompt
+PROMPT_KINDS = {"cv": "prompt_for_cv", "media": "prompt_for_media"}
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    stamp: tuple[int, int] | None = None
+    # (вид, профессия) -> готовый TaskConfig
+    tasks: Mapping[tuple[str, str], TaskConfig] = field(default_factory=lambda: MappingProxyType({}))
+    loaded_at: float = 0.0
+
+
+class PromptRegistry:
+    def __init__(self, enabled: bool = PROMPT_REGISTRY_ENABLED, poll_interval: float = PROMPT_REGISTRY_POLL_SECONDS):
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self._builders: dict[str, Callable[[str, str], TaskConfig]] = {}
+        self._snapshot = PromptSnapshot()
+        self._poller: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self.stats = {"loads": 0, "polls": 0, "errors": 0}
+
+    def register_builder(self, kind: str, build: Callable[[str, str], TaskConfig]):
+        """build(profession, instruction) собирает TaskConfig для переопределённого промпта."""
+        if kind not in PROMPT_KINDS:
+            raise ValueError(f"Unknown prompt kind: {kind}")
+        self._builders[kind] = build
+
+    def task(self, kind: str, profession: str | None) -> TaskConfig | None:
+        """Переопределение из таблицы или None — тогда вызывающий берёт встроенную задачу."""
+        if profession is None:
+            return None
+        return self._snapshot.tasks.get((kind, profession))
+
+    def snapshot(self) -> dict:
+        return {
+            "stamp": self._snapshot.stamp,
+            "overrides": sorted(f"{kind}/{profession}" for kind, profession in self._snapshot.tasks),
+            **self.stats,
+        }
+
+    def _build(self, prompts) -> dict[tuple[str, str], TaskConfig]:
+        tasks = {}
+        for prompt in prompts:
+            for kind, build in self._builders.items():
+                instruction = getattr(prompt, PROMPT_KINDS[kind])
+                if not instruction or not instruction.strip():
+                    continue
+                try:
+                    tasks[(kind, prompt.profession_title)] = build(prompt.profession_title, instruction)
+                except Exception as e:
+                    # Одна битая строка не должна откатывать остальные промпты к встроенным
+                    logger.error(f"❌ Prompt {kind}/{prompt.profession_title} skipped: {type(e).__name__}: {e}")
+        return tasks
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Перечитывает таблицу, если изменился штамп версии. True — снимок заменён."""
+        if not self.enabled:
+            return False
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                service = PromptService(db)
+                stamp = await service.version_stamp()
+                if stamp == self._snapshot.stamp and not force:
+                    return False
+                prompts = await service.list_prompts()
+            # Штамп прочитан до строк: изменение между запросами подхватит следующий опрос
+            self._snapshot = PromptSnapshot(stamp, MappingProxyType(self._build(prompts)), time.monotonic())
+            self.stats["loads"] += 1
+        logger.info(f"📝 Prompt registry loaded version {stamp}: {len(self._snapshot.tasks)} overrides")
+        return True
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.stats["polls"] += 1
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Prompt registry poll failed, keeping version {self._snapshot.stamp}: {e}")
+
+    async def start(self):
+        if not self.enabled:
+            return
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            # Без таблицы работаем на встроенных промптах, опрос попробует снова
+            self.stats["errors"] += 1
+            logger.warning(f"Prompt registry initial load failed, using built-in prompts: {e}")
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+
+prompt_registry = PromptRegistry()
+
+
+async def _cli(args):
+    async with AsyncSessionLocal() as db:
+        service = PromptService(db)
+        if args.command == "list":
+            for prompt in await service.list_prompts():
+                print(f"{prompt.profession_title}: version {prompt.version}, "
+                      f"cv {len(prompt.prompt_for_cv or '')} chars, media {len(prompt.prompt_for_media or '')} chars")
+        elif args.command == "set":
+            read = lambda path: open(path, encoding="utf-8").read() if path else None
+            prompt = await service.upsert_prompt(args.profession, read(args.cv_file), read(args.media_file))
+            print(f"{prompt.profession_title}: version {prompt.version}")
+        elif args.command == "delete":
+            print("deleted" if await service.delete_prompt(args.profession) else "not found")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt overrides in the prompt table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    set_parser = commands.add_parser("set")
+    set_parser.add_argument("profession")
+    set_parser.add_argument("--cv-file", help="analyze_resume instruction; an empty file restores the built-in one")
+    set_parser.add_argument("--media-file", help="analyze_social instruction; an empty file restores the built-in one")
+    delete_parser = commands.add_parser("delete")
+    delete_parser.add_argument("profession")
+    asyncio.run(_cli(parser.parse_args()))
@@ -0,0 +1,218 @@
+"""
+Record/replay harness for the external calls of the resume pipeline.
+
+This makes it possible to measure throughput and latency of the pipeline
+offline. It covers client.aio.models.generate_content and
+chat.completions.create (through the gateway) and the BrightData HTTP calls
+(through an httpx transport).
+
+- REPLAY_MODE=record makes the real calls and writes every request/response
+  pair to REPLAY_DIR.
+- REPLAY_MODE=replay serves the responses from the fixtures and makes no
+  network calls.
+
+Recorded fixtures contain the resume text, the candidates' emails and
+phone numbers and their scraped social-media profiles, all in plain JSON.
+The default REPLAY_DIR, fixtures/replay, is listed in .gitignore and
+.dockerignore. A recording made anywhere else must be kept out of version
+control and images the same way, and deleted when the benchmark is done.
+
+A fixture file holds every response recorded for one request key, in order.
+Repeated identical requests, such as BrightData progress polls, get them
+back in the same order, and the last response repeats. In replay mode each
+response is delayed synthetically:
+
+- REPLAY_LATENCY=recorded (the default) uses the recorded latency.
+- REPLAY_LATENCY=<seconds> uses a fixed delay.
+
+Either delay is multiplied by REPLAY_LATENCY_SCALE. Replayed LLM calls still
+go through the gateway queue, its limits and telemetry. The Gemini context
+cache is bypassed, so fixtures are keyed on the original config.
+"""
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODE = os.getenv("REPLAY_MODE", "off").lower()
+REPLAY_DIR = os.getenv("REPLAY_DIR", "fixtures/replay")
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "recorded")
+REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "1.0"))
+
+# Не попадают ни в ключ, ни в фикстуру
+_SECRET_HEADERS = {"authorization", "x-goog-api-key", "api-key", "cookie"}
+# Тело ответа сохраняется уже раскодированным
+_DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+
+class ReplayMiss(LookupError):
+    """Для запроса нет записанной фикстуры."""
+
+
+def _canonical(value):
+    if hasattr(value, "model_dump"):
+        # google.genai types и ответы openai — pydantic-модели
+        return _canonical(value.model_dump(mode="json", exclude_none=True))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    return value
+
+
+def fixture_key(kind: str, *parts) -> str:
+    payload = json.dumps([kind, *_canonical(list(parts))], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayHarness:
+    def __init__(self, mode: str = REPLAY_MODE, directory: str = REPLAY_DIR, latency: str = REPLAY_LATENCY,
+                 latency_scale: float = REPLAY_LATENCY_SCALE):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"REPLAY_MODE must be off, record or replay, got {mode!r}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._fixtures: dict[str, dict] = {}
+        self._cursors: dict[str, int] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode != "off":
+            logger.info(f"🎞️ Replay harness in {mode} mode, fixtures in {self.directory}")
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def snapshot(self) -> dict:
+        return {"mode": self.mode, "fixtures": len(self._fixtures), **self.stats}
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.directory / kind / f"{key}.json"
+
+    def _load(self, kind: str, key: str) -> dict | None:
+        fixture = self._fixtures.get(key)
+        if fixture is None:
+            path = self._path(kind, key)
+            if not path.exists():
+                return None
+            fixture = self._fixtures[key] = json.loads(path.read_text(encoding="utf-8"))
+        return fixture
+
+    def _delay(self, recorded: float) -> float:
+        delay = recorded if self.latency == "recorded" else float(self.latency)
+        return max(0.0, delay * self.latency_scale)
+
+    async def _record(self, kind: str, key: str, request: dict, response: dict, seconds: float):
+        fixture = self._fixtures.get(key)
+        if fixture is None:
+            # Первая запись ключа за этот прогон заменяет старую последовательность
+            fixture = self._fixtures[key] = {"kind": kind, "request": request, "responses": []}
+        fixture["responses"].append({"seconds": round(seconds, 3), "response": response})
+        path = self._path(kind, key)
+        body = json.dumps(fixture, ensure_ascii=False, indent=2)
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(body, encoding="utf-8")
+
+        await asyncio.to_thread(write)
+        self.stats["recorded"] += 1
+
+    async def _replay(self, kind: str, key: str, request: dict) -> dict:
+        fixture = self._load(kind, key)
+        if fixture is None or not fixture["responses"]:
+            self.stats["misses"] += 1
+            raise ReplayMiss(f"No {kind} fixture for {request} (key {key[:12]}) in {self.directory}")
+        index = self._cursors.get(key, 0)
+        self._cursors[key] = index + 1
+        entry = fixture["responses"][min(index, len(fixture["responses"]) - 1)]
+        await asyncio.sleep(self._delay(entry["seconds"]))
+        self.stats["replayed"] += 1
+        return entry["response"]
+
+    def wrap(self, kind: str, key: str | None, request: dict, invoke: Callable[[], Awaitable], response_type):
+        """
+        invoke() с записью или воспроизведением. response_type — pydantic-класс ответа
+        (GenerateContentResponse, ChatCompletion), из которого собирается ответ при воспроизведении.
+        """
+        if key is None or not self.active:
+            return invoke
+
+        if self.replaying:
+            async def replay():
+                return response_type.model_validate(await self._replay(kind, key, request))
+            return replay
+
+        async def record():
+            started = time.monotonic()
+            response = await invoke()
+            await self._record(kind, key, request, response.model_dump(mode="json", exclude_none=True),
+                               time.monotonic() - started)
+            return response
+        return record
+
+    def http_transport(self, kind: str) -> httpx.AsyncBaseTransport | None:
+        """Транспорт для httpx.AsyncClient; None — обычный сетевой транспорт."""
+        return ReplayTransport(self, kind) if self.active else None
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, harness: ReplayHarness, kind: str, transport: httpx.AsyncBaseTransport | None = None):
+        self.harness = harness
+        self.kind = kind
+        self._transport = transport
+
+    @property
+    def transport(self) -> httpx.AsyncBaseTransport:
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport()
+        return self._transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = fixture_key(self.kind, request.method, str(request.url), body)
+        summary = {"method": request.method, "url": str(request.url)}
+
+        if self.harness.replaying:
+            recorded = await self.harness._replay(self.kind, key, summary)
+            content = (base64.b64decode(recorded["content"]) if recorded.get("base64")
+                       else recorded["content"].encode("utf-8"))
+            return httpx.Response(recorded["status"], headers=recorded["headers"], content=content, request=request)
+
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        headers = [(name, value) for name, value in response.headers.multi_items()
+                   if name.lower() not in _DROPPED_RESPONSE_HEADERS | _SECRET_HEADERS]
+        try:
+            recorded = {"content": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            recorded = {"content": base64.b64encode(content).decode("ascii"), "base64": True}
+        await self.harness._record(self.kind, key, summary,
+                                   {"status": response.status_code, "headers": headers, **recorded},
+                                   time.monotonic() - started)
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self):
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+replay_harness = ReplayHarness()
@@ -12,13 +12,17 @@ from typing import Dict
 logger = logging.getLogger(__name__)
 load_dotenv()
 import asyncio
-import httpx
+from dataclasses import replace
+from app.ai.llm_cache import llm_cache
+from app.ai.brightdata import brightdata_client
+from app.ai.prompt_registry import prompt_registry
+from app.ai.task_configs import TaskConfig, build_task_config, register_task
+from app.ai.contact_extractor import (
+    SOCIAL_PLATFORMS, extract_contacts, extract_social_links, has_unresolved_social,
+)
+from app.ai.soft_skill_engine import SOFT_SKILL_ENGINE_ENABLED, SoftSkillProfile, score_text
 
 
-client = genai.Client(
-        api_key=os.environ.get("GEMINI_API_KEY"),
-    )
-
 SELLER_INSTRUCTION = """
 You are an expert Occupational Psychologist and HR Analyst specializing in evaluating candidates for SALES roles using scraped social-media text data.
 Your task is to compute quantitative metrics for both SOFT and HARD skills based strictly on predefined patterns, symbols, and semantic synonyms, then output a structured JSON summary.
@@ -112,175 +116,28 @@ Important:
 
 """        
 
-async def extract_social_media_links_json(text):
-    """Extracts social media profile links from text."""
-    social_media_patterns = {
-        "facebook": r"(?:https?:\/\/)?(?:www\.)?facebook\.com\/[A-Za-z0-9_\-\.]+/?",
-        "twitter": r"(?:https?:\/\/)?(?:www\.)?(?:x\.com|twitter\.com)\/[A-Za-z0-9_]+/?",
-        "instagram": r"(?:https?:\/\/)?(?:www\.)?instagram\.com\/[A-Za-z0-9_\-\.]+/?",
-        "linkedin": r"(?:https?:\/\/)?(?:www\.)?linkedin\.com\/(?:in|company)\/[a-zA-Z0-9\-]+(?:-[a-zA-Z0-9]+)*\/?",
-    }
-
-    social_media_links = {}
-    for platform, pattern in social_media_patterns.items():
-       
-        matches = re.findall(pattern, text, re.IGNORECASE) 
-        if matches:
-         
-            link = matches[0].rstrip('/')
-            social_media_links[platform] = link
-
-    return social_media_links
-
-
-
-async def process_platform(platform, link, dataset_id_map, api_key, bucket_name, max_retries=3):
-    summary = ""
-    if platform not in dataset_id_map:
-        return f"  -> Warning: No dataset_id configured for platform '{platform}'. Skipping.\n"
-    
-    current_dataset_id = dataset_id_map[platform]
-    input_data = [{"url": link}]
-    trigger_payload = {
-        "deliver": {
-            "type": "s3",
-            "filename": {"template": f"{platform}_{{[snapshot_id]}}", "extension": "json"},
-            "bucket": bucket_name,
-            "directory": ""
-        },
-        "input": input_data,
-    }
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    for attempt in range(1, max_retries + 1):
-        async with httpx.AsyncClient() as client:
-            try:
-                print(f"     Attempt {attempt} for {platform}")
-                # Step 1: Trigger
-                trigger_response = await client.post(
-                    "https://api.brightdata.com/datasets/v3/trigger",
-                    headers=headers,
-                    params={"dataset_id": current_dataset_id, "include_errors": "true"},
-                    json=trigger_payload
-                )
-                trigger_response.raise_for_status()
-                snapshot_id = trigger_response.json().get("snapshot_id")
-
-                if not snapshot_id:
-                    raise ValueError("Missing snapshot_id in trigger response")
-
-                # Step 2: Polling
-                while True:
-                    progress_response = await client.get(
-                        f"https://api.brightdata.com/datasets/v3/progress/{snapshot_id}",
-                        headers={"Authorization": f"Bearer {api_key}"}
-                    )
-                    progress_response.raise_for_status()
-                    status = progress_response.json().get("status", "unknown")
-
-                    if status == "ready":
-                        result_response = await client.get(
-                            f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}",
-                            headers={"Authorization": f"Bearer {api_key}"},
-                            params={"format": "json", "batch_size": 1500}
-                        )
-                        result_response.raise_for_status()
-                        json_data = result_response.json()
-
-                        if not json_data:
-                            return f"{platform}: Empty result."
-
-                        cleaned_data = {
-                            key: (value[:3] if isinstance(value, list) and value else value)
-                            for key, value in json_data[0].items()
-                        }
-                        summary += f"\"{platform}\": " + json.dumps(cleaned_data, ensure_ascii=False, indent=4) + "\n"
-                        print(f"     Finished for {platform}")
-                        return summary
-
-                    elif status in ["failed", "unknown"]:
-                        raise RuntimeError(f"Status for {platform} is '{status}'")
-
-                    else:
-                        print(f"     Waiting on {platform}...")
-                        await asyncio.sleep(5)
-
-            except Exception as e:
-                print(f"     [Attempt {attempt}] Error for {platform}: {e}")
-                if attempt < max_retries:
-                    await asyncio.sleep(3)  # маленький бэкофф
-                    continue
-                else:
-                    return f"{platform}: Failed after {max_retries} attempts. Last error: {str(e)}"
-
-
-
 async def social_network_analyzer(text_to_extract):
-    dataset_id_map = {
-        "instagram": "gd_l1vikfch901nx3by4",
-        "linkedin": "gd_l1viktl72bvl7bjuj0",
-        "facebook": "gd_lkaxegm826bjpoo9m5",
-        "twitter": "gd_lwxmeb2u1cniijd7t4",
-    }
-
-    BRIGHTDATA_API_KEY = "a4efab41810a0eb500d4ea1f4319e0845623c5b5340fe9f15e75c78ba9df8de4"
-    S3_BUCKET_NAME = "start_up"
-
-    extracted_links = await extract_social_media_links_ai(text_to_extract)
+    extracted_links = extract_social_links(text_to_extract)
+    if has_unresolved_social(text_to_extract, extracted_links):
+        # Соцсеть упомянута, но ссылку регулярками не разобрали — спрашиваем модель
+        try:
+            ai_links = (await extract_contacts_ai(text_to_extract))["social_links"]
+        except Exception as e:
+            print(f"Ошибка при извлечении ссылок через AI: {e}")
+            ai_links = {}
+        for platform, link in ai_links.items():
+            extracted_links.setdefault(platform, link)
     if not extracted_links:
         return "No social media links found."
-    tasks = [
-        process_platform(platform, link, dataset_id_map, BRIGHTDATA_API_KEY, S3_BUCKET_NAME)
-        for platform, link in extracted_links.items()
-    ]
-
-    results = await asyncio.gather(*tasks)
-    return "\n".join(results)
-
-async def extract_social_media_links_ai(text: str) -> Dict[str, str]:
-    prompt = f"""
-You are a smart AI that extracts social media profile links from text. Return a JSON dictionary with keys as platforms (facebook, instagram, linkedin, x) and values as the first URL found in the text for each platform (if any).
-
-If a link is not found for a platform, do not include that key.
-
-Example format:
-{{
-  "linkedin": "https://linkedin.com/in/example",
-  "x": "https://x.com/example",
-  "instagram":"https://instagram.com/example"
-  "facebook":"https://facebook.com/example"
-}}
+    # Все платформы опрашиваются одним циклом через общий клиент (см. brightdata.py)
+    results = await brightdata_client.scrape(extracted_links)
+    return "\n".join(results.values())
 
-Return a JSON dictionary where keys are lowercase platform names: "facebook", "x", "instagram", "linkedin".
+ANALYZE_SURVEY_TASK = register_task(
+    "analyze_survey",
+    lambda: build_task_config("gemini-2.0-flash", temperature=0.4, response_mime_type="text/plain"),
+)
 
-Values must be full URLs starting with **https://** and without a trailing slash.
-
-
-Text:
-{text}
-"""
-
-    try:
-        response = await client.aio.models.generate_content(
-            model="gemini-1.5-flash-8b",
-            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
-            config=types.GenerateContentConfig(
-                temperature=0.2,
-                response_mime_type="application/json"
-            )
-        )
-
-        # Преобразуем результат в словарь
-        import json
-        return json.loads(response.text)
-
-    except Exception as e:
-        print(f"Ошибка при извлечении ссылок через AI: {e}")
-        return {}
 
 async def analyze_survey(metodology: str,result:float) -> str:
     prompt = f"""
@@ -289,16 +146,8 @@ METHODOLOGY:
 {metodology}
 """
 
-    model = "gemini-2.0-flash"
     try:
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])] ,
-            config=types.GenerateContentConfig(
-                temperature=0.4,
-                response_mime_type="text/plain"
-            ),
-        )
+        response = await ANALYZE_SURVEY_TASK.generate(prompt)
 
         # Извлекаем ответ
         text = response.text
@@ -307,6 +156,12 @@ METHODOLOGY:
         print(f"Error in metodology analysis: {e}")
         return "sorry don't have any analyze"  # fallback на дефолт
 
+ANALYZE_PROFESSION_TASK = register_task(
+    "analyze_profession",
+    lambda: build_task_config("gemini-2.0-flash", temperature=0.1, response_mime_type="text/plain"),
+)
+
+
 async def analyze_proffesion(title: str, description: str, requirement: str) -> str:
     prompt = f"""
 You are an HR expert. Given the job title, description, and requirements, classify the job into one of the following categories:
@@ -323,19 +178,19 @@ Description: {description}
 Requirements: {requirement}
 """
 
-    model = "gemini-2.0-flash"
+    task = ANALYZE_PROFESSION_TASK
+
+    async def _generate() -> str:
+        response = await task.generate(prompt)
+        return response.text
+
     try:
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])] ,
-            config=types.GenerateContentConfig(
-                temperature=0.1,
-                response_mime_type="text/plain"
-            ),
+        text = await llm_cache.get_or_generate(
+            "analyze_profession", task.cache_key(prompt), task.model, _generate,
         )
 
         # Извлекаем ответ
-        text = response.text.strip().lower()
+        text = text.strip().lower()
         # allowed = {"it", "salesman", "manager","salesman of it-product"}
         allowed = {"salesman"}
 
@@ -351,76 +206,86 @@ Requirements: {requirement}
         return "salesman"  # fallback на дефолт
 
      
-async def extract_emails_from_resume(pdf_info: str):
-    model = "gemini-2.0-flash"
-
-    system_instruction = """
-You are an AI assistant helping a recruiter extract email addresses from a candidate's resume. Your task is to find:
+CONTACTS_MODEL = "gemini-2.0-flash"
+CONTACTS_SYSTEM_INSTRUCTION = """
+You are an AI assistant helping a recruiter extract contacts from a candidate's resume. Your task is to find:
 1. The candidate's personal email address.
 2. A list of email addresses that appear to belong to employers (e.g., company domains, HR contacts, supervisors).
+3. The candidate's social media profile links: the first URL found for each platform — facebook, instagram, linkedin, x (twitter.com links go to "x").
 
 Rules:
 - If multiple personal emails are found, choose the one that clearly belongs to the candidate.
 - For employer emails, return a list of unique company-related email addresses.
 - If no data is found, return null for the personal email and an empty list for employers.
+- Omit platforms without a link. URLs must start with https:// and have no trailing slash.
 
 Output format (JSON):
 {
   "employee_email": "example@gmail.com",
-  "employer_emails": ["hr@company.com", "lead@techcorp.com" , "example@gmail.com"]
+  "employer_emails": ["hr@company.com", "lead@techcorp.com"],
+  "social_links": {"linkedin": "https://linkedin.com/in/example", "instagram": "https://instagram.com/example"}
 }
 If nothing found:
 {
   "employee_email": null,
-  "employer_emails": []
+  "employer_emails": [],
+  "social_links": {}
 }
 """
-
-    contents = [
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=pdf_info)],
+CONTACTS_RESPONSE_SCHEMA = genai.types.Schema(
+    type=genai.types.Type.OBJECT,
+    required=["employee_email", "employer_emails", "social_links"],
+    properties={
+        "employee_email": genai.types.Schema(
+            type=genai.types.Type.STRING,
+            description="Candidate's email address, or null if not found.",
+            nullable=True,
         ),
-    ]
-
-    generate_content_config = types.GenerateContentConfig(
-        temperature=0.2,
-        response_mime_type="application/json",
-        system_instruction=[types.Part.from_text(text=system_instruction)],
-        response_schema=genai.types.Schema(
+        "employer_emails": genai.types.Schema(
+            type=genai.types.Type.ARRAY,
+            description="List of employer/company email addresses.",
+            items=genai.types.Schema(type=genai.types.Type.STRING),
+        ),
+        "social_links": genai.types.Schema(
             type=genai.types.Type.OBJECT,
-            required=["employee_email", "employer_emails"],
+            description="Profile URL per platform; platforms without a link are omitted.",
             properties={
-                "employee_email": genai.types.Schema(
-                    type=genai.types.Type.STRING,
-                    description="Candidate's email address, or null if not found.",
-                    nullable=True,
-                ),
-                "employer_emails": genai.types.Schema(
-                    type=genai.types.Type.ARRAY,
-                    description="List of employer/company email addresses.",
-                    items=genai.types.Schema(type=genai.types.Type.STRING),
-                ),
+                platform: genai.types.Schema(type=genai.types.Type.STRING, nullable=True)
+                for platform in SOCIAL_PLATFORMS
             },
         ),
-    )
+    },
+)
+
+
+# Email и ссылки на соцсети, которые регулярки не разобрали, — один вызов на оба вопроса:
+# emailProccess и analyze_social передают тот же cv_text и получают ответ из llm_cache
+EXTRACT_CONTACTS_TASK = register_task(
+    "extract_contacts",
+    lambda: build_task_config(
+        CONTACTS_MODEL, temperature=0.2, system_instruction=CONTACTS_SYSTEM_INSTRUCTION,
+        response_schema=CONTACTS_RESPONSE_SCHEMA, key_schema=CONTACTS_RESPONSE_SCHEMA,
+    ),
+)
 
-    try:
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        )
+
+async def extract_contacts_ai(text: str) -> dict:
+    """{"employee_email", "employer_emails", "social_links"} от модели; ссылки нормализованы как у регулярок."""
+    async def _generate() -> str:
+        response = await EXTRACT_CONTACTS_TASK.generate(text)
 
         if hasattr(response, 'text') and response.text:
-            json_text = response.text
-        else:
-            try:
-                json_text = response.candidates[0].content.parts[0].text
-            except (AttributeError, IndexError, TypeError) as e:
-                print(f"Error accessing response parts via candidates. Error: {e}")
-                raise ValueError("Could not extract text from AI response.")
+            return response.text
+        try:
+            return response.candidates[0].content.parts[0].text
+        except (AttributeError, IndexError, TypeError) as e:
+            print(f"Error accessing response parts via candidates. Error: {e}")
+            raise ValueError("Could not extract text from AI response.")
 
+    try:
+        json_text = await llm_cache.get_or_generate(
+            "extract_contacts", EXTRACT_CONTACTS_TASK.cache_key(text), CONTACTS_MODEL, _generate, validate=json.loads,
+        )
     except Exception as e:
         print(f"Gemini API call failed: {type(e).__name__}: {e}")
         raise ValueError(f"AI generation error: {e}")
@@ -432,107 +297,209 @@ If nothing found:
     except json.JSONDecodeError as e:
         print(f"JSON decode error:\n---\n{json_text}\n---")
         raise ValueError(f"JSON decoding error: {e}. AI response: {json_text}")
-    except Exception as e:
-        print(f"Unexpected error parsing JSON: {e}")
-        raise ValueError(f"Unexpected JSON parsing error: {e}")
 
+    links = {}
+    for platform, url in (parsed_json.get("social_links") or {}).items():
+        platform = "x" if platform == "twitter" else platform
+        # Ссылку от модели пропускаем через те же регулярки: https://, без слэша, только профиль
+        link = extract_social_links(url).get(platform) if isinstance(url, str) else None
+        if link:
+            links[platform] = link
+    return {
+        "employee_email": parsed_json.get("employee_email") or None,
+        "employer_emails": [e for e in parsed_json.get("employer_emails") or [] if isinstance(e, str) and e],
+        "social_links": links,
+    }
+
+
+async def extract_emails_from_resume(pdf_info: str):
+    contacts = extract_contacts(pdf_info)
+    if not contacts.ambiguous:
+        # Адреса однозначно разобраны регулярками (или их нет) — модель не нужна
+        return contacts.emails()
+    logger.info(f"📧 Ambiguous emails in resume, asking {CONTACTS_MODEL}")
+    ai_contacts = await extract_contacts_ai(pdf_info)
+    parsed_json = {"employee_email": ai_contacts["employee_email"], "employer_emails": ai_contacts["employer_emails"]}
     print(parsed_json)
     return parsed_json
     
 
 
-async def analyze_social(pdf_info:str,title:str,description:str,requirements:str,resume_id:int): 
-    social_info  = await social_network_analyzer(pdf_info)
-    print(social_info)
-    profession = await analyze_proffesion(title,description,requirements)
-    system_instructions = {
-        "salesman": SELLER_INSTRUCTION,  # уже используется
-        "salesman of it-product":SELLER_INSTRUCTION,
-        "it": """You are a senior tech recruiter and behavioral analyst specializing in identifying IT-relevant soft skills from social media presence (LinkedIn, GitHub profiles, Twitter tech threads, etc.). Focus on traits like logical thinking, communication, curiosity, collaboration, consistency, and professionalism in online communication. Use evidence to assign scores and justify clearly.""",
-        "manager": """You are a professional organizational psychologist analyzing managerial soft skills based on social media. Look for leadership, decision-making, emotional intelligence, delegation, motivation, and strategic thinking. Score only if evidence is found. Justify each score clearly with examples."""
-    }
+SOCIAL_INSTRUCTIONS = {
+    "salesman": SELLER_INSTRUCTION,  # уже используется
+    "salesman of it-product":SELLER_INSTRUCTION,
+    "it": """You are a senior tech recruiter and behavioral analyst specializing in identifying IT-relevant soft skills from social media presence (LinkedIn, GitHub profiles, Twitter tech threads, etc.). Focus on traits like logical thinking, communication, curiosity, collaboration, consistency, and professionalism in online communication. Use evidence to assign scores and justify clearly.""",
+    "manager": """You are a professional organizational psychologist analyzing managerial soft skills based on social media. Look for leadership, decision-making, emotional intelligence, delegation, motivation, and strategic thinking. Score only if evidence is found. Justify each score clearly with examples."""
+}
 
-    chosen_instruction = system_instructions.get(profession, system_instructions["salesman"])
-    model = "gemini-2.5-flash-preview-04-17"
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                types.Part.from_text(text=social_info),
-            ],
+SOCIAL_RESPONSE_SCHEMA = genai.types.Schema(
+    # Ожидаем один ОБЪЕКТ на выходе
+    type=genai.types.Type.OBJECT,
+    required=["soft_total", "skills"], # Указываем обязательные поля
+    properties={
+        # Объект для итоговой оценки soft-скиллов
+        "soft_total": genai.types.Schema(
+            type=genai.types.Type.OBJECT,
+            required=["total", "justification"],
+            properties={
+                "total": genai.types.Schema(
+                    type=genai.types.Type.INTEGER,
+                    description="Aggregate score (0-100) based ONLY on evaluated soft skills relevant to sales. SHOUD BE IN RUSSIAN"
+                ),
+                "justification": genai.types.Schema(
+                    type=genai.types.Type.STRING,
+                    description="Brief explanation for the aggregate soft_total score.SHOULD BE IN RUSSIAN"
+                ),
+            },
+            description="Overall assessment based purely on the relevant soft skills identified."
         ),
-    ]
-    generate_content_config = types.GenerateContentConfig(
-        temperature=0.4,
-        response_mime_type="application/json",
-        response_schema=genai.types.Schema(
-        # Ожидаем один ОБЪЕКТ на выходе
-        type=genai.types.Type.OBJECT,
-        required=["soft_total", "skills"], # Указываем обязательные поля
-        properties={
-            # Объект для итоговой оценки soft-скиллов
-            "soft_total": genai.types.Schema(
+        # Массив для отдельных soft-скиллов
+        "skills": genai.types.Schema(
+            type=genai.types.Type.ARRAY,
+            description="List of identified soft skills relevant to sales.",
+            items=genai.types.Schema(
                 type=genai.types.Type.OBJECT,
-                required=["total", "justification"],
+                required=["title", "level", "justification", "type"],
                 properties={
-                    "total": genai.types.Schema(
+                    "title": genai.types.Schema(type=genai.types.Type.STRING),
+                    "level": genai.types.Schema(
                         type=genai.types.Type.INTEGER,
-                        description="Aggregate score (0-100) based ONLY on evaluated soft skills relevant to sales. SHOUD BE IN RUSSIAN"
+                        description="Proficiency score (0-100) based on social media evidence. SHOULD BE IN RUSSIAN"
                     ),
-                    "justification": genai.types.Schema(
+                    "justification": genai.types.Schema(type=genai.types.Type.STRING),
+                    "type": genai.types.Schema(
                         type=genai.types.Type.STRING,
-                        description="Brief explanation for the aggregate soft_total score.SHOULD BE IN RUSSIAN"
+                        enum=["SOFT","HARD"] # Указываем тип как SOFT
                     ),
                 },
-                description="Overall assessment based purely on the relevant soft skills identified."
             ),
-            # Массив для отдельных soft-скиллов
-            "skills": genai.types.Schema(
-                type=genai.types.Type.ARRAY,
-                description="List of identified soft skills relevant to sales.",
-                items=genai.types.Schema(
-                    type=genai.types.Type.OBJECT,
-                    required=["title", "level", "justification", "type"],
-                    properties={
-                        "title": genai.types.Schema(type=genai.types.Type.STRING),
-                        "level": genai.types.Schema(
-                            type=genai.types.Type.INTEGER,
-                            description="Proficiency score (0-100) based on social media evidence. SHOULD BE IN RUSSIAN"
-                        ),
-                        "justification": genai.types.Schema(type=genai.types.Type.STRING),
-                        "type": genai.types.Schema(
-                            type=genai.types.Type.STRING,
-                            enum=["SOFT","HARD"] # Указываем тип как SOFT
-                        ),
-                    },
-                ),
+        ),
+    }
+)
+
+def _build_social_task(instruction: str) -> TaskConfig:
+    return build_task_config(
+        "gemini-2.5-flash-preview-04-17", temperature=0.4, system_instruction=instruction,
+        response_schema=SOCIAL_RESPONSE_SCHEMA,
+    )
+
+
+# Отдельная задача на каждую профессию: у каждой своя system_instruction (и свой context cache)
+ANALYZE_SOCIAL_TASKS: dict[str, TaskConfig] = {
+    profession: register_task(
+        f"analyze_social/{profession}", lambda instruction=instruction: _build_social_task(instruction),
+    )
+    for profession, instruction in SOCIAL_INSTRUCTIONS.items()
+}
+# prompt_for_media из таблицы prompt: задача собирается при загрузке реестра, а не на вызов
+prompt_registry.register_builder(
+    "media",
+    lambda profession, instruction: replace(_build_social_task(instruction), name=f"analyze_social/{profession}"),
+)
+
+
+SELLER_JUSTIFICATION_INSTRUCTION = """
+You are an expert Occupational Psychologist and HR Analyst evaluating a candidate for a SALES role from scraped social-media text.
+The skill levels were already computed by a program (weighted marker counts scaled against benchmarks). Do not recompute or change them.
+For each skill in "Computed metrics" write a brief example-based justification of its level, quoting the markers or the text.
+Then write a short summary of the soft-skill profile for soft_total.
+All output strings must be in Russian. Use the skill titles exactly as given.
+"""
+
+SOCIAL_JUSTIFICATION_SCHEMA = genai.types.Schema(
+    type=genai.types.Type.OBJECT,
+    required=["soft_total_justification", "skills"],
+    properties={
+        "soft_total_justification": genai.types.Schema(type=genai.types.Type.STRING),
+        "skills": genai.types.Schema(
+            type=genai.types.Type.ARRAY,
+            items=genai.types.Schema(
+                type=genai.types.Type.OBJECT,
+                required=["title", "justification"],
+                properties={
+                    "title": genai.types.Schema(type=genai.types.Type.STRING),
+                    "justification": genai.types.Schema(type=genai.types.Type.STRING),
+                },
             ),
-        }
+        ),
+    },
+)
+
+# Уровни для SELLER_INSTRUCTION считает soft_skill_engine, модель пишет только обоснования
+SELLER_JUSTIFICATION_TASK = register_task(
+    "analyze_social/salesman/justification",
+    lambda: build_task_config(
+        "gemini-2.5-flash-preview-04-17", temperature=0.4, system_instruction=SELLER_JUSTIFICATION_INSTRUCTION,
+        response_schema=SOCIAL_JUSTIFICATION_SCHEMA,
     ),
-         system_instruction=[
-            types.Part.from_text(text=(chosen_instruction))],
+)
+
+
+async def _seller_skills(social_info: str) -> dict:
+    profile: SoftSkillProfile = score_text(social_info)
+    if profile.insufficient:
+        return profile.as_result()
+
+    prompt = (
+        f"Scraped social-media text:\n---\n{social_info}\n---\n\n"
+        f"Computed metrics:\n{json.dumps(profile.metrics(), ensure_ascii=False)}\n"
+        f"soft_total: {profile.total}\n"
     )
 
+    async def _generate() -> str:
+        response = await SELLER_JUSTIFICATION_TASK.generate(prompt)
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        return response.candidates[0].content.parts[0].text
+
     try:
-        # !!! Используем await и client.aio !!!
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
+        json_text = await llm_cache.get_or_generate(
+            "analyze_social", SELLER_JUSTIFICATION_TASK.cache_key(prompt), SELLER_JUSTIFICATION_TASK.model,
+            _generate, validate=json.loads,
         )
+        parsed = json.loads(json_text)
+    except Exception as e:
+        # Уровни уже посчитаны — без модели остаются краткие обоснования по найденным маркерам
+        logger.warning(f"⚠️ Social justification failed, using marker-based ones: {type(e).__name__}: {e}")
+        return profile.as_result()
+    justifications = {
+        item.get("title"): item.get("justification")
+        for item in parsed.get("skills") or [] if isinstance(item, dict)
+    }
+    return profile.as_result(justifications, parsed.get("soft_total_justification"))
+
+
+async def analyze_social(pdf_info:str,title:str,description:str,requirements:str,resume_id:int,profession:str | None = None): 
+    social_info  = await social_network_analyzer(pdf_info)
+    print(social_info)
+    if profession is None:
+        # Обычно берётся из job_postings.profession; классифицируем только если не передали
+        profession = await analyze_proffesion(title,description,requirements)
+    # Промпт из таблицы prompt (если оператор его задал) или встроенный
+    task = prompt_registry.task("media", profession) or ANALYZE_SOCIAL_TASKS.get(
+        profession, ANALYZE_SOCIAL_TASKS["salesman"],
+    )
+    model = task.model
+    if SOFT_SKILL_ENGINE_ENABLED and task.system_instruction == SELLER_INSTRUCTION:
+        return await _seller_skills(social_info)
+
+    async def _generate() -> str:
+        response = await task.generate(social_info)
 
         # Анализ ответа
         if hasattr(response, 'text') and response.text:
-             json_text = response.text
-        else:
-             try:
-                  json_text = response.candidates[0].content.parts[0].text
-             except (AttributeError, IndexError, TypeError) as e:
-                  print(f"Error accessing response parts via candidates structure. Response: {response}. Error: {e}")
-                  raise ValueError("Could not extract text from AI response using known methods.")
+             return response.text
+        try:
+             return response.candidates[0].content.parts[0].text
+        except (AttributeError, IndexError, TypeError) as e:
+             print(f"Error accessing response parts via candidates structure. Response: {response}. Error: {e}")
+             raise ValueError("Could not extract text from AI response using known methods.")
 
+    try:
+        cache_key = task.cache_key(social_info)
+        json_text = await llm_cache.get_or_generate("analyze_social", cache_key, model, _generate, validate=json.loads)
     except Exception as e:
-        print(f"Error during Gemini API call with client.aio.models.generate_content: {type(e).__name__}: {e}")
+        print(f"Error during Gemini API call: {type(e).__name__}: {e}")
         raise ValueError(f"Error during AI generation: {e}")
 
     # 5. Парсинг ответа
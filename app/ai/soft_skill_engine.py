@@ -0,0 +1,254 @@
+"""
+Local implementation of the SELLER_INSTRUCTION soft-skill metrics.
+
+SELLER_INSTRUCTION describes exact arithmetic:
+- total_tokens is words plus emoji
+- strong markers weigh 2 and weak markers 1, counted per dimension
+- raw_pct is scaled against the per-dimension benchmark, floored at 5%
+  and boosted with a square root
+- the HARD sales level uses Laplace smoothing with α = 5
+
+A model does this arithmetic unreliably. Here the marker lexicons are
+compiled once, and every distinct token of a batch is resolved to a weight
+row once. Counting is a NumPy gather plus a per-document bincount, so
+score_batch scores many candidates in one pass. The LLM only writes the
+narrative justification for numbers that are already fixed (see
+analyze_social).
+"""
+import os
+import re
+from functools import lru_cache
+from dataclasses import dataclass, field
+
+import numpy as np
+
+SOFT_SKILL_ENGINE_ENABLED = os.getenv("SOFT_SKILL_ENGINE_ENABLED", "true").lower() == "true"
+
+# Константы из SELLER_INSTRUCTION
+LAPLACE_ALPHA = 5
+FLOOR_THRESHOLD = 5.0
+MIN_TOKENS = 20
+STRONG_WEIGHT, WEAK_WEIGHT = 2.0, 1.0
+EMOJI_OVERUSE_PCT = 15.0
+EXAMPLES_PER_SKILL = 5
+
+
+@dataclass(frozen=True)
+class Dimension:
+    key: str
+    title: str
+    benchmark_pct: float
+    strong: tuple[str, ...] = ()
+    weak: tuple[str, ...] = ()
+    # Негативизм снижает soft_total
+    inverted: bool = False
+
+
+# Основы слов (совпадение по префиксу) и эмодзи; тексты приводятся к нижнему регистру, «ё» → «е»
+DIMENSIONS = (
+    Dimension(
+        "communicability", "Коммуникабельность", 20,
+        strong=("спасиб", "благодар", "thank", "appreciat", "❤", "😊", "🙂", "🥰", "🤗", "🙏"),
+        weak=("пожалуйст", "please", "добр", "kind", "helpful", "поддерж", "support", "encourag", "вежлив",
+              "friendly", "дружелюб", "приятн", "welcome", "привет", "hello", "радост", "😍", "👍", "☺"),
+    ),
+    Dimension(
+        "proactiveness", "Проактивность", 15,
+        strong=("достиг", "achiev", "организ", "organiz", "инициир", "initiat", "запуст", "launch", "возглав",
+                "lead", "руковод", "создал", "creat"),
+        weak=("сделал", "выполн", "follow", "reply", "replied", "respond", "ответил", "участв", "начал", "start",
+              "план", "plan", "реализовал", "провел", "добил"),
+    ),
+    Dimension(
+        "clarity", "Ясность целей", 10,
+        strong=("конкретн", "specific", "exactly", "точно", "clearly", "четко", "definitely", "определенн",
+                "concrete"),
+        weak=("ясно", "именно", "итак", "цель", "goal", "результат", "result", "шаг", "step", "срок", "deadline"),
+    ),
+    Dimension(
+        "negativism", "Негативизм", 10,
+        strong=("ненавиж", "hate", "тупой", "тупая", "тупые", "тупо", "stupid", "ужасн", "awful", "бесит", "ugh", "😡", "🤬", "🙄"),
+        weak=("плох", "bad", "annoy", "раздраж", "надоел", "достал", "отстой", "sucks", "worst", "худш", "👎",
+              "😤", "😠"),
+        inverted=True,
+    ),
+    Dimension("emotional_expressiveness", "Эмоциональная выразительность", 10),
+    Dimension(
+        "humor", "Юмор", 15,
+        strong=("lol", "lmao", "rofl", "bruh", "ахах", "хаха", "haha", "😂", "🤣"),
+        weak=("😅", "😆", "😄", "шутк", "joke", "смешн", "funny", "прикол", "ржу"),
+    ),
+    Dimension(
+        "creativity", "Креативность", 15,
+        strong=("однажды", "story", "stories", "истори", "представьте", "imagine"),
+        weak=("идея", "идеи", "идей", "idea", "творч", "creativ", "дизайн", "design", "придумал", "вдохнов", "inspir"),
+    ),
+)
+HARD_TITLE = "Навыки продаж"
+HARD_MARKERS = ("sales", "sale", "продаж", "продав", "реализац", "сбыт", "sbyt", "crm", "клиент", "client",
+                "customer", "презентац", "presentation", "ассортимент", "assortment", "товар", "product", "продукт",
+                "комисси", "commission", "ставк", "rate", "скидк", "discount", "покупател", "buyer", "сделк", "deal",
+                "прайс", "price", "цена", "цены", "ценник")
+
+_DIM_INDEX = {dim.key: i for i, dim in enumerate(DIMENSIONS)}
+_EMOTIONAL = _DIM_INDEX["emotional_expressiveness"]
+# Столбцы матрицы весов: измерения DIMENSIONS и последним — HARD
+_HARD = len(DIMENSIONS)
+_BENCHMARKS = np.array([dim.benchmark_pct for dim in DIMENSIONS])
+_INVERTED = np.array([dim.inverted for dim in DIMENSIONS])
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_EMOJI = r"[\U0001F000-\U0001FAFF☀-➿⭐⭕‼⁉]"
+_TOKEN_RE = re.compile(rf"[^\W_]+|{_EMOJI}")
+_EMOJI_RE = re.compile(_EMOJI)
+# Структурные признаки, которые не сводятся к отдельным токенам: (измерение, вес, регулярка, подстроки-фильтры).
+# Регулярку запускаем, только если в тексте (в нижнем регистре) есть одна из подстрок
+_STRUCTURAL = (
+    ("clarity", WEAK_WEIGHT, re.compile(r"^\s*(?:[-•*]\s|\d{1,2}[.)]\s|[a-zа-я]\)\s)", re.MULTILINE), ()),
+    ("negativism", WEAK_WEIGHT, re.compile(r"!{3,}|\?{3,}"), ("!!!", "???")),
+    ("negativism", WEAK_WEIGHT, re.compile(r"\b[A-ZА-Я]{3,}(?:\s+[A-ZА-Я]{3,})+\b"), ()),
+    ("negativism", STRONG_WEIGHT, re.compile(r"\bfed up\b|\bсыт(?:а)? по горло\b", re.IGNORECASE), ("fed up", "по горло")),
+    ("proactiveness", WEAK_WEIGHT, re.compile(r"(?<![\w.])@\w{2,}"), ("@",)),
+    ("creativity", WEAK_WEIGHT, re.compile(r"\blike an? \w+|\bкак будто\b|\bсловно\b|\bбудто\b", re.IGNORECASE),
+     ("like a", "будто", "словно")),
+)
+_STRUCTURAL = tuple((_DIM_INDEX[key], weight, pattern, needles) for key, weight, pattern, needles in _STRUCTURAL)
+
+
+def _prefix_re(stems: tuple[str, ...]) -> re.Pattern | None:
+    return re.compile("|".join(map(re.escape, sorted(stems, key=len, reverse=True)))) if stems else None
+
+
+_STRONG_RES = tuple(_prefix_re(dim.strong) for dim in DIMENSIONS)
+_WEAK_RES = tuple(_prefix_re(dim.weak) for dim in DIMENSIONS)
+_HARD_RE = _prefix_re(HARD_MARKERS)
+
+
+@lru_cache(maxsize=200_000)
+def _token_weights(token: str) -> tuple[float, ...]:
+    """Строка матрицы весов для токена: по столбцу на измерение и HARD."""
+    row = [0.0] * (len(DIMENSIONS) + 1)
+    for i, (strong, weak) in enumerate(zip(_STRONG_RES, _WEAK_RES)):
+        if strong is not None and strong.match(token):
+            row[i] = STRONG_WEIGHT
+        elif weak is not None and weak.match(token):
+            row[i] = WEAK_WEIGHT
+    if _HARD_RE.match(token):
+        row[_HARD] = 1.0
+    return tuple(row)
+
+
+@dataclass
+class SoftSkillProfile:
+    total_tokens: int
+    emoji_pct: float
+    levels: dict[str, int]
+    hard_level: int
+    total: int
+    insufficient: bool
+    emoji_overuse: bool = False
+    # Найденные маркеры по измерениям — опора для обоснований
+    examples: dict[str, list[str]] = field(default_factory=dict)
+
+    def metrics(self) -> list[dict]:
+        """Уже посчитанные уровни в виде, который видит модель, пишущая обоснования."""
+        rows = [{"title": dim.title, "level": self.levels[dim.key], "type": "SOFT",
+                 "markers": self.examples.get(dim.key, [])} for dim in DIMENSIONS]
+        rows.append({"title": HARD_TITLE, "level": self.hard_level, "type": "HARD",
+                     "markers": self.examples.get("hard", [])})
+        return rows
+
+    def as_result(self, justifications: dict[str, str] | None = None, total_justification: str | None = None) -> dict:
+        """Ответ в формате SOCIAL_RESPONSE_SCHEMA; без обоснований от модели — краткие по маркерам."""
+        if self.insufficient:
+            return {"soft_total": {"total": 0, "justification": "Недостаточно данных для анализа"}, "skills": []}
+        justifications = justifications or {}
+        skills = []
+        for row in self.metrics():
+            markers = row.pop("markers")
+            fallback = f"Маркеры: {', '.join(markers)}" if markers else "Маркеры не найдены"
+            if row["title"] == DIMENSIONS[_EMOTIONAL].title:
+                fallback = f"Доля эмодзи: {self.emoji_pct:.1f}%" + (" (избыточно)" if self.emoji_overuse else "")
+            skills.append({**row, "justification": justifications.get(row["title"]) or fallback})
+        return {
+            "soft_total": {
+                "total": self.total,
+                "justification": total_justification or f"Рассчитано по {self.total_tokens} токенам.",
+            },
+            "skills": skills,
+        }
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(_URL_RE.sub(" ", text).lower().replace("ё", "е").replace("️", ""))
+
+
+def score_batch(texts: list[str]) -> list[SoftSkillProfile]:
+    n = len(texts)
+    if not n:
+        return []
+    docs = [_tokenize(text or "") for text in texts]
+    lengths = np.fromiter(map(len, docs), dtype=np.int64, count=n)
+    flat = [token for doc in docs for token in doc]
+
+    # Каждый различный токен пакета разбирается по лексиконам один раз
+    vocab: dict[str, int] = {}
+    ids = np.fromiter((vocab.setdefault(token, len(vocab)) for token in flat), dtype=np.int64, count=len(flat))
+    weights = np.array([_token_weights(token) for token in vocab], dtype=np.float64).reshape(len(vocab),
+                                                                                            len(DIMENSIONS) + 1)
+    token_weights = weights[ids]
+    doc_index = np.repeat(np.arange(n), lengths)
+    counts = np.column_stack([
+        np.bincount(doc_index, weights=token_weights[:, col], minlength=n) for col in range(len(DIMENSIONS) + 1)
+    ])
+
+    structural = np.zeros((n, len(DIMENSIONS)))
+    emojis = np.zeros(n)
+    chars = np.zeros(n)
+    for row, text in enumerate(texts):
+        text = _URL_RE.sub(" ", text or "")
+        lowered = text.lower()
+        for col, weight, pattern, needles in _STRUCTURAL:
+            if not needles or any(needle in lowered for needle in needles):
+                structural[row, col] += weight * len(pattern.findall(text))
+        emojis[row] = len(_EMOJI_RE.findall(text))
+        chars[row] = len(text)
+
+    total_tokens = lengths.astype(np.float64)
+    safe_tokens = np.maximum(total_tokens, 1.0)[:, None]
+    raw_pct = (counts[:, :len(DIMENSIONS)] + structural) / safe_tokens * 100
+    emoji_pct = emojis / np.maximum(chars, 1.0) * 100
+    raw_pct[:, _EMOTIONAL] = emoji_pct
+    scaled = np.minimum(100.0, raw_pct / _BENCHMARKS * 100)
+    levels = np.round(np.sqrt(np.maximum(scaled, FLOOR_THRESHOLD) / 100) * 100).astype(int)
+    hard_levels = np.round((counts[:, _HARD] + LAPLACE_ALPHA) / (total_tokens + LAPLACE_ALPHA) * 100).astype(int)
+    # soft_total: среднее по измерениям, негативизм входит как 100 - уровень
+    totals = np.round(np.where(_INVERTED, 100 - levels, levels).mean(axis=1)).astype(int)
+
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    profiles = []
+    for row in range(n):
+        insufficient = bool(total_tokens[row] < MIN_TOKENS)
+        examples: dict[str, list[str]] = {}
+        if not insufficient:
+            span = slice(starts[row], starts[row] + lengths[row])
+            doc_weights = token_weights[span]
+            for col, key in [*enumerate(dim.key for dim in DIMENSIONS), (_HARD, "hard")]:
+                hits = dict.fromkeys(docs[row][i] for i in np.flatnonzero(doc_weights[:, col]))
+                if hits:
+                    examples[key] = list(hits)[:EXAMPLES_PER_SKILL]
+        profiles.append(SoftSkillProfile(
+            total_tokens=int(total_tokens[row]),
+            emoji_pct=round(float(emoji_pct[row]), 2),
+            levels={dim.key: int(levels[row, col]) for col, dim in enumerate(DIMENSIONS)},
+            hard_level=int(hard_levels[row]),
+            total=0 if insufficient else int(totals[row]),
+            insufficient=insufficient,
+            emoji_overuse=bool(emoji_pct[row] > EMOJI_OVERUSE_PCT),
+            examples=examples,
+        ))
+    return profiles
+
+
+def score_text(text: str) -> SoftSkillProfile:
+    return score_batch([text])[0]
@@ -0,0 +1,83 @@
+"""
+Registry of per-task Gemini request configs built once at import time.
+
+Response schemas, system instruction parts, GenerateContentConfig objects and
+the digests of the static parts of the llm_cache key are built once per task
+when the AI modules are imported. A request then only assembles the dynamic
+user content. Registered configs are shared between concurrent requests and
+must not be mutated. Use config.model_copy() to derive a variant, as
+context_cache.py does.
+"""
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Callable
+
+from google.genai import types
+
+from app.ai.gateway import llm_gateway
+from app.ai.llm_cache import digest, key_from_digests
+
+_DEFAULT = object()
+
+
+@dataclass(frozen=True)
+class TaskConfig:
+    model: str
+    config: types.GenerateContentConfig
+    system_instruction: str | None
+    instruction_digest: str
+    schema_digest: str
+    # Имя из register_task: место вызова в метриках и трейсах
+    name: str = "unknown"
+
+    def contents(self, prompt: str) -> list[types.Content]:
+        return [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
+
+    def cache_key(self, prompt: str) -> str:
+        """То же, что make_key(model, system_instruction, prompt, key_schema), без повторного хэширования схемы."""
+        return key_from_digests(self.model, self.instruction_digest, digest(prompt), self.schema_digest)
+
+    async def generate(self, prompt: str, deadline: float | None = None):
+        return await llm_gateway.generate_content(
+            model=self.model, contents=self.contents(prompt), config=self.config, deadline=deadline, site=self.name,
+        )
+
+
+def build_task_config(model: str, *, temperature: float, system_instruction: str | None = None,
+                      response_schema: types.Schema | None = None, response_mime_type: str = "application/json",
+                      key_schema=_DEFAULT) -> TaskConfig:
+    """
+    key_schema — то, что входит в ключ llm_cache как «формат ответа». По умолчанию
+    (response_schema, temperature), а без схемы — весь config.
+    """
+    config = types.GenerateContentConfig(
+        temperature=temperature,
+        response_mime_type=response_mime_type,
+        response_schema=response_schema,
+        system_instruction=[types.Part.from_text(text=system_instruction)] if system_instruction else None,
+    )
+    if key_schema is _DEFAULT:
+        key_schema = (response_schema, temperature) if response_schema is not None else config
+    return TaskConfig(
+        model=model,
+        config=config,
+        system_instruction=system_instruction,
+        instruction_digest=digest(system_instruction),
+        schema_digest=digest(key_schema),
+    )
+
+
+_configs: dict[str, TaskConfig] = {}
+_builders: dict[str, Callable[[], TaskConfig]] = {}
+
+# Только для чтения: задачи регистрируются при импорте модулей app.ai
+TASK_CONFIGS = MappingProxyType(_configs)
+TASK_BUILDERS = MappingProxyType(_builders)
+
+
+def register_task(name: str, build: Callable[[], TaskConfig]) -> TaskConfig:
+    if name in _configs:
+        raise ValueError(f"Task config already registered: {name}")
+    _builders[name] = build
+    _configs[name] = replace(build(), name=name)
+    return _configs[name]
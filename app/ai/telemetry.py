@@ -0,0 +1,254 @@
+"""
+Telemetry for LLM calls: Prometheus metrics and per-resume traces.
+
+The gateway reports every model call here once it finishes. The report has
+the model, the call site (the registered task name), prompt, response and
+cached token counts from usage_metadata / usage, latency, retries, outcome
+and an estimated cost. The metrics are served on internal ports only:
+METRICS_PORT for the API and WORKER_METRICS_PORT for the worker.
+
+A trace collects the calls made while one resume is processed: the upload
+request, then the analysis job. The current trace is kept in a contextvar,
+so calls made from asyncio.gather and hedged tasks land in it too. The
+summary is logged when the trace ends. The most recent summaries, without
+filenames or resume ids, are shown on the operator-only /llm_gateway/stats.
+"""
+import os
+import json
+import time
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LLM_TRACE_HISTORY = int(os.getenv("LLM_TRACE_HISTORY", "50"))
+
+_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLM call latency including queueing and retries",
+    ["model", "site", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a gateway slot and rate-limit tokens",
+    ["model"], buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+LLM_CALLS = Counter("llm_calls", "Finished LLM calls", ["model", "site", "outcome"])
+LLM_RETRIES = Counter("llm_retries", "Retried LLM attempts", ["model", "site", "reason"])
+LLM_TOKENS = Counter("llm_tokens", "LLM tokens by kind (prompt, response, cached)", ["model", "site", "kind"])
+LLM_COST = Counter("llm_cost_usd", "Estimated LLM spend in USD", ["model", "site"])
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM calls currently sent to the provider", ["model"])
+LLM_QUEUED = Gauge("llm_queued", "LLM calls waiting in the gateway queue", ["model"])
+LLM_CACHE_EVENTS = Counter("llm_cache_events", "llm_cache lookups and writes", ["task", "event"])
+LLM_HEDGE_EVENTS = Counter("llm_hedge_events", "Hedged request outcomes", ["site", "event"])
+TRACE_LLM_SECONDS = Histogram(
+    "resume_trace_llm_seconds", "Sum of LLM call latencies per resume processing stage",
+    ["stage"], buckets=_LATENCY_BUCKETS,
+)
+TRACE_COST = Histogram(
+    "resume_trace_cost_usd", "Estimated LLM spend per resume processing stage",
+    ["stage"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """USD за миллион токенов."""
+    input: float
+    output: float
+    cached_input: float = 0.0
+
+
+MODEL_PRICES: dict[str, ModelPrice] = {
+    "gemini-2.5-flash-preview-04-17": ModelPrice(input=0.15, output=0.60, cached_input=0.0375),
+    "gemini-2.0-flash": ModelPrice(input=0.10, output=0.40, cached_input=0.025),
+    "gemini-1.5-flash-8b": ModelPrice(input=0.0375, output=0.15, cached_input=0.01),
+    "gpt-4o": ModelPrice(input=2.50, output=10.00, cached_input=1.25),
+}
+
+
+def _load_prices() -> dict[str, ModelPrice]:
+    prices = dict(MODEL_PRICES)
+    raw = os.getenv("LLM_PRICES")
+    if raw:
+        for model, overrides in json.loads(raw).items():
+            prices[model] = replace(prices.get(model, ModelPrice(0.0, 0.0)), **overrides)
+    return prices
+
+
+_prices = _load_prices()
+
+
+@dataclass(frozen=True)
+class LLMUsage:
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    # Часть prompt_tokens, взятая из context cache / prompt cache
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.response_tokens
+
+
+def gemini_usage(response) -> LLMUsage | None:
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return None
+    return LLMUsage(
+        prompt_tokens=metadata.prompt_token_count or 0,
+        # Рассуждения 2.5-моделей оплачиваются как ответ
+        response_tokens=(metadata.candidates_token_count or 0) + (getattr(metadata, "thoughts_token_count", 0) or 0),
+        cached_tokens=getattr(metadata, "cached_content_token_count", 0) or 0,
+    )
+
+
+def openai_usage(response) -> LLMUsage | None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return LLMUsage(
+        prompt_tokens=usage.prompt_tokens or 0,
+        response_tokens=usage.completion_tokens or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+    )
+
+
+def estimate_cost(model: str, usage: LLMUsage) -> float:
+    price = _prices.get(model)
+    if price is None:
+        return 0.0
+    uncached = max(0, usage.prompt_tokens - usage.cached_tokens)
+    return (uncached * price.input + usage.cached_tokens * price.cached_input
+            + usage.response_tokens * price.output) / 1_000_000
+
+
+@dataclass
+class LLMCallRecord:
+    model: str
+    site: str
+    outcome: str
+    seconds: float
+    retries: int
+    usage: LLMUsage
+    cost_usd: float
+
+
+@dataclass
+class ResumeTrace:
+    stage: str
+    resume_id: int | None = None
+    label: str = ""
+    started: float = field(default_factory=time.monotonic)
+    calls: list[LLMCallRecord] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        by_site: dict[str, dict] = {}
+        for call in self.calls:
+            site = by_site.setdefault(call.site, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0,
+                                                  "response_tokens": 0, "cost_usd": 0.0, "retries": 0})
+            site["calls"] += 1
+            site["seconds"] += call.seconds
+            site["prompt_tokens"] += call.usage.prompt_tokens
+            site["response_tokens"] += call.usage.response_tokens
+            site["cost_usd"] += call.cost_usd
+            site["retries"] += call.retries
+        for site in by_site.values():
+            site["seconds"] = round(site["seconds"], 2)
+            site["cost_usd"] = round(site["cost_usd"], 6)
+        slowest = max(self.calls, key=lambda call: call.seconds, default=None)
+        return {
+            "stage": self.stage,
+            "resume_id": self.resume_id,
+            "label": self.label,
+            "wall_seconds": round(time.monotonic() - self.started, 2),
+            "llm_calls": len(self.calls),
+            "llm_seconds": round(sum(call.seconds for call in self.calls), 2),
+            "prompt_tokens": sum(call.usage.prompt_tokens for call in self.calls),
+            "response_tokens": sum(call.usage.response_tokens for call in self.calls),
+            "cost_usd": round(sum(call.cost_usd for call in self.calls), 6),
+            "failed_calls": sum(1 for call in self.calls if call.outcome != "ok"),
+            "slowest": {"site": slowest.site, "model": slowest.model, "seconds": round(slowest.seconds, 2)}
+            if slowest else None,
+            "by_site": by_site,
+        }
+
+
+_current_trace: contextvars.ContextVar[ResumeTrace | None] = contextvars.ContextVar("llm_resume_trace", default=None)
+recent_traces: deque[dict] = deque(maxlen=LLM_TRACE_HISTORY)
+
+
+def current_trace() -> ResumeTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def resume_trace(stage: str, resume_id: int | None = None, label: str = ""):
+    """Все LLM-вызовы внутри блока (и в порождённых им задачах) попадают в один трейс."""
+    trace = ResumeTrace(stage=stage, resume_id=resume_id, label=label)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if trace.calls:
+            summary = trace.summary()
+            # В /llm_gateway/stats без имени файла и id резюме: они видны только в логах
+            recent_traces.append({k: v for k, v in summary.items() if k not in ("resume_id", "label")})
+            TRACE_LLM_SECONDS.labels(stage).observe(summary["llm_seconds"])
+            TRACE_COST.labels(stage).observe(summary["cost_usd"])
+            slowest = summary["slowest"]
+            logger.info(
+                f"🧾 {stage} resume={resume_id} {label}: {summary['llm_calls']} LLM calls, "
+                f"{summary['llm_seconds']}s LLM / {summary['wall_seconds']}s wall, "
+                f"{summary['prompt_tokens']}+{summary['response_tokens']} tokens, ${summary['cost_usd']:.4f}; "
+                f"slowest {slowest['site']} ({slowest['model']}) {slowest['seconds']}s"
+            )
+
+
+@dataclass
+class CallCounter:
+    # Вызовы, на которые модель ответила
+    ok: int = 0
+
+
+_call_counter: contextvars.ContextVar[CallCounter | None] = contextvars.ContextVar("llm_call_counter", default=None)
+
+
+@contextmanager
+def count_llm_calls():
+    """Считает ответы модели внутри блока: 0 — результат пришёл из кэша, модель не вызывалась."""
+    counter = CallCounter()
+    token = _call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _call_counter.reset(token)
+
+
+def record_call(model: str, site: str, outcome: str, seconds: float, retries: int, usage: LLMUsage | None):
+    usage = usage or LLMUsage()
+    cost = estimate_cost(model, usage)
+    LLM_CALLS.labels(model, site, outcome).inc()
+    LLM_CALL_SECONDS.labels(model, site, outcome).observe(seconds)
+    if usage.prompt_tokens:
+        LLM_TOKENS.labels(model, site, "prompt").inc(usage.prompt_tokens)
+    if usage.response_tokens:
+        LLM_TOKENS.labels(model, site, "response").inc(usage.response_tokens)
+    if usage.cached_tokens:
+        LLM_TOKENS.labels(model, site, "cached").inc(usage.cached_tokens)
+    if cost:
+        LLM_COST.labels(model, site).inc(cost)
+    counter = _call_counter.get()
+    if counter is not None and outcome == "ok":
+        counter.ok += 1
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.calls.append(LLMCallRecord(model=model, site=site, outcome=outcome, seconds=seconds,
+                                         retries=retries, usage=usage, cost_usd=cost))
@@ -3,8 +3,8 @@ import os
 from dotenv import load_dotenv
 load_dotenv(override=True)
 import aiofiles
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, RedirectResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import engine, get_db,get_db_context
 from app.models.base import Base
@@ -20,33 +20,55 @@ from typing import Optional
 from fastapi import Query
 from app.schemas.vacancy_schema import VacancyCreate
 from starlette.middleware.cors import CORSMiddleware
-from app.ai.social_analyzer import analyze_social,analyze_proffesion
 from  app.services.cv_services import CVService
 from  app.services.vacancy_service import JobPostingService
 from app.ai.gisto import generate_pdf_for_single_resume,upload_pdf_to_gcs
 import asyncio
 from .users import views as users_router
 from app.routers import test as test_router
-from .users.config import safe_get_current_subject
+from .users.config import require_operator, safe_get_current_subject
 from .users.models import User
 from typing import List
 from app.database import AsyncSessionLocal
 import logging
 from app.schemas.test_schema import ResultOfTest
-from app.ai.sms_sendler import emailProccess
-from app.services.test_services import TestService
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
-from google.cloud import storage # Import GCS client
 import io
+import json
+import mimetypes
+import hashlib
+import uuid
 from urllib.parse import quote
 from datetime import datetime,timezone
 from sqlalchemy import update
+from app.services.job_queue_service import JobQueueService
+from app.services.analysis_worker import AnalysisWorkerPool, RESUME_ANALYSIS_JOB
+from app.services.text_extraction import extraction_pool
+from app.services.storage import storage_gateway
+from google.api_core.exceptions import NotFound
+from app.ai.llm_cache import llm_cache
+from app.ai.gateway import llm_gateway
+from app.ai.hedging import request_hedger
+from app.ai.replay import replay_harness
+from app.ai.prompt_registry import prompt_registry
+from app.ai.brightdata import brightdata_client
+from app.ai.telemetry import current_trace, recent_traces, resume_trace
+from prometheus_client import start_http_server
+from app.services.upload_batches import (
+    upload_batches, watch_social_analysis, UPLOAD_CONCURRENCY,
+    STAGE_UPLOADED, STAGE_EXTRACTED, STAGE_SCORED, STAGE_FAILED, STAGE_BATCH_DONE,
+)
 
 
 logger = logging.getLogger(__name__)
 
+analysis_workers = AnalysisWorkerPool()
 
-
+# redirect-режим /download_resume: клиент качает напрямую из GCS по подписанной ссылке
+RESUME_DOWNLOAD_REDIRECT = os.getenv("RESUME_DOWNLOAD_REDIRECT", "false").lower() == "true"
+RESUME_SIGNED_URL_TTL = int(os.getenv("RESUME_SIGNED_URL_TTL", "300"))
+# Внутренний порт Prometheus /metrics (как WORKER_METRICS_PORT у воркера); 0 — метрики не отдаются
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
 
 async def deactivate_expired_users():
@@ -70,15 +92,42 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # ✅ метрики только на внутреннем порту, не в публичном API
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+
+    # ✅ один клиент GCS с пулом соединений на весь процесс
+    await storage_gateway.start()
+
+    # ✅ прогреваем пул процессов для извлечения текста из PDF/DOCX
+    await extraction_pool.start()
+
+    # ✅ промпты из таблицы prompt в память; дальше только опрос штампа версии
+    await prompt_registry.start()
+
+    # ✅ один httpx-клиент с пулом соединений к BrightData на весь процесс
+    await brightdata_client.start()
+
     # ✅ запускаем фоновую задачу
     task = asyncio.create_task(deactivate_expired_users())
+    # ✅ воркеры очереди анализа резюме (ANALYSIS_WORKERS=0 — только API)
+    analysis_workers.start()
     yield
+    await upload_batches.shutdown()
+    await analysis_workers.stop()
+    await prompt_registry.stop()
     task.cancel()
     try:
         await task
     except asyncio.CancelledError:
         pass
 
+    extraction_pool.shutdown()
+    storage_gateway.close()
+    # ✅ удаляем Gemini context caches этого инстанса
+    await llm_gateway.close()
+    await brightdata_client.close()
+
     # ✅ закрываем движок при завершении
     await engine.dispose()
 
@@ -103,17 +152,10 @@ app.include_router(test_router.router)
 
 
 
-GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "your-default-bucket-name") # Replace with your bucket name
 
-@app.post("/upload_pdf")
-async def upload_pdf(
-    files: List[UploadFile] = File(...),
-    user: User = Depends(safe_get_current_subject),
-    vacancy_id: Optional[int] = Query(default=None),
-    db: AsyncSession = Depends(get_db)
-    ):
+async def _check_upload_limits(db: AsyncSession, user: User, files_count: int, vacancy_id: int | None):
     service = resume_service.ResumeService(db)
-    count = await service.countResume(user,len(files))
+    count = await service.countResume(user, files_count)
     if count > 20 and user.user_type != "company":
         raise HTTPException(
                         status_code=403,
@@ -122,60 +164,207 @@ async def upload_pdf(
 
     if vacancy_id is None:
         raise HTTPException(status_code=400, detail="vacancy_id is required")
-    # Запуск всех задач параллельно
-    tasks = [process_file(file, vacancy_id, user) for file in files]
-    results = await asyncio.gather(*tasks)
+
+
+@app.post("/upload_pdf")
+async def upload_pdf(
+    files: List[UploadFile] = File(...),
+    user: User = Depends(safe_get_current_subject),
+    vacancy_id: Optional[int] = Query(default=None),
+    db: AsyncSession = Depends(get_db)
+    ):
+    await _check_upload_limits(db, user, len(files), vacancy_id)
+
+    # Не больше UPLOAD_CONCURRENCY одновременных загрузок в GCS и вызовов Gemini на запрос
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def bounded(file: UploadFile):
+        async with semaphore:
+            return await process_file(file.filename, file.content_type, await file.read(), vacancy_id, user)
+
+    results = await asyncio.gather(*[bounded(file) for file in files])
     return JSONResponse(content={"resumes": results})
-async def process_file(file: UploadFile, vacancy_id: int, user: User):
+
+
+@app.post("/upload_pdf/batch")
+async def upload_pdf_batch(
+    files: List[UploadFile] = File(...),
+    user: User = Depends(safe_get_current_subject),
+    vacancy_id: Optional[int] = Query(default=None),
+    db: AsyncSession = Depends(get_db)
+    ):
+    """Принимает файлы и сразу отвечает batch_id; прогресс по каждому файлу — через SSE."""
+    await _check_upload_limits(db, user, len(files), vacancy_id)
+
+    # UploadFile закрывается вместе с запросом — байты забираем до ответа
+    uploads = [(file.filename, file.content_type, await file.read()) for file in files]
+    batch = upload_batches.create(user.id, vacancy_id, [filename for filename, _, _ in uploads])
+    batch.task = asyncio.create_task(_run_upload_batch(batch, uploads, user))
+    return JSONResponse(status_code=202, content={
+        "batch_id": batch.id,
+        "files": batch.filenames,
+        "events": f"/upload_pdf/batch/{batch.id}/events",
+    })
+
+
+async def _run_upload_batch(batch, uploads: list[tuple], user: User):
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    resumes: dict[int, list[int]] = {}
+    uploads_done = asyncio.Event()
+
+    async def run(index: int):
+        filename, content_type, contents = uploads[index]
+        # Байты нужны только до оценки — не держим их в батче, пока ждём анализ соцсетей
+        uploads[index] = None
+
+        async def progress(stage: str, **data):
+            await batch.publish(stage, index=index, filename=filename, **data)
+
+        async with semaphore:
+            result = await process_file(filename, content_type, contents, batch.vacancy_id, user, progress)
+        del contents
+        if "error" in result:
+            await progress(STAGE_FAILED, error=result["error"])
+        else:
+            resumes.setdefault(result["id"], []).append(index)
+
+    watcher = asyncio.create_task(watch_social_analysis(batch, resumes, uploads_done, RESUME_ANALYSIS_JOB))
     try:
-        credentials_path = "school-kg-7bd58d53b816.json"
-        storage_client = storage.Client.from_service_account_json(credentials_path)
+        await asyncio.gather(*[run(index) for index in range(len(uploads))])
+        uploads_done.set()
+        await watcher
+    except Exception as e:
+        logger.error(f"Batch {batch.id} failed: {e}", exc_info=True)
+    finally:
+        watcher.cancel()
+        await batch.publish(STAGE_BATCH_DONE, total=len(uploads), timed_out=batch.timed_out)
 
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob_name = f"resumes/{user.id}/{vacancy_id}/{file.filename}"
-        blob = bucket.blob(blob_name)
 
-        contents = await file.read()
-        await file.seek(0)
+@app.get("/upload_pdf/batch/{batch_id}")
+async def upload_batch_status(batch_id: str, user: User = Depends(safe_get_current_subject)):
+    batch = upload_batches.get(batch_id, user.id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return JSONResponse(content=batch.snapshot())
 
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, blob.upload_from_string, contents, file.content_type)
 
-        gcs_uri = f"gs://{GCS_BUCKET_NAME}/{blob_name}"
+@app.get("/upload_pdf/batch/{batch_id}/events")
+async def upload_batch_events(batch_id: str, request: Request, user: User = Depends(safe_get_current_subject)):
+    batch = upload_batches.get(batch_id, user.id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    # EventSource при переподключении присылает Last-Event-ID — продолжаем с него
+    last_event_id = request.headers.get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    async def stream():
+        async for event in batch.follow(after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event.id}\nevent: {event.stage}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def process_file(filename: str, content_type: str | None, contents: bytes, vacancy_id: int, user: User,
+                       progress=None):
+    # Все LLM-вызовы разбора файла — в одном трейсе (лог + /llm_gateway/stats)
+    with resume_trace("upload", label=filename):
+        return await _process_file(filename, content_type, contents, vacancy_id, user, progress)
+
+
+async def _process_file(filename: str, content_type: str | None, contents: bytes, vacancy_id: int, user: User,
+                        progress=None):
+    # progress(stage, **data) — необязательный колбэк для стриминга статуса файла (батч-загрузка)
+    async def report(stage: str, **data):
+        if progress is not None:
+            await progress(stage, **data)
+
+    try:
+        # Свой каталог на каждую загрузку: файл с тем же именем не перезапишет чужой объект,
+        # и очистка после неудачного анализа не удалит CV другого резюме
+        blob_name = f"resumes/{user.id}/{vacancy_id}/{uuid.uuid4().hex}/{filename}"
+        gcs_uri = storage_gateway.uri_for(blob_name)
+
+        file_extension = os.path.splitext(filename)[1].lower()
+        if file_extension not in (".pdf", ".docx"):
+            raise HTTPException(status_code=400, detail=f"Unsupported file format: {filename}")
+
+        content_sha256 = hashlib.sha256(contents).hexdigest()
 
         async with AsyncSessionLocal() as db:
             user = await db.merge(user)
             logger.info(f"🚀 Starting background task for resume {vacancy_id}")
             cv_services = CVService(db)
             service = resume_service.ResumeService(db)
-            vacancy_service = JobPostingService(db)
-            vacancy = await vacancy_service.get_job_posting(vacancy_id,user)
-            file_extension = os.path.splitext(file.filename)[1].lower()
-            
-            if file_extension == ".pdf":
-                parsed_data = await cv_services.parse_pdf(gcs_uri, vacancy_id)
-            elif file_extension == ".docx":
-                parsed_data = await cv_services.parse_docx(gcs_uri, vacancy_id)
+
+            vacancy = await db.get(JobPosting, vacancy_id)
+            if vacancy is None:
+                raise HTTPException(status_code=404, detail="Vacancy not found")
+            if vacancy.user_id != user.id:
+                raise HTTPException(status_code=403, detail="У вас нет прав для прикрепления этой вакансии")
+            fingerprint = resume_service.scoring_fingerprint(vacancy)
+
+            duplicates = await service.find_by_content_hash(content_sha256, user.id)
+            same_scoring = next((r for r in duplicates if r.scoring_fingerprint == fingerprint and r.hard_total), None)
+            if same_scoring is not None:
+                # Тот же файл с теми же требованиями уже разобран — достаточно привязки к вакансии
+                await service.attach_to_vacancy(same_scoring, vacancy)
+                # Оценка и соцсети уже есть, но письма с тестами этой вакансии кандидат ещё не получал
+                await JobQueueService(db).enqueue(
+                    RESUME_ANALYSIS_JOB,
+                    {"vacancy_id": vacancy_id, "gcs_uri": same_scoring.cv_gcs_uri, "ext": file_extension,
+                     "emails_only": True},
+                    resume_id=same_scoring.id,
+                )
+                analysis_workers.notify()
+                logger.info(f"♻️ Duplicate upload of resume {same_scoring.id} ({filename}) for vacancy {vacancy_id}")
+                await report(STAGE_SCORED, id=same_scoring.id, fullname=same_scoring.fullname, duplicate=True)
+                return {
+                    "id": same_scoring.id,
+                    "fullname": same_scoring.fullname,
+                    "location": same_scoring.location,
+                    "duplicate": True,
+                }
+            source = next((r for r in duplicates if r.cv_text and r.cv_gcs_uri), None)
+            if source is not None:
+                # Файл уже в GCS и текст извлечён — пересчитываем только оценку под требования вакансии
+                logger.info(f"♻️ Reusing stored file and text of resume {source.id} for {filename}")
+                gcs_uri = source.cv_gcs_uri
+                cv_text = source.cv_text
+                await report(STAGE_UPLOADED, reused=True)
+                await report(STAGE_EXTRACTED, reused=True)
+                parsed_data = await cv_services.analyze_text(cv_text, vacancy_id)
             else:
-                raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.filename}")
+                cv_text, parsed_data = await _upload_and_analyze(cv_services, blob_name, gcs_uri, contents, content_type, file_extension,
+                                                             vacancy_id, report)
 
             if not parsed_data:
-                raise HTTPException(status_code=400, detail=f"Failed to parse file: {file.filename}")
+                raise HTTPException(status_code=400, detail=f"Failed to parse file: {filename}")
 
             try:
                 resume_data = ResumeCreate(**parsed_data)
             except ValidationError as e:
-                raise HTTPException(status_code=400, detail=f"Data validation error in {file.filename}: {e.errors()}")
+                raise HTTPException(status_code=400, detail=f"Data validation error in {filename}: {e.errors()}")
 
-            db_resume = await service.create_resume(resume_data, vacancy_id=vacancy_id, user=user, gcs_uri=gcs_uri)
-            vc_description = db_resume.job_postings[0].description
-            vc_title = db_resume.job_postings[0].title
-            vc_requirements = db_resume.job_postings[0].requirements
-            logger.info(f"🚀 Starting background task for resume {vc_title}")
-
-            asyncio.create_task(background_task(
-                db_resume.id, gcs_uri, vc_description, vc_title, vc_requirements, file_extension, db_resume.fullname,vacancy
-            ))
+            db_resume = await service.create_resume(
+                resume_data, vacancy_id=vacancy_id, user=user, gcs_uri=gcs_uri, cv_text=cv_text,
+                content_sha256=content_sha256, scoring_fingerprint=fingerprint,
+            )
+            trace = current_trace()
+            if trace is not None:
+                trace.resume_id = db_resume.id
+            # Анализ ставим в очередь: переживёт рестарт инстанса и не перегружает event loop
+            await JobQueueService(db).enqueue(
+                RESUME_ANALYSIS_JOB,
+                {"vacancy_id": vacancy_id, "gcs_uri": gcs_uri, "ext": file_extension},
+                resume_id=db_resume.id,
+            )
+            analysis_workers.notify()
+            await report(STAGE_SCORED, id=db_resume.id, fullname=db_resume.fullname)
 
             return {
                 "id": db_resume.id,
@@ -185,38 +374,61 @@ async def process_file(file: UploadFile, vacancy_id: int, user: User):
     except Exception as e:
         logger.error(f"Error in file task for resume: {e}", exc_info=True)
         return {
-            "filename": file.filename,
+            "filename": filename,
             "error": str(e)
         }
 
 
-async def background_task(resume_id: int, gcs_uri: str, description: str, title: str, requirements: str, ext: str, resume_name: str,vacancy:JobPosting):
-    try:
-        async with AsyncSessionLocal() as db:
-            logger.info(f"🚀 Starting background task for resume {resume_id}")
-            service = resume_service.ResumeService(db)
-            cv_services = CVService(db)
-            test_services = TestService(db)
-
-            if ext == ".pdf":
-                text = await cv_services.parse_pdf_to_text(gcs_uri)
-            elif ext == ".docx":
-                text = await cv_services.parse_docx_to_text(gcs_uri)
-            else:
-                logger.error(f"Unsupported file format in background task for resume {resume_id}")
-                return  # Просто выход без падения таски
-
-            profession = await analyze_proffesion(title, description, requirements)
-            tests_id = await test_services.get_test_ids_by_proffesion(profession)
-            employers_tests = await test_services.get_test_ids_by_proffesion(profession + "(employer)")
-            await emailProccess(resume_id, text, tests_id, employers_tests, resume_name,vacancy.user.name,vacancy.title)
-
-            social_skills = await analyze_social(text, title, description, requirements, resume_id)
-            await service.resume_skill_add(resume_id, social_skills)
-
-            await db.commit()
-    except Exception as e:
-        logger.error(f"💥 Error in background task for resume {resume_id}: {e}", exc_info=True)
+async def _upload_and_analyze(cv_services: CVService, blob_name: str, gcs_uri: str, contents: bytes, content_type: str | None,
+                              file_extension: str, vacancy_id: int, report):
+    """Загрузка в GCS параллельно с извлечением текста и анализом; возвращает (cv_text, parsed_data)."""
+    async def upload():
+        await storage_gateway.upload(blob_name, contents, content_type)
+        await report(STAGE_UPLOADED)
+
+    async def extract_and_analyze():
+        text = await cv_services.extract_text_from_bytes(contents, file_extension)
+        await report(STAGE_EXTRACTED)
+        return text, await cv_services.analyze_text(text, vacancy_id)
+
+    # Загрузка в GCS идёт параллельно с парсингом байтов из памяти и анализом,
+    # запись в БД — только когда готово и то, и другое
+    upload_result, analysis_result = await asyncio.gather(
+        upload(),
+        extract_and_analyze(),
+        return_exceptions=True,
+    )
+    if isinstance(upload_result, BaseException):
+        raise upload_result
+    if isinstance(analysis_result, BaseException):
+        # Не оставляем в бакете файл, для которого не будет записи резюме
+        try:
+            await cv_services.delete_blob_from_gcs(gcs_uri)
+        except Exception as e:
+            logger.warning(f"Could not clean up {gcs_uri} after failed analysis: {e}")
+        raise analysis_result
+    return analysis_result
+
+
+@app.get("/llm_cache/stats", dependencies=[Depends(require_operator)])
+async def llm_cache_stats():
+    # Только для операторов (X-Ops-Token): попадания/промахи кэша LLM этого инстанса с момента запуска
+    return JSONResponse(content=llm_cache.snapshot())
+
+
+@app.get("/llm_gateway/stats", dependencies=[Depends(require_operator)])
+async def llm_gateway_stats():
+    # Только для операторов (X-Ops-Token): очереди, вызовы в полёте, ретраи и задержки по моделям этого
+    # инстанса; хеджирование по местам вызова; сводки последних трейсов резюме без имён файлов и id
+    return JSONResponse(content={
+        "models": llm_gateway.snapshot(),
+        "hedging": request_hedger.snapshot(),
+        "context_cache": llm_gateway.context_cache.snapshot(),
+        "recent_traces": list(recent_traces),
+        "replay": replay_harness.snapshot(),
+        "prompts": prompt_registry.snapshot(),
+        "brightdata": brightdata_client.snapshot(),
+    })
 
 
 @app.post("/vacancy_post")
@@ -237,9 +449,36 @@ async def resultOfTest(result:ResultOfTest,db: AsyncSession = Depends(get_db)):
     db_test = await service.test_skill_add(result.resume_id,result.sub_tests)
     return JSONResponse(content={"result": "Success"})
 
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Один диапазон из заголовка Range: (start, end) включительно, None — отдаём файл целиком.
+    Несколько диапазонов не поддерживаем и тоже отдаём файл целиком (это допускает RFC 9110).
+    ValueError — диапазон вне файла (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+        return None  # синтаксически неверный Range игнорируется
+    if not first:
+        suffix = int(last)
+        if suffix <= 0:
+            raise ValueError("empty suffix range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start > end:
+        return None  # last-pos меньше first-pos — диапазон недействителен, RFC 9110 велит его игнорировать
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
 @app.get("/download_resume/{resume_id}")
 async def download_resume(
     resume_id: int,
+    request: Request,
+    redirect: bool = Query(default=RESUME_DOWNLOAD_REDIRECT),
     user: User = Depends(safe_get_current_subject),
     db: AsyncSession = Depends(get_db)
 ):
@@ -252,39 +491,56 @@ async def download_resume(
     
     if not resume.cv_gcs_uri:
         raise HTTPException(status_code=404, detail="PDF file not found for this resume")
+
+    # Extract original filename from the blob name
+    filename = resume.cv_gcs_uri.split("/")[-1]
     
     try:
-        # Initialize GCS client
-        credentials_path = "school-kg-7bd58d53b816.json"
-        storage_client = storage.Client.from_service_account_json(credentials_path)
-        
-        # Parse the GCS URI to get bucket name and blob path
-        # Format: gs://bucket-name/path/to/file
-        uri_parts = resume.cv_gcs_uri.replace("gs://", "").split("/", 1)
-        bucket_name = uri_parts[0]
-        blob_name = uri_parts[1]
-        
-        # Get bucket and blob
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        
-        # Download file content
-        content = blob.download_as_bytes()
-        
-        # Extract original filename from the blob name
-        filename = blob_name.split("/")[-1]
-        
-        # Return streaming response with PDF content
-        return StreamingResponse(
-            io.BytesIO(content),
-            media_type="application/pdf",
-            headers={
-    "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
-}
-        )
+        if redirect:
+            # Большие файлы отдаёт сам GCS по короткоживущей подписанной ссылке
+            url = await storage_gateway.signed_url(resume.cv_gcs_uri, RESUME_SIGNED_URL_TTL, filename)
+            if url:
+                return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+        stored = await storage_gateway.stat(resume.cv_gcs_uri)
+    except NotFound:
+        raise HTTPException(status_code=404, detail="PDF file not found for this resume")
     except Exception as e:
         logger.error(f"Error downloading resume PDF: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving PDF: {str(e)}")
+
+    etag = f'"{stored.etag}"' if stored.etag else None
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+    if etag:
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None  # файл изменился с момента первого частичного запроса — отдаём заново целиком
+    try:
+        byte_range = _parse_range(range_header, stored.size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stored.size}"})
+
+    start, end = byte_range or (0, stored.size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+    media_type = stored.content_type or mimetypes.guess_type(filename)[0] or "application/pdf"
+    # Файл читается кусками в пуле потоков хранилища и сразу уходит клиенту
+    return StreamingResponse(
+        storage_gateway.stream(resume.cv_gcs_uri, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers,
+    )
     
 @app.get("/download_analysis/{resume_id}")
 async def download_analysis(
@@ -1,2 +1,5 @@
 from .job_seekers import TypeSkill, Resume, Education, Experience, Skill
 from .employers import JobPosting, VacancySkill
+from .jobs import AnalysisJob, JobStatus
+from .llm_cache import LLMCacheEntry
+from .promtps import Prompt
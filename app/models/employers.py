@@ -15,6 +15,8 @@ class JobPosting(Base):
     location: Mapped[str] = mapped_column(String, index=True)
     requirements: Mapped[str] = mapped_column(String,index=True)
     salary: Mapped[str] = mapped_column(String, index=True)
+    # Категория вакансии для тестов и анализа соцсетей; считается один раз при создании/изменении
+    profession: Mapped[str] = mapped_column(String(50), nullable=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship("User", back_populates="user_job_postings",lazy="selectin")
 
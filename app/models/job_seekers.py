@@ -1,7 +1,7 @@
 # models.py
 import enum
 from sqlalchemy.orm import  Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Float, ForeignKey, Enum as SAEnum,Boolean
+from sqlalchemy import Integer, String, Float, ForeignKey, Enum as SAEnum,Boolean,Text
 from app.models.base import Base
 from app.models.association import resume_job_association     
 from app.users.models.users import User
@@ -21,6 +21,9 @@ class Resume(Base):
     fullname: Mapped[str] = mapped_column(String, index=True)
     location: Mapped[str] = mapped_column(String, index=True)
     cv_gcs_uri: Mapped[str] = mapped_column(String, nullable=True)
+    cv_text: Mapped[str] = mapped_column(Text, nullable=True)  # текст CV, извлечённый один раз при загрузке
+    content_sha256: Mapped[str] = mapped_column(String(64), nullable=True, index=True)  # хэш байтов файла для дедупликации
+    scoring_fingerprint: Mapped[str] = mapped_column(String(64), nullable=True)  # хэш требований/навыков/профессии вакансии и промпта, по которым считан hard_total
     hard_total: Mapped["HardTotal"] = relationship("HardTotal", back_populates="resume", uselist=False, cascade="all, delete-orphan", lazy="selectin")
     soft_total: Mapped["SoftTotal"] = relationship("SoftTotal", back_populates="resume", uselist=False, cascade="all, delete-orphan", lazy="selectin")
     test_total: Mapped["TestTotal"] = relationship("TestTotal", back_populates="resume", uselist=False, cascade="all, delete-orphan", lazy="selectin")
@@ -1,12 +1,18 @@
 import enum
+from datetime import datetime, timezone
 from sqlalchemy.orm import  Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Float, ForeignKey, Enum as SAEnum
+from sqlalchemy import Integer, String, Float, ForeignKey, DateTime, Text, Enum as SAEnum
 from app.models.base import Base
 from app.users.models.users import User
 
 class Prompt(Base):
+    """Переопределения промптов по профессиям; читаются через app.ai.prompt_registry."""
     __tablename__ = "prompt"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    profession_title: Mapped[str] = mapped_column(String,index=True)
-    prompt_for_cv:Mapped[str] = mapped_column(String,index=True)
-    prompt_for_media:Mapped[str] = mapped_column(String,index=True)
\ No newline at end of file
+    profession_title: Mapped[str] = mapped_column(String, unique=True, index=True)
+    # Пустое значение — используется встроенный промпт из analyzer.py / social_analyzer.py
+    prompt_for_cv: Mapped[str | None] = mapped_column(Text, nullable=True)
+    prompt_for_media: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Глобально возрастающий штамп: max(version) по таблице меняется при каждом изменении
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
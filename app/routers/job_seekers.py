@@ -74,9 +74,9 @@ async def save_test_result(vacancy_id:int,db:AsyncSession = Depends(get_db), use
 
 
 @router.delete("/{resume_id}")
-async def delete_resume(resume_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(safe_get_current_subject)):
+async def delete_resume(resume_id: int, vacancy_id: int | None = None, db: AsyncSession = Depends(get_db), user: User = Depends(safe_get_current_subject)):
     service = ResumeService(db)
-    if not await service.delete_resume(resume_id, user):
+    if not await service.delete_resume(resume_id, user, vacancy_id=vacancy_id):
         raise HTTPException(status_code=404, detail="Resume not found")
     
     return {"message": "Resume deleted successfully"}
@@ -5,7 +5,7 @@ from sqlalchemy.future import select
 from app.models.employers import JobPosting
 from app.database import get_db
 from app.services.vacancy_service import JobPostingService
-from app.schemas.vacancy_schema import VacancyResponse,SortResumesResponse
+from app.schemas.vacancy_schema import VacancyResponse,SortResumesResponse,VacancyUpdate
 from typing import List
 from sqlalchemy.orm import selectinload
 from app.users.config import security, config, safe_get_current_subject
@@ -40,6 +40,15 @@ async def get_vacancy_by_id(vacancy_id: int, db: AsyncSession = Depends(get_db),
 
 
 
+@router.put("/{vacancy_id}", response_model=VacancyResponse)
+async def update_vacancy(vacancy_id: int, vacancy: VacancyUpdate, db: AsyncSession = Depends(get_db), user: User = Depends(safe_get_current_subject)):
+    service = JobPostingService(db)
+    db_vacancy = await service.update_job_posting(vacancy_id, vacancy, user)
+    if not db_vacancy:
+        raise HTTPException(status_code=404, detail="Вакансия не найдена или у вас нет доступа к ней")
+    return db_vacancy
+
+
 @router.delete("/{vacancy_id}")
 async def delete_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(safe_get_current_subject)):
     service = JobPostingService(db)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 class ResumeShort(BaseModel):
     id: int
@@ -20,6 +20,22 @@ class VacancyCreate(BaseModel):
     skills: List[SkillSchema]
     resumes: List[ResumeShort] = []
 
+class VacancyUpdate(BaseModel):
+    title: Optional[str] = None
+    location: Optional[str] = None
+    description: Optional[str] = None
+    requirements: Optional[str] = None
+    salary: Optional[str] = None
+    skills: Optional[List[SkillSchema]] = None
+
+    # Поле можно не передавать (останется как есть), но явный null в NOT NULL колонку — 422, а не 500
+    @field_validator("*")
+    @classmethod
+    def _reject_null(cls, value):
+        if value is None:
+            raise ValueError("must not be null; omit the field to keep the current value")
+        return value
+
 class VacancyResponse(BaseModel):
     id: int
     title: str
@@ -27,6 +43,7 @@ class VacancyResponse(BaseModel):
     requirements: str
     skills: List[SkillSchema] 
     description: str 
+    profession: Optional[str] = None
     resumes: List[ResumeShort] = []
 
     class Config:
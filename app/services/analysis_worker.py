@@ -0,0 +1,205 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models.employers import JobPosting
+from app.models.jobs import AnalysisJob
+from app.models.job_seekers import Resume
+from app.services.job_queue_service import JobQueueService, JOB_LEASE_SECONDS
+from app.services.resume_service import ResumeService
+from app.services.cv_services import CVService
+from app.services.test_services import TestService
+from app.services.vacancy_service import JobPostingService
+from app.ai.social_analyzer import analyze_social
+from app.ai.sms_sendler import emailProccess
+from app.ai.telemetry import resume_trace
+from dotenv import load_dotenv
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+RESUME_ANALYSIS_JOB = "resume_analysis"
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "3"))
+ANALYSIS_POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_INTERVAL", "2"))
+
+
+async def run_resume_analysis(db: AsyncSession, queue: JobQueueService, job: AnalysisJob):
+    """Email-рассылка и анализ соцсетей для загруженного резюме (бывший background_task)."""
+    resume_id = job.resume_id
+    payload = job.payload
+    gcs_uri = payload["gcs_uri"]
+    ext = payload["ext"]
+
+    service = ResumeService(db)
+    cv_services = CVService(db)
+    test_services = TestService(db)
+
+    resume = await db.get(Resume, resume_id)
+    if resume is None:
+        logger.warning(f"Resume {resume_id} was deleted before analysis, skipping job {job.id}")
+        return
+    vacancy = (await db.execute(
+        select(JobPosting).where(JobPosting.id == payload["vacancy_id"])
+    )).scalar_one_or_none()
+    if vacancy is None:
+        logger.warning(f"Vacancy {payload['vacancy_id']} was deleted before analysis, skipping job {job.id}")
+        return
+
+    text = resume.cv_text
+    if text is None:
+        # Резюме загружено до появления cv_text — извлекаем один раз и сохраняем
+        if ext not in (".pdf", ".docx"):
+            logger.error(f"Unsupported file format in analysis job for resume {resume_id}")
+            return  # повторять бессмысленно
+        text = await cv_services.extract_text(gcs_uri, ext)
+        resume.cv_text = text
+        await db.commit()
+
+    profession = await JobPostingService(db).ensure_profession(vacancy)
+
+    if "emails" not in job.completed_steps:
+        tests_id = await test_services.get_test_ids_by_proffesion(profession)
+        employers_tests = await test_services.get_test_ids_by_proffesion(profession + "(employer)")
+        await emailProccess(resume_id, text, tests_id, employers_tests, resume.fullname, vacancy.user.name, vacancy.title)
+        # Письма уже ушли — при повторе после сбоя соцсетей не отправляем их снова
+        await queue.checkpoint(job, "emails")
+    if payload.get("emails_only"):
+        # Повторная загрузка уже разобранного резюме в другую вакансию — соцсети у него уже есть
+        return
+
+    # Тот же файл уже анализировался для другой вакансии — повторно соцсети не скрапим
+    if await service.copy_social_analysis(resume, profession):
+        return
+    social_skills = await analyze_social(text, vacancy.title, vacancy.description, vacancy.requirements, resume_id,
+                                         profession=profession)
+    await service.resume_skill_add(resume_id, social_skills)
+    await db.commit()
+
+
+JOB_HANDLERS = {
+    RESUME_ANALYSIS_JOB: run_resume_analysis,
+}
+
+
+class AnalysisWorkerPool:
+    """
+    Пул воркеров, разбирающих таблицу analysis_jobs. Может работать внутри API
+    (стартует в lifespan) или отдельным процессом: `python -m app.worker`.
+    """
+
+    def __init__(self, concurrency: int = ANALYSIS_WORKERS, poll_interval: float = ANALYSIS_POLL_INTERVAL,
+                 lease_seconds: int = JOB_LEASE_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.instance_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        for idx in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self.instance_id}:{idx}")))
+        logger.info(f"🚀 Started {self.concurrency} analysis workers ({self.instance_id})")
+
+    def notify(self):
+        """Будит простаивающих воркеров сразу после постановки задачи в очередь."""
+        self._wakeup.set()
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, worker_id: str):
+        while not self._stopping:
+            try:
+                async with AsyncSessionLocal() as db:
+                    job = await JobQueueService(db).claim_next(worker_id, self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                await self._wait_for_work()
+                continue
+            await self._execute(job, worker_id)
+
+    async def _heartbeat(self, job_id: int, worker_id: str, work: asyncio.Task) -> bool:
+        """
+        Продлевает lease, пока идёт обработка. Ошибку БД повторяет чаще обычного, чтобы
+        успеть до истечения lease. Если задачу уже забрал другой воркер — отменяет
+        обработчик и возвращает True.
+        """
+        delay = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                async with AsyncSessionLocal() as db:
+                    held = await JobQueueService(db).extend_lease(job_id, worker_id, self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not extend lease on job {job_id} ({worker_id}), retrying: {e}")
+                delay = min(self.lease_seconds / 3, max(1.0, self.lease_seconds / 10))
+                continue
+            delay = self.lease_seconds / 3
+            if not held:
+                logger.warning(f"Lost lease on job {job_id} ({worker_id}), cancelling its handler")
+                work.cancel()
+                return True
+
+    async def _run_handler(self, handler, job: AnalysisJob):
+        with resume_trace(job.kind, resume_id=job.resume_id, label=f"job {job.id}"):
+            async with AsyncSessionLocal() as db:
+                await handler(db, JobQueueService(db), job)
+
+    async def _execute(self, job: AnalysisJob, worker_id: str):
+        handler = JOB_HANDLERS.get(job.kind)
+        work = heartbeat = None
+        try:
+            logger.info(f"🚀 Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} on {worker_id}")
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{job.kind}'")
+            work = asyncio.create_task(self._run_handler(handler, job))
+            heartbeat = asyncio.create_task(self._heartbeat(job.id, worker_id, work))
+            await work
+            async with AsyncSessionLocal() as db:
+                await JobQueueService(db).mark_done(job.id, worker_id)
+            logger.info(f"✅ Job {job.id} done")
+        except asyncio.CancelledError:
+            lease_lost = heartbeat is not None and heartbeat.done() and not heartbeat.cancelled() and heartbeat.result()
+            if lease_lost and not asyncio.current_task().cancelling():
+                # Задача уже у другого воркера — не трогаем её статус
+                logger.warning(f"Job {job.id} abandoned by {worker_id}")
+                return
+            async with AsyncSessionLocal() as db:
+                await asyncio.shield(JobQueueService(db).release(job.id, worker_id))
+            raise
+        except Exception as e:
+            logger.error(f"💥 Job {job.id} failed: {e}", exc_info=True)
+            async with AsyncSessionLocal() as db:
+                status = await JobQueueService(db).mark_failed(job.id, worker_id, f"{type(e).__name__}: {e}")
+            if status == "dead":
+                logger.error(f"☠️ Job {job.id} moved to dead-letter after {job.attempts} attempts")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            if work is not None and not work.done():
+                work.cancel()
@@ -0,0 +1,158 @@
+import os
+import random
+import logging
+from datetime import datetime, timezone, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_, and_
+from app.models.jobs import AnalysisJob, JobStatus
+from dotenv import load_dotenv
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "10"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "900"))
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter: base * 2^(n-1), capped."""
+    delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(delay / 2, delay)
+
+
+class JobQueueService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, kind: str, payload: dict, resume_id: int | None = None,
+                      max_attempts: int = JOB_MAX_ATTEMPTS, commit: bool = True) -> AnalysisJob:
+        job = AnalysisJob(
+            kind=kind,
+            status=JobStatus.PENDING.value,
+            resume_id=resume_id,
+            payload=payload,
+            completed_steps=[],
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=datetime.now(timezone.utc),
+        )
+        self.db.add(job)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(job)
+        return job
+
+    async def claim_next(self, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS) -> AnalysisJob | None:
+        """
+        Берёт одну готовую задачу под lease. Подхватывает и задачи, чей lease истёк
+        (воркер упал или инстанс был остановлен). SKIP LOCKED позволяет нескольким
+        воркерам/инстансам разбирать очередь без блокировок друг друга.
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            select(AnalysisJob)
+            .where(
+                or_(
+                    and_(AnalysisJob.status == JobStatus.PENDING.value, AnalysisJob.run_after <= now),
+                    and_(AnalysisJob.status == JobStatus.RUNNING.value, AnalysisJob.lease_expires_at < now),
+                )
+            )
+            .order_by(AnalysisJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalars().first()
+        if job is None:
+            await self.db.rollback()
+            return None
+
+        if job.attempts >= job.max_attempts:
+            # Lease истёк на последней попытке — дальше не пробуем
+            job.status = JobStatus.DEAD.value
+            job.last_error = job.last_error or "Lease expired on final attempt"
+            job.finished_at = now
+            job.locked_by = None
+            job.lease_expires_at = None
+            await self.db.commit()
+            logger.error(f"☠️ Job {job.id} moved to dead-letter after lease expiry")
+            return None
+
+        job.status = JobStatus.RUNNING.value
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def extend_lease(self, job_id: int, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS) -> bool:
+        result = await self.db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id,
+                   AnalysisJob.status == JobStatus.RUNNING.value)
+            .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+        )
+        await self.db.commit()
+        return result.rowcount > 0
+
+    async def checkpoint(self, job: AnalysisJob, step: str):
+        """Отмечает шаг как выполненный, чтобы повторная попытка его не повторяла."""
+        job.completed_steps = [*(job.completed_steps or []), step]
+        await self.db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job.id)
+            .values(completed_steps=job.completed_steps)
+        )
+        await self.db.commit()
+
+    async def mark_done(self, job_id: int, worker_id: str):
+        await self.db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id)
+            .values(status=JobStatus.DONE.value, finished_at=datetime.now(timezone.utc),
+                    locked_by=None, lease_expires_at=None, last_error=None)
+        )
+        await self.db.commit()
+
+    async def mark_failed(self, job_id: int, worker_id: str, error: str) -> str:
+        result = await self.db.execute(select(AnalysisJob).where(AnalysisJob.id == job_id))
+        job = result.scalar_one_or_none()
+        if job is None or job.locked_by != worker_id:
+            # Задачу уже перехватил другой воркер после истечения lease
+            await self.db.rollback()
+            return "lost"
+
+        now = datetime.now(timezone.utc)
+        job.last_error = error[:4000]
+        job.locked_by = None
+        job.lease_expires_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.DEAD.value
+            job.finished_at = now
+        else:
+            job.status = JobStatus.PENDING.value
+            job.run_after = now + timedelta(seconds=retry_delay(job.attempts))
+        await self.db.commit()
+        return job.status
+
+    async def release(self, job_id: int, worker_id: str):
+        """Возвращает задачу в очередь без расхода попытки (например, при остановке инстанса)."""
+        await self.db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id)
+            .values(status=JobStatus.PENDING.value, attempts=AnalysisJob.attempts - 1,
+                    locked_by=None, lease_expires_at=None, run_after=datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+
+    async def latest_statuses(self, resume_ids: list[int], kind: str) -> dict[int, str]:
+        """Статус последней задачи данного типа по каждому резюме (для отслеживания прогресса)."""
+        if not resume_ids:
+            return {}
+        result = await self.db.execute(
+            select(AnalysisJob.resume_id, AnalysisJob.status)
+            .where(AnalysisJob.resume_id.in_(resume_ids), AnalysisJob.kind == kind)
+            .order_by(AnalysisJob.id)
+        )
+        return {resume_id: status for resume_id, status in result.all()}
@@ -1,9 +1,49 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.promtps import Prompt 
+from app.models.promtps import Prompt
 
 class PromptService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    # async def create_prompt(self, prompt: PromptCreate, user: User) -> Prompt:
+    async def list_prompts(self) -> list[Prompt]:
+        result = await self.db.execute(select(Prompt).order_by(Prompt.profession_title))
+        return list(result.scalars().all())
 
+    async def get_prompt(self, profession_title: str) -> Prompt | None:
+        return await self.db.scalar(select(Prompt).where(Prompt.profession_title == profession_title))
+
+    async def version_stamp(self) -> tuple[int, int]:
+        """(число строк, max(version)) — меняется при любом upsert/удалении; дешёвый запрос для опроса."""
+        count, version = (await self.db.execute(
+            select(func.count(Prompt.id), func.coalesce(func.max(Prompt.version), 0))
+        )).one()
+        return count, version
+
+    async def upsert_prompt(self, profession_title: str, prompt_for_cv: str | None = None,
+                            prompt_for_media: str | None = None) -> Prompt:
+        """
+        Создаёт или обновляет промпты профессии. None оставляет поле как есть,
+        пустая строка возвращает встроенный промпт. version берётся больше всех
+        существующих, чтобы реестры всех инстансов увидели изменение.
+        """
+        next_version = (await self.db.scalar(select(func.coalesce(func.max(Prompt.version), 0)))) + 1
+        prompt = await self.get_prompt(profession_title)
+        if prompt is None:
+            prompt = Prompt(profession_title=profession_title)
+            self.db.add(prompt)
+        if prompt_for_cv is not None:
+            prompt.prompt_for_cv = prompt_for_cv or None
+        if prompt_for_media is not None:
+            prompt.prompt_for_media = prompt_for_media or None
+        prompt.version = next_version
+        prompt.updated_at = datetime.now(timezone.utc)
+        await self.db.commit()
+        await self.db.refresh(prompt)
+        return prompt
+
+    async def delete_prompt(self, profession_title: str) -> bool:
+        result = await self.db.execute(delete(Prompt).where(Prompt.profession_title == profession_title))
+        await self.db.commit()
+        return result.rowcount > 0
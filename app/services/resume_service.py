@@ -1,4 +1,5 @@
 import os
+import hashlib
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.job_seekers import Resume, Education, Experience, Skill, TypeSkill,HardTotal,TestTotal,FeedbackTotal
@@ -7,6 +8,7 @@ from app.schemas.test_schema import CreateTest
 from sqlalchemy.orm import selectinload
 from sqlalchemy import delete
 from app.services.cv_services import CVService
+from app.ai.analyzer import resume_analysis_task
 from app.models.employers import JobPosting
 from fastapi import FastAPI, HTTPException
 from app.users.models import User
@@ -24,15 +26,31 @@ app = FastAPI()
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "your-default-bucket-name")
 
 
+def scoring_fingerprint(job: JobPosting) -> str:
+    """
+    Hash of everything the hard-skill scoring of a vacancy depends on: requirements, skills,
+    profession and the analyze_resume prompt active for that profession (override or built-in).
+    """
+    skills = "\n".join(sorted(skill.title for skill in job.skills))
+    task = resume_analysis_task(job.profession)
+    parts = [job.requirements or "", skills, job.profession or "", task.model, task.instruction_digest, task.schema_digest]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
 class ResumeService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create_resume(self, resume_data: ResumeCreate, user: User, vacancy_id: int | None = None, gcs_uri: str = None) -> Resume:
+    async def create_resume(self, resume_data: ResumeCreate, user: User, vacancy_id: int | None = None, gcs_uri: str = None,
+                            cv_text: str | None = None, content_sha256: str | None = None,
+                            scoring_fingerprint: str | None = None) -> Resume:
         db_resume = Resume(
             fullname=resume_data.fullname,
             location=resume_data.location,
             cv_gcs_uri=gcs_uri or resume_data.cv_gcs_uri,  # Use provided GCS URI or from schema
+            cv_text=cv_text,
+            content_sha256=content_sha256,
+            scoring_fingerprint=scoring_fingerprint,
         )
 
         if resume_data.hard_total:
@@ -88,6 +106,48 @@ class ResumeService:
         return db_resume
 
 
+    async def find_by_content_hash(self, content_sha256: str, user_id: int) -> list[Resume]:
+        """Резюме пользователя, загруженные из тех же байтов, — новые первыми."""
+        result = await self.db.execute(
+            select(Resume)
+            .where(Resume.content_sha256 == content_sha256, Resume.user_id == user_id)
+            .order_by(Resume.id.desc())
+        )
+        return list(result.scalars().all())
+
+    async def attach_to_vacancy(self, resume: Resume, job: JobPosting) -> Resume:
+        if job not in resume.job_postings:
+            resume.job_postings.append(job)
+            await self.db.commit()
+        return resume
+
+    async def copy_social_analysis(self, resume: Resume, profession: str | None = None) -> bool:
+        """
+        Переносит анализ соцсетей с ранее загруженной копии того же файла
+        (анализ зависит от профессии вакансии — берём копию с той же профессией).
+        Возвращает False, если готового анализа ещё нет.
+        """
+        if not resume.content_sha256:
+            return False
+        for sibling in await self.find_by_content_hash(resume.content_sha256, resume.user_id):
+            if sibling.id == resume.id or sibling.soft_total is None:
+                continue
+            if profession and not any(job.profession == profession for job in sibling.job_postings):
+                continue
+            await self.resume_skill_add(resume.id, {
+                "soft_total": {
+                    "total": sibling.soft_total.total,
+                    "justification": sibling.soft_total.justification,
+                },
+                "skills": [
+                    {"title": skill.title, "level": skill.level, "justification": skill.justification, "type": TypeSkill.SOFT}
+                    for skill in sibling.skills if skill.type == TypeSkill.SOFT
+                ],
+            })
+            logger.info(f"♻️ Reused social analysis of resume {sibling.id} for resume {resume.id}")
+            return True
+        return False
+
     async def resume_skill_add(self, resume_id: int, soft_skills: dict):
         # Проверка на существование резюме
         result = await self.db.execute(select(Resume).where(Resume.id == resume_id))
@@ -291,18 +351,50 @@ class ResumeService:
         resume = result.scalars().first()
         return resume
 
-    async def delete_resume(self, resume_id: int, user: User,commit:bool=True) -> Resume:
+    async def unreferenced_blobs(self, gcs_uris: list[str]) -> list[str]:
+        """
+        Дубликаты одного файла ссылаются на один объект в GCS — удалять его можно
+        только вместе с последней ссылкой. Вызывать после удаления резюме в сессии.
+        """
+        uris = {uri for uri in gcs_uris if uri}
+        if not uris:
+            return []
+        result = await self.db.execute(select(Resume.cv_gcs_uri).where(Resume.cv_gcs_uri.in_(uris)).distinct())
+        still_used = set(result.scalars().all())
+        for uri in uris & still_used:
+            logger.info(f"CV blob still referenced by other resumes, keeping: {uri}")
+        return sorted(uris - still_used)
+
+    async def delete_resume(self, resume_id: int, user: User,commit:bool=True, delete_blob: bool = True,
+                            vacancy_id: int | None = None) -> Resume:
         doc_delete = CVService(self.db)
         resume = await self.get_resume(resume_id, user)
         if not resume:
             return None
 
+        if vacancy_id is not None:
+            if not any(job.id == vacancy_id for job in resume.job_postings):
+                return None
+            if len(resume.job_postings) > 1:
+                # Тот же файл загружен и в другие вакансии — там резюме остаётся, снимаем только привязку
+                resume.job_postings = [job for job in resume.job_postings if job.id != vacancy_id]
+                if commit:
+                    await self.db.commit()
+                return resume
+
         # Удаляем запись из БД
         await self.db.delete(resume)
+        if not delete_blob:
+            # Вызывающий удалит объекты сам, одним batch-запросом (см. delete_job_posting)
+            if commit:
+                await self.db.commit()
+            return resume
+        await self.db.flush()
 
         # 1) Удаляем основной CV, игнорируя 404
         try:
-            await doc_delete.delete_blob_from_gcs(resume.cv_gcs_uri)
+            if await self.unreferenced_blobs([resume.cv_gcs_uri]):
+                await doc_delete.delete_blob_from_gcs(resume.cv_gcs_uri)
         except HTTPException as exc:
             if exc.status_code == 404 or "No such object" in str(exc.detail):
                 logger.warning(f"CV blob not found in GCS, skipping delete: {resume.cv_gcs_uri}")
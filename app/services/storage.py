@@ -0,0 +1,318 @@
+"""
+Shared storage gateway for CV files and reports.
+
+Objects are always addressed by gs://bucket/path URIs, whichever backend is
+configured (STORAGE_BACKEND):
+
+- "gcs": one storage client per process on top of a pooled AuthorizedSession,
+  so credentials are read once and TLS connections are reused across requests;
+- "local": files under STORAGE_LOCAL_ROOT/<bucket>/<path>, for local runs,
+  CI and load tests without any cloud service.
+
+The gateway is built once in the FastAPI lifespan (or the worker entrypoint).
+Blocking I/O runs in a dedicated thread pool, never on the event loop.
+"""
+import os
+import abc
+import asyncio
+import logging
+import shutil
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+from urllib.parse import quote
+
+from google.api_core.exceptions import NotFound
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GCS_CREDENTIALS_PATH = os.getenv("GCS_CREDENTIALS_PATH", "school-kg-7bd58d53b816.json")
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "your-default-bucket-name")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "storage_data")
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "16"))
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(256 * 1024)))
+# Ограничение GCS: не больше 100 операций в одном batch-запросе
+GCS_BATCH_LIMIT = 100
+
+_SCOPES = ["https://www.googleapis.com/auth/devstorage.read_write"]
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    uri: str
+    size: int
+    etag: str | None
+    content_type: str | None
+    updated: datetime | None
+
+
+class StorageGateway(abc.ABC):
+    """Общий интерфейс бэкендов: адресация gs://-URI и пул потоков под блокирующий I/O."""
+    name = "base"
+
+    def __init__(self, bucket_name: str = GCS_BUCKET_NAME, pool_size: int = STORAGE_POOL_SIZE):
+        self.bucket_name = bucket_name
+        self.pool_size = max(1, pool_size)
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="storage")
+        return self._executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def uri_for(self, blob_name: str) -> str:
+        return f"gs://{self.bucket_name}/{blob_name}"
+
+    @staticmethod
+    def split_uri(uri: str) -> tuple[str, str]:
+        if not uri or not uri.startswith("gs://"):
+            raise ValueError(f"Not a gs:// URI: {uri}")
+        bucket, _, blob_name = uri[len("gs://"):].partition("/")
+        if not bucket or not blob_name:
+            raise ValueError(f"Not a gs:// URI: {uri}")
+        return bucket, blob_name
+
+    async def start(self):
+        logger.info(f"🚀 Storage gateway ready: {self.name}, bucket {self.bucket_name}, pool {self.pool_size}")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @abc.abstractmethod
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def upload_file(self, local_path: str, blob_name: str, content_type: str | None = None) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def download(self, uri: str) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def stat(self, uri: str) -> StoredObject:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def read_range(self, uri: str, start: int, end: int) -> bytes:
+        """Байты start..end включительно."""
+        raise NotImplementedError
+
+    async def stream(self, uri: str, start: int = 0, end: int | None = None,
+                     chunk_size: int = STORAGE_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Читает объект (или диапазон байтов start..end включительно) кусками, не держа его целиком в памяти."""
+        if end is None:
+            end = (await self.stat(uri)).size - 1
+        position = start
+        while position <= end:
+            chunk = await self.read_range(uri, position, min(position + chunk_size - 1, end))
+            if not chunk:
+                break
+            yield chunk
+            position += len(chunk)
+
+    async def signed_url(self, uri: str, expires_in: int, filename: str | None = None) -> str | None:
+        """Короткоживущая ссылка на прямое скачивание; None — бэкенд так не умеет."""
+        return None
+
+    @abc.abstractmethod
+    async def delete(self, uri: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def delete_many(self, uris: list[str]) -> None:
+        """Удаляет объекты; отсутствующие объекты не считаются ошибкой."""
+        raise NotImplementedError
+
+
+class GCSStorageGateway(StorageGateway):
+    name = "gcs"
+
+    def __init__(self, credentials_path: str = GCS_CREDENTIALS_PATH, bucket_name: str = GCS_BUCKET_NAME,
+                 pool_size: int = STORAGE_POOL_SIZE):
+        super().__init__(bucket_name, pool_size)
+        self.credentials_path = credentials_path
+        self._client: storage.Client | None = None
+        self._session: AuthorizedSession | None = None
+
+    def _create_client(self) -> storage.Client:
+        credentials = service_account.Credentials.from_service_account_file(self.credentials_path, scopes=_SCOPES)
+        session = AuthorizedSession(credentials)
+        # Пул соединений по размеру пула потоков: каждый поток держит своё keep-alive соединение
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        self._session = session
+        return storage.Client(project=credentials.project_id, credentials=credentials, _http=session)
+
+    @property
+    def client(self) -> storage.Client:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    async def start(self):
+        """Читает ключ сервисного аккаунта и создаёт клиент до первого запроса."""
+        await self._run(lambda: self.client)
+        await super().start()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+        self._client = self._session = None
+        super().close()
+
+    def _blob(self, uri: str) -> storage.Blob:
+        return storage.Blob.from_string(uri, client=self.client)
+
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        uri = self.uri_for(blob_name)
+        await self._run(lambda: self._blob(uri).upload_from_string(data, content_type=content_type))
+        return uri
+
+    async def upload_file(self, local_path: str, blob_name: str, content_type: str | None = None) -> str:
+        uri = self.uri_for(blob_name)
+        await self._run(lambda: self._blob(uri).upload_from_filename(local_path, content_type=content_type))
+        return uri
+
+    async def download(self, uri: str) -> bytes:
+        return await self._run(lambda: self._blob(uri).download_as_bytes())
+
+    async def stat(self, uri: str) -> StoredObject:
+        def _stat():
+            blob = self._blob(uri)
+            blob.reload()
+            return StoredObject(uri=uri, size=blob.size or 0, etag=blob.etag,
+                                content_type=blob.content_type, updated=blob.updated)
+        return await self._run(_stat)
+
+    async def read_range(self, uri: str, start: int, end: int) -> bytes:
+        # Для частичных диапазонов контрольная сумма всего объекта неприменима
+        return await self._run(lambda: self._blob(uri).download_as_bytes(start=start, end=end, checksum=None))
+
+    async def signed_url(self, uri: str, expires_in: int, filename: str | None = None) -> str | None:
+        disposition = f"attachment; filename*=UTF-8''{quote(filename)}" if filename else None
+        # V4-подпись считается локально ключом сервисного аккаунта, запроса в GCS нет
+        return self._blob(uri).generate_signed_url(
+            version="v4", expiration=timedelta(seconds=expires_in), method="GET",
+            response_disposition=disposition,
+        )
+
+    async def delete(self, uri: str):
+        await self._run(lambda: self._blob(uri).delete())
+
+    async def delete_many(self, uris: list[str]) -> None:
+        def _delete(part: list[str]):
+            with self.client.batch(raise_exception=False):
+                for uri in part:
+                    self._blob(uri).delete()
+
+        for offset in range(0, len(uris), GCS_BATCH_LIMIT):
+            await self._run(_delete, uris[offset:offset + GCS_BATCH_LIMIT])
+
+
+class LocalStorageGateway(StorageGateway):
+    """gs://bucket/path -> <root>/bucket/path. Ошибки «нет объекта» — те же NotFound, что и у GCS."""
+    name = "local"
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT, bucket_name: str = GCS_BUCKET_NAME,
+                 pool_size: int = STORAGE_POOL_SIZE):
+        super().__init__(bucket_name, pool_size)
+        self.root = Path(root).resolve()
+
+    def _path(self, uri: str) -> Path:
+        bucket, blob_name = self.split_uri(uri)
+        path = (self.root / bucket / blob_name).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Object path escapes storage root: {uri}")
+        return path
+
+    def _write(self, uri: str, write):
+        path = self._path(uri)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Пишем во временный файл и переименовываем: читатель не увидит недописанный объект
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{id(write)}.tmp")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _read(self, uri: str, start: int = 0, end: int | None = None) -> bytes:
+        try:
+            with open(self._path(uri), "rb") as f:
+                f.seek(start)
+                return f.read() if end is None else f.read(end - start + 1)
+        except FileNotFoundError:
+            raise NotFound(f"No such object: {uri}") from None
+
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        uri = self.uri_for(blob_name)
+        await self._run(self._write, uri, lambda path: path.write_bytes(data))
+        return uri
+
+    async def upload_file(self, local_path: str, blob_name: str, content_type: str | None = None) -> str:
+        uri = self.uri_for(blob_name)
+        await self._run(self._write, uri, lambda path: shutil.copyfile(local_path, path))
+        return uri
+
+    async def download(self, uri: str) -> bytes:
+        return await self._run(self._read, uri)
+
+    async def stat(self, uri: str) -> StoredObject:
+        def _stat():
+            try:
+                st = self._path(uri).stat()
+            except FileNotFoundError:
+                raise NotFound(f"No such object: {uri}") from None
+            return StoredObject(
+                uri=uri,
+                size=st.st_size,
+                etag=f"{st.st_mtime_ns:x}-{st.st_size:x}",
+                content_type=mimetypes.guess_type(uri)[0],
+                updated=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+            )
+        return await self._run(_stat)
+
+    async def read_range(self, uri: str, start: int, end: int) -> bytes:
+        return await self._run(self._read, uri, start, end)
+
+    async def delete(self, uri: str):
+        def _delete():
+            try:
+                self._path(uri).unlink()
+            except FileNotFoundError:
+                raise NotFound(f"No such object: {uri}") from None
+        await self._run(_delete)
+
+    async def delete_many(self, uris: list[str]) -> None:
+        def _delete_all():
+            for uri in uris:
+                self._path(uri).unlink(missing_ok=True)
+        await self._run(_delete_all)
+
+
+def create_storage_gateway(backend: str = STORAGE_BACKEND) -> StorageGateway:
+    if backend == "gcs":
+        return GCSStorageGateway()
+    if backend == "local":
+        return LocalStorageGateway()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage_gateway = create_storage_gateway()
@@ -0,0 +1,113 @@
+"""
+Normalization and compaction of extracted CV text before it goes into LLM prompts.
+
+Extracted text is full of padding whitespace, page headers/footers repeated on every
+page and duplicated table cells. Every one of those characters is paid for in prompt
+tokens on each Gemini call, so the text is compacted once, right after extraction.
+"""
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+
+RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "12000"))
+# Повтор строки короче этого порога может быть осмысленным («Продавец» в двух местах работы)
+MIN_DEDUPE_LINE_LENGTH = 25
+# Колонтитулы ищем только среди первых и последних строк каждой страницы
+PAGE_MARGIN_LINES = int(os.getenv("PAGE_MARGIN_LINES", "3"))
+# Разделитель страниц в извлечённом тексте (см. text_extraction.read_pdf_content)
+PAGE_BREAK = "\f"
+
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u202f\u205f\u3000]+")
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:(?:page|стр\.?|страница)\s*\d{1,3}(?:\s*(?:/|of|из)\s*\d{1,3})?|\d{1,3}\s*(?:/|of|из)\s*\d{1,3})$",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]|\s{2,}")
+TRUNCATION_MARKER = "[…]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate: words, punctuation and runs of whitespace."""
+    return len(_TOKEN_RE.findall(text))
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    text: str
+    original_chars: int
+    compacted_chars: int
+    original_tokens: int
+    compacted_tokens: int
+    truncated: bool
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.saved_tokens / self.original_tokens if self.original_tokens else 0.0
+
+
+def _line_key(line: str) -> str:
+    return line.casefold()
+
+
+def truncate_for_prompt(text: str, max_chars: int = RESUME_MAX_CHARS) -> str:
+    """
+    Обрезает текст резюме для промпта LLM по границе строки. Сохраняемый cv_text не
+    обрезается: регулярки контактов и правила оценки читают его целиком.
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[: cut if cut > max_chars // 2 else max_chars].rstrip() + "\n" + TRUNCATION_MARKER
+
+
+def compact_resume_text(text: str, max_chars: int | None = None) -> CompactionResult:
+    """Нормализует и убирает колонтитулы; max_chars дополнительно обрезает (см. truncate_for_prompt)."""
+    normalized = unicodedata.normalize("NFKC", text or "").replace("\r\n", "\n").replace("\r", "\n")
+
+    # Колонтитулы: длинная строка в начале или конце страницы, повторяющаяся на нескольких
+    # страницах, остаётся один раз. Повторы в теле страницы (одинаковые обязанности на двух
+    # местах работы) не трогаем.
+    seen: set[str] = set()
+    compacted: list[str] = []
+    previous = None
+    for page in normalized.split(PAGE_BREAK):
+        lines = [_HORIZONTAL_SPACE_RE.sub(" ", line).strip() for line in page.split("\n")]
+        content = [index for index, line in enumerate(lines) if line]
+        margin = set(content[:PAGE_MARGIN_LINES] + content[-PAGE_MARGIN_LINES:])
+        for index, line in enumerate(lines + [""]):
+            if not line:
+                if compacted and compacted[-1] != "":
+                    compacted.append("")
+                previous = None
+                continue
+            if _PAGE_NUMBER_RE.match(line):
+                continue
+            key = _line_key(line)
+            if key == previous:
+                continue
+            if index in margin and len(line) >= MIN_DEDUPE_LINE_LENGTH:
+                if key in seen:
+                    continue
+                seen.add(key)
+            compacted.append(line)
+            previous = key
+
+    result = "\n".join(compacted).strip()
+    truncated = False
+    if max_chars is not None and len(result) > max_chars:
+        result = truncate_for_prompt(result, max_chars)
+        truncated = True
+
+    return CompactionResult(
+        text=result,
+        original_chars=len(text or ""),
+        compacted_chars=len(result),
+        original_tokens=estimate_tokens(text or ""),
+        compacted_tokens=estimate_tokens(result),
+        truncated=truncated,
+    )
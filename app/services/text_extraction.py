@@ -0,0 +1,322 @@
+"""
+Process-pool text extraction for uploaded CVs.
+
+pdfplumber/python-docx are pure-Python and CPU-bound, so running them in the
+default thread executor serializes a batch under the GIL and starves the event
+loop. Extraction runs in a dedicated pool of warm worker processes instead. A
+document that exceeds EXTRACTION_TIMEOUT gets its process killed and replaced;
+the other workers keep going.
+PDFs go through a fast pdfium pass first; pdfplumber's slow layout mode is only
+used for pages where the fast output looks degenerate.
+This module is imported by the spawned workers, so keep its imports light.
+"""
+import io
+import os
+import asyncio
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+
+import pdfplumber
+import pypdfium2 as pdfium
+from docx import Document
+
+from app.services.text_compaction import PAGE_BREAK
+
+logger = logging.getLogger(__name__)
+
+# Небольшое фиксированное число: на инстансе Cloud Run cpu_count не равен выделенным vCPU,
+# а каждый процесс держит свою копию pdfplumber/pdfium в памяти
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "30"))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "15"))
+# Меньше этого числа непробельных символов на странице — быстрый режим считаем неудачным
+PDF_MIN_CHARS_PER_PAGE = int(os.getenv("PDF_MIN_CHARS_PER_PAGE", "200"))
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def _column_split(rects: list[tuple], page_width: float, bins: int = 60) -> float | None:
+    """
+    Finds an empty vertical strip in the middle of the page with text on both
+    sides (a two-column CV). Returns the x coordinate of the gutter or None.
+    """
+    if not rects or not page_width:
+        return None
+    scale = bins / float(page_width)
+    occupancy = [0] * bins
+    for x0, _, x1, _ in rects:
+        first = max(0, min(bins - 1, int(x0 * scale)))
+        last = max(0, min(bins - 1, int(x1 * scale)))
+        for b in range(first, last + 1):
+            occupancy[b] += 1
+
+    # Заголовок/контакты во всю ширину страницы не должны «закрывать» промежуток между колонками
+    empty = max(2, int(len(rects) * 0.05))
+    run_start, best = None, None
+    for b in range(bins // 4, 3 * bins // 4 + 1):
+        if occupancy[b] <= empty:
+            run_start = b if run_start is None else run_start
+            if best is None or b - run_start > best[1] - best[0]:
+                best = (run_start, b)
+        else:
+            run_start = None
+    if best is None or best[1] - best[0] + 1 < 2:
+        return None
+
+    split = (best[0] + best[1] + 1) / 2 / scale
+    left = [r for r in rects if r[2] <= split]
+    right = [r for r in rects if r[0] >= split]
+    if min(len(left), len(right)) < 0.1 * len(rects):
+        return None
+    # Колонки должны стоять рядом, а не одна под другой (координаты pdfium: y растёт вверх)
+    overlap = min(max(r[3] for r in left), max(r[3] for r in right)) - max(min(r[1] for r in left), min(r[1] for r in right))
+    shorter = min(max(r[3] for r in side) - min(r[1] for r in side) for side in (left, right))
+    if shorter <= 0 or overlap / shorter < 0.5:
+        return None
+    return split
+
+
+def _is_interleaved(rects: list[tuple], split: float) -> bool:
+    # В правильном порядке чтения колонки идут блоками: переходов слева-направо мало
+    sides = [r[0] >= split for r in rects if r[2] <= split or r[0] >= split]
+    transitions = sum(1 for a, b in zip(sides, sides[1:]) if a != b)
+    return transitions > 4
+
+
+def _is_degenerate(text: str, char_count: int, rects: list[tuple], page_width: float) -> bool:
+    visible = "".join(text.split())
+    # Мало видимого текста на странице — перечитываем в layout-режиме; страницу без
+    # текстового слоя (скан) не трогаем: pdfplumber там тоже ничего не найдёт
+    if char_count and len(visible) < PDF_MIN_CHARS_PER_PAGE:
+        return True
+    # Шрифты без ToUnicode дают «кракозябры» вместо текста
+    if visible and sum(1 for ch in visible if ch == "\ufffd" or not ch.isprintable()) / len(visible) > 0.1:
+        return True
+    split = _column_split(rects, page_width)
+    return split is not None and _is_interleaved(rects, split)
+
+
+def _fast_page_text(page) -> tuple[str, bool]:
+    """pdfium text in content-stream order; an order of magnitude faster than pdfplumber."""
+    textpage = page.get_textpage()
+    try:
+        text = textpage.get_text_range()
+        rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+        return text, _is_degenerate(text, textpage.count_chars(), rects, page.get_width())
+    finally:
+        textpage.close()
+
+
+def extract_pdf_pages(pdf_content: bytes, max_pages: int = EXTRACTION_MAX_PAGES, mode: str = "auto") -> tuple[list[str], int]:
+    """
+    mode="auto": fast pdfium extraction, with the slow pdfplumber layout mode only
+    for pages whose fast output looks degenerate. "fast"/"layout" force one tier.
+    Returns page texts and the number of pages that fell back to layout mode.
+    """
+    texts: list[str] = []
+    fallback: list[int] = []
+    if mode != "layout":
+        doc = pdfium.PdfDocument(pdf_content)
+        try:
+            for index in range(min(len(doc), max_pages)):
+                page = doc[index]
+                try:
+                    text, degenerate = _fast_page_text(page)
+                finally:
+                    page.close()
+                texts.append(text)
+                if mode == "auto" and degenerate:
+                    fallback.append(index)
+        finally:
+            doc.close()
+    else:
+        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+            fallback = list(range(min(len(pdf.pages), max_pages)))
+            texts = [""] * len(fallback)
+
+    if fallback:
+        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+            for index in fallback:
+                page = pdf.pages[index]
+                texts[index] = page.extract_text(layout=True) or ""
+                page.close()  # освобождаем кэш объектов страницы
+    return texts, (len(fallback) if mode == "auto" else 0)
+
+
+def read_pdf_content(pdf_content: bytes, max_pages: int = EXTRACTION_MAX_PAGES, mode: str = "auto") -> str:
+    try:
+        texts, _ = extract_pdf_pages(pdf_content, max_pages, mode)
+    except Exception as e:
+        # Handle pdfium/pdfplumber errors, e.g., corrupted PDF
+        raise ExtractionError(f"Could not process PDF content: {e}") from None
+    # Границы страниц сохраняем: по ним compact_resume_text находит колонтитулы
+    return PAGE_BREAK.join(t for t in texts if t)
+
+
+def read_docx_content(docx_content: bytes) -> str:
+    try:
+        doc = Document(io.BytesIO(docx_content))
+        full_text = []
+
+        for para in doc.paragraphs:
+            if para.text.strip():
+                full_text.append(para.text.strip())
+
+        for table in doc.tables:
+            for row in table.rows:
+                seen_cells = set()
+                for cell in row.cells:
+                    # Объединённая ячейка возвращается python-docx для каждой колонки, которую она занимает
+                    if id(cell._tc) in seen_cells:
+                        continue
+                    seen_cells.add(id(cell._tc))
+                    if cell.text.strip():
+                        full_text.append(cell.text.strip())
+
+        return "\n".join(full_text)
+    except Exception as e:
+        raise ExtractionError(f"Could not process DOCX content: {e}") from None
+
+
+_READERS = {
+    ".pdf": read_pdf_content,
+    ".docx": read_docx_content,
+}
+
+
+def _worker_main(conn):
+    """Цикл дочернего процесса: (ext, bytes) -> (True, текст) или (False, ошибка); None — выход."""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        ext, content = request
+        if ext is None:
+            # Прогрев: импорт этого модуля уже подтянул pdfplumber/docx
+            conn.send((True, os.getpid()))
+            continue
+        try:
+            conn.send((True, _READERS[ext](content)))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+def _roundtrip(conn, request):
+    conn.send(request)
+    return conn.recv()
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    conn: Connection
+
+
+class ExtractionPool:
+    """
+    Свои процессы вместо ProcessPoolExecutor: у executor нельзя снять одну зависшую
+    задачу, а здесь процесс с таким документом убивается и заменяется новым,
+    остальные документы продолжают разбираться.
+    """
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        # spawn: не наследуем потоки и сокеты (GCS, asyncpg) родительского процесса
+        self._context = multiprocessing.get_context("spawn")
+        self._all: list[_Worker] = []
+        self._idle: asyncio.Queue[_Worker] | None = None
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True,
+                                        name="text-extraction")
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        self._all.append(worker)
+        return worker
+
+    def _ensure_started(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.workers):
+                self._idle.put_nowait(self._spawn())
+
+    def _kill(self, worker: _Worker, close: bool = True):
+        if worker in self._all:
+            self._all.remove(worker)
+        worker.process.kill()
+        worker.process.join(timeout=1)
+        if close:
+            worker.conn.close()
+
+    def _replace(self, worker: _Worker, close: bool = True):
+        self._kill(worker, close)
+        if self._idle is not None:
+            self._idle.put_nowait(self._spawn())
+
+    def _release(self, worker: _Worker, future: asyncio.Future):
+        # Вызывающего отменили посреди разбора — процесс возвращается в пул, только когда ответил
+        if future.cancelled() or future.exception() is not None:
+            self._replace(worker)
+        elif self._idle is not None:
+            self._idle.put_nowait(worker)
+
+    async def start(self):
+        """Поднимает все процессы заранее, чтобы первая загрузка не платила за spawn и импорты."""
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        workers = [self._idle.get_nowait() for _ in range(self._idle.qsize())]
+        try:
+            pids = await asyncio.gather(*[
+                loop.run_in_executor(None, _roundtrip, worker.conn, (None, None)) for worker in workers
+            ])
+        finally:
+            for worker in workers:
+                self._idle.put_nowait(worker)
+        logger.info(f"🚀 Text extraction pool ready: {len(pids)} worker processes")
+
+    def shutdown(self):
+        for worker in list(self._all):
+            self._kill(worker)
+        self._idle = None
+
+    async def extract(self, content: bytes, ext: str) -> str:
+        if ext not in _READERS:
+            raise ExtractionError(f"Unsupported file format: {ext}")
+
+        self._ensure_started()
+        worker = await self._idle.get()
+        loop = asyncio.get_running_loop()
+        # Таймаут считается от начала разбора, а не от ожидания свободного процесса
+        future = loop.run_in_executor(None, _roundtrip, worker.conn, (ext, content))
+        try:
+            ok, result = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Text extraction exceeded {self.timeout}s, killing worker {worker.process.pid}")
+            # Поток в _roundtrip получит EOF от убитого процесса — соединение закрываем после него
+            self._replace(worker, close=False)
+            future.add_done_callback(lambda done: (done.exception(), worker.conn.close()))
+            raise ExtractionError(f"Text extraction timed out after {self.timeout}s")
+        except asyncio.CancelledError:
+            future.add_done_callback(lambda done: self._release(worker, done))
+            raise
+        except (EOFError, OSError) as e:
+            logger.error(f"Text extraction worker {worker.process.pid} died: {e}")
+            self._replace(worker)
+            raise ExtractionError("Text extraction worker crashed")
+        self._idle.put_nowait(worker)
+        if not ok:
+            raise ExtractionError(result)
+        return result
+
+
+extraction_pool = ExtractionPool()
@@ -0,0 +1,186 @@
+"""
+In-process registry of batch CV uploads and their per-file progress.
+
+A batch is processed by a bounded set of workers; every stage a file goes
+through (uploaded, extracted, scored, social_done, failed) is appended to the
+batch's event log, which SSE subscribers replay and then follow live.
+The social analysis runs in the job queue (possibly in another process), so
+its completion is picked up by polling analysis_jobs. Files whose analysis
+has not finished SOCIAL_WATCH_DEADLINE seconds after the batch started are
+reported as timed out. A batch still unfinished after UPLOAD_BATCH_TTL is
+cancelled and evicted like a finished one.
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from app.database import AsyncSessionLocal
+from app.models.jobs import JobStatus
+from app.services.job_queue_service import JobQueueService
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_BATCH_TTL = int(os.getenv("UPLOAD_BATCH_TTL", "3600"))
+SOCIAL_POLL_INTERVAL = float(os.getenv("SOCIAL_POLL_INTERVAL", "5"))
+SOCIAL_WATCH_DEADLINE = float(os.getenv("SOCIAL_WATCH_DEADLINE", "1800"))
+
+STAGE_UPLOADED = "uploaded"
+STAGE_EXTRACTED = "extracted"
+STAGE_SCORED = "scored"
+STAGE_SOCIAL_DONE = "social_done"
+STAGE_FAILED = "failed"
+STAGE_TIMED_OUT = "timed_out"
+STAGE_BATCH_DONE = "batch_done"
+
+
+@dataclass
+class BatchEvent:
+    id: int
+    stage: str
+    data: dict
+
+
+@dataclass
+class UploadBatch:
+    id: str
+    user_id: int
+    vacancy_id: int
+    filenames: list[str]
+    events: list[BatchEvent] = field(default_factory=list)
+    finished: bool = False
+    timed_out: bool = False
+    created_at: float = field(default_factory=time.monotonic)
+    task: asyncio.Task | None = None
+    _changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    async def publish(self, stage: str, **data):
+        async with self._changed:
+            self.events.append(BatchEvent(id=len(self.events) + 1, stage=stage, data=data))
+            if stage == STAGE_BATCH_DONE:
+                self.finished = True
+            self._changed.notify_all()
+
+    async def follow(self, after: int = 0, keepalive: float = 15):
+        """
+        Отдаёт события с номером больше `after`, затем ждёт новые до конца батча.
+        None означает «новых событий нет» — вызывающий шлёт keep-alive.
+        """
+        position = after
+        while True:
+            async with self._changed:
+                if position >= len(self.events) and not self.finished:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=keepalive)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = self.events[position:]
+                finished = self.finished
+            if not pending:
+                if finished:
+                    return
+                yield None
+                continue
+            for event in pending:
+                yield event
+            position += len(pending)
+
+    def snapshot(self) -> dict:
+        """Последняя стадия по каждому файлу — для клиентов без SSE."""
+        files = {index: {"filename": name, "stage": None} for index, name in enumerate(self.filenames)}
+        for event in self.events:
+            index = event.data.get("index")
+            if index in files:
+                files[index] = {**files[index], **event.data, "stage": event.stage}
+        return {"batch_id": self.id, "finished": self.finished, "timed_out": self.timed_out,
+                "files": list(files.values())}
+
+
+class UploadBatchRegistry:
+    def __init__(self, ttl: int = UPLOAD_BATCH_TTL):
+        self.ttl = ttl
+        self._batches: dict[str, UploadBatch] = {}
+
+    def create(self, user_id: int, vacancy_id: int, filenames: list[str]) -> UploadBatch:
+        self._evict()
+        batch = UploadBatch(id=uuid.uuid4().hex, user_id=user_id, vacancy_id=vacancy_id, filenames=filenames)
+        self._batches[batch.id] = batch
+        return batch
+
+    def get(self, batch_id: str, user_id: int) -> UploadBatch | None:
+        self._evict()
+        batch = self._batches.get(batch_id)
+        if batch is None or batch.user_id != user_id:
+            return None
+        return batch
+
+    def _evict(self):
+        now = time.monotonic()
+        for batch_id, batch in list(self._batches.items()):
+            if now - batch.created_at <= self.ttl:
+                continue
+            if not batch.finished and batch.task and not batch.task.done():
+                # Зависший батч не должен жить в памяти вечно вместе с байтами файлов
+                logger.warning(f"Batch {batch_id} still running after {self.ttl}s, cancelling")
+                batch.task.cancel()
+            del self._batches[batch_id]
+
+    async def shutdown(self):
+        tasks = [batch.task for batch in self._batches.values() if batch.task and not batch.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def watch_social_analysis(batch: UploadBatch, resumes: dict[int, list[int]], uploads_done: asyncio.Event,
+                                kind: str, poll_interval: float = SOCIAL_POLL_INTERVAL,
+                                deadline: float = SOCIAL_WATCH_DEADLINE):
+    """
+    Одним циклом опрашивает analysis_jobs по всем резюме батча (resume_id -> индексы файлов).
+    `resumes` пополняется по мере оценки файлов; цикл завершается, когда загрузки
+    закончились и по каждому резюме пришёл итог, или через `deadline` секунд —
+    тогда оставшиеся файлы получают timed_out.
+    """
+    expires = time.monotonic() + deadline
+    while True:
+        if time.monotonic() >= expires:
+            batch.timed_out = True
+            logger.warning(f"Batch {batch.id}: social analysis of {len(resumes)} resumes not finished "
+                           f"after {deadline:.0f}s")
+            for resume_id in list(resumes):
+                for index in resumes.pop(resume_id):
+                    await batch.publish(STAGE_TIMED_OUT, index=index, filename=batch.filenames[index], id=resume_id,
+                                        error="Social analysis timed out")
+            return
+        if not resumes:
+            if uploads_done.is_set():
+                return
+            await asyncio.sleep(poll_interval)
+            continue
+        try:
+            async with AsyncSessionLocal() as db:
+                statuses = await JobQueueService(db).latest_statuses(list(resumes), kind)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Batch {batch.id}: could not poll analysis jobs: {e}")
+            await asyncio.sleep(poll_interval)
+            continue
+        for resume_id in list(resumes):
+            status = statuses.get(resume_id)
+            if status in (None, JobStatus.DONE.value):
+                # None — резюме, загруженное до очереди задач (повторная загрузка того же файла)
+                stage, extra = STAGE_SOCIAL_DONE, {}
+            elif status == JobStatus.DEAD.value:
+                stage, extra = STAGE_FAILED, {"error": "Social analysis failed"}
+            else:
+                continue
+            for index in resumes.pop(resume_id):
+                await batch.publish(stage, index=index, filename=batch.filenames[index], id=resume_id, **extra)
+        if resumes or not uploads_done.is_set():
+            await asyncio.sleep(poll_interval)
+
+
+upload_batches = UploadBatchRegistry()
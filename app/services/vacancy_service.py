@@ -1,14 +1,19 @@
 import re
 import difflib
+import logging
 from statistics import mean
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.users.models import User
 from app.models.employers import VacancySkill, JobPosting  
-from app.schemas.vacancy_schema import VacancyCreate
+from app.schemas.vacancy_schema import VacancyCreate, VacancyUpdate
 from app.models.job_seekers import Resume
 from app.services.resume_service import ResumeService
+from app.services.storage import storage_gateway
+from app.ai.social_analyzer import analyze_proffesion
+
+logger = logging.getLogger(__name__)
 
 def normalize(skill: str) -> str:
     """
@@ -46,6 +51,8 @@ class JobPostingService:
             salary=job_data.salary,
             user_id=user.id,
             requirements = job_data.requirements,
+            # Профессия зависит только от вакансии — не пересчитываем её на каждое резюме
+            profession=await analyze_proffesion(job_data.title, job_data.description, job_data.requirements),
             skills=[
                 VacancySkill(
                     title=skill.title,
@@ -58,6 +65,34 @@ class JobPostingService:
         await self.db.refresh(db_job)
         return db_job
 
+    async def update_job_posting(self, job_id: int, job_data: VacancyUpdate, user: User) -> JobPosting | None:
+        job = await self.get_job_posting(job_id, user)
+        if not job:
+            return None
+
+        changes = job_data.model_dump(exclude_unset=True, exclude={"skills"})
+        reclassify = any(
+            field in changes and changes[field] != getattr(job, field)
+            for field in ("title", "description", "requirements")
+        )
+        for field, value in changes.items():
+            setattr(job, field, value)
+        if job_data.skills is not None:
+            job.skills = [VacancySkill(title=skill.title) for skill in job_data.skills]
+        if reclassify or job.profession is None:
+            job.profession = await analyze_proffesion(job.title, job.description, job.requirements)
+
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def ensure_profession(self, job: JobPosting) -> str:
+        """Профессия вакансии; для вакансий, созданных до появления колонки, считается и сохраняется."""
+        if job.profession is None:
+            job.profession = await analyze_proffesion(job.title, job.description, job.requirements)
+            await self.db.commit()
+        return job.profession
+
     async def get_job_posting(self, job_id: int, user: User) -> JobPosting:
         result = await self.db.execute(
             select(JobPosting)
@@ -129,12 +164,24 @@ class JobPostingService:
     )
         resumes = result.scalars().all()
 
+        # Резюме, повторно загруженное в другую вакансию, остаётся там — удаляется только связь
+        resumes = [resume for resume in resumes if all(job.id == job_id for job in resume.job_postings)]
+
         # ❌ Удалить каждое резюме
+        gcs_uris = [resume.cv_gcs_uri for resume in resumes]
         for resume in resumes:
-            await resume_service.delete_resume(resume.id, resume.user, commit=False)
+            await resume_service.delete_resume(resume.id, resume.user, commit=False, delete_blob=False)
 
         # ❌ Удаляем саму вакансию
         await self.db.delete(job)
+        await self.db.flush()
+        orphaned = await resume_service.unreferenced_blobs(gcs_uris)
 
         await self.db.commit()
+        # Файлы удаляем после коммита и одним batch-запросом, а не по запросу на резюме
+        if orphaned:
+            try:
+                await storage_gateway.delete_many(orphaned)
+            except Exception as e:
+                logger.warning(f"Could not delete {len(orphaned)} CV blobs of vacancy {job_id}: {e}")
         return True
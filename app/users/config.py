@@ -8,6 +8,8 @@ from fastapi import Request
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from sqlalchemy.orm import selectinload
+import os
+import secrets
 
 
 config = AuthXConfig()
@@ -20,6 +22,15 @@ config.JWT_COOKIE_SECURE = True
 config.JWT_TOKEN_LOCATION = ["cookies", "headers"]
 security = AuthX(config, model=User)
 
+# Токен операторов для служебных эндпоинтов (статистика шлюза LLM); не задан — эндпоинты закрыты
+OPS_API_TOKEN = os.getenv("OPS_API_TOKEN")
+
+
+async def require_operator(request: Request):
+    token = request.headers.get("X-Ops-Token")
+    if not OPS_API_TOKEN or not token or not secrets.compare_digest(token, OPS_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Operator access required")
+
 
 
 async def safe_get_current_subject(request: Request, db: AsyncSession = Depends(get_db)) -> User:
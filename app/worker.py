@@ -0,0 +1,60 @@
+# worker.py
+# Отдельный процесс воркеров анализа резюме: `python -m app.worker`.
+# Позволяет масштабировать обработку независимо от API (в API ставим ANALYSIS_WORKERS=0).
+import os
+import asyncio
+import signal
+import logging
+from dotenv import load_dotenv
+load_dotenv(override=True)
+from app.database import engine
+from app.models.base import Base
+import app.models  # noqa: F401  регистрирует все таблицы в Base.metadata
+from app.services.analysis_worker import AnalysisWorkerPool
+from app.services.text_extraction import extraction_pool
+from app.services.storage import storage_gateway
+from app.ai.gateway import llm_gateway
+from app.ai.prompt_registry import prompt_registry
+from app.ai.brightdata import brightdata_client
+from prometheus_client import start_http_server
+
+logger = logging.getLogger(__name__)
+
+# Порт для /metrics отдельного процесса воркеров (у API свой — METRICS_PORT в app/main.py)
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+        logger.info(f"📈 Worker metrics on :{WORKER_METRICS_PORT}/metrics")
+
+    await storage_gateway.start()
+    await extraction_pool.start()
+    await prompt_registry.start()
+    await brightdata_client.start()
+    pool = AnalysisWorkerPool()
+    pool.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("Stopping analysis workers...")
+    await pool.stop()
+    await prompt_registry.stop()
+    extraction_pool.shutdown()
+    storage_gateway.close()
+    await llm_gateway.close()
+    await brightdata_client.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
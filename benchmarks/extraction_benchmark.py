@@ -0,0 +1,141 @@
+"""
+Benchmark: fast pdfium extraction vs pdfplumber layout mode vs the tiered "auto" mode
+over a corpus of synthetic CVs: single-column, two-column, and two-column PDFs whose
+content stream is written row by row across both columns (interleaved reading order).
+
+    python -m benchmarks.extraction_benchmark --cvs 30 --pages 2
+"""
+import io
+import time
+import random
+import argparse
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from app.services.text_extraction import extract_pdf_pages
+from app.services.text_compaction import compact_resume_text, estimate_tokens
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+pdfmetrics.registerFont(TTFont("Arial", str(BASE_DIR / "util/arialmt.ttf")))
+
+NAMES = ["Айбек Садыров", "Мария Иванова", "Нурлан Токтогулов", "Elena Petrova", "Азамат Абдыкадыров"]
+POSITIONS = ["Продавец-консультант", "Менеджер по продажам", "Кассир", "Sales manager", "Старший продавец"]
+COMPANIES = ["ОсОО Глобус", "Народный", "Фрунзе", "Beeline", "Дордой Плаза", "ТЦ Ташрабат"]
+DUTIES = [
+    "консультирование покупателей по ассортименту", "работа с кассой и 1С Торговля и склад",
+    "выкладка товара и контроль остатков в МойСклад", "ведение клиентской базы в CRM",
+    "выполнение плана продаж на 120%", "проведение презентаций продукта",
+    "обучение новых сотрудников", "работа с возражениями клиентов",
+]
+SKILLS = ["СБИС", "МойСклад", "1С", "Excel", "CRM", "Кыргызский", "Русский", "English", "Права категории B"]
+
+def _experience_lines(rng: random.Random) -> list[str]:
+    lines = []
+    for _ in range(rng.randint(3, 5)):
+        start = rng.randint(2010, 2021)
+        lines.append(f"{rng.choice(POSITIONS)} — {rng.choice(COMPANIES)}, {start}–{start + rng.randint(1, 3)}")
+        lines += [f"• {d}" for d in rng.sample(DUTIES, 3)]
+    return lines
+
+
+LAYOUTS = ("single", "two-column", "interleaved")
+
+
+def make_cv(rng: random.Random, pages: int, layout: str) -> bytes:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        c.setFont("Arial", 10)
+        y = height - 60
+        if page == 0:
+            c.setFont("Arial", 16)
+            c.drawString(50, y, rng.choice(NAMES))
+            c.setFont("Arial", 10)
+            y -= 24
+            c.drawString(50, y, f"Бишкек • +996 555 {rng.randint(100000, 999999)} • cv{rng.randint(1, 999)}@gmail.com")
+            y -= 30
+        main_lines = _experience_lines(rng) * 2
+        side_lines = SKILLS + SKILLS[: rng.randint(2, 6)]
+        if layout == "single":
+            for line in main_lines:
+                if y < 60:
+                    break
+                c.drawString(50, y, line)
+                y -= 14
+        elif layout == "two-column":
+            # Боковая колонка целиком, затем основной опыт
+            side_y = y
+            for skill in side_lines:
+                c.drawString(50, side_y, skill)
+                side_y -= 14
+            for line in main_lines:
+                if y < 60:
+                    break
+                c.drawString(220, y, line)
+                y -= 14
+        else:
+            # Генератор пишет поток построчно через обе колонки
+            for row, line in enumerate(main_lines):
+                if y < 60:
+                    break
+                if row < len(side_lines):
+                    c.drawString(50, y, side_lines[row])
+                c.drawString(220, y, line)
+                y -= 14
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def run(cvs: int, pages: int, seed: int):
+    rng = random.Random(seed)
+    corpus = [make_cv(rng, pages, LAYOUTS[i % len(LAYOUTS)]) for i in range(cvs)]
+    # Прогрев: загрузка шрифтов/cmap не должна попадать в замер первого режима
+    for mode in ("fast", "layout"):
+        extract_pdf_pages(corpus[0], mode=mode)
+
+    results = {}
+    for mode in ("fast", "layout", "auto"):
+        elapsed, tokens, chars, fallbacks = 0.0, 0, 0, 0
+        for pdf_bytes in corpus:
+            started = time.perf_counter()
+            texts, fell_back = extract_pdf_pages(pdf_bytes, mode=mode)
+            elapsed += time.perf_counter() - started
+            text = "\n".join(texts)
+            tokens += estimate_tokens(text)
+            chars += len(text)
+            fallbacks += fell_back
+        results[mode] = (elapsed, tokens, chars, fallbacks)
+
+    # Тот же auto-режим плюс стадия сжатия, через которую текст идёт в LLM
+    elapsed, tokens, chars, fallbacks = 0.0, 0, 0, 0
+    for pdf_bytes in corpus:
+        started = time.perf_counter()
+        texts, fell_back = extract_pdf_pages(pdf_bytes, mode="auto")
+        compacted = compact_resume_text("\n".join(texts))
+        elapsed += time.perf_counter() - started
+        tokens += compacted.compacted_tokens
+        chars += compacted.compacted_chars
+        fallbacks += fell_back
+    results["auto+compact"] = (elapsed, tokens, chars, fallbacks)
+
+    total_pages = cvs * pages
+    print(f"{cvs} synthetic CVs x {pages} pages ({total_pages} pages; layouts: {', '.join(LAYOUTS)})\n")
+    print(f"{'mode':<14}{'total s':>10}{'ms/page':>10}{'tokens':>12}{'chars':>12}{'layout fallbacks':>18}")
+    for mode, (elapsed, tokens, chars, fallbacks) in results.items():
+        print(f"{mode:<14}{elapsed:>10.2f}{elapsed / total_pages * 1000:>10.1f}{tokens:>12}{chars:>12}"
+              f"{(fallbacks if mode.startswith('auto') else '-'):>18}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.cvs, args.pages, args.seed)
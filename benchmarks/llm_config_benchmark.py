@@ -0,0 +1,78 @@
+"""
+Benchmark: building the Gemini request config on every call vs taking it from
+the import-time registry (app/ai/task_configs.py). For every registered task it
+measures CPU time and allocations of what a request does before the network call:
+the config (schemas, system instruction parts, GenerateContentConfig), the
+llm_cache key and the user contents.
+
+    python -m benchmarks.llm_config_benchmark --calls 1000
+"""
+import time
+import argparse
+import tracemalloc
+
+# Импорт модулей регистрирует задачи в TASK_CONFIGS
+import app.ai.analyzer  # noqa: F401
+import app.ai.social_analyzer  # noqa: F401
+from app.ai.task_configs import TASK_BUILDERS, TASK_CONFIGS
+
+PROMPT = (
+    "Айбек Садыров\nПродавец-консультант\n+996 555 123 456 | aibek@gmail.com\n\n"
+    + "ОсОО Глобус, продавец-консультант, 2019–2023: консультирование покупателей, "
+      "работа с кассой и 1С, выкладка товара и контроль остатков.\n" * 40
+)
+
+
+def per_call(name: str):
+    task = TASK_BUILDERS[name]()
+    return task.config, task.cache_key(PROMPT), task.contents(PROMPT)
+
+
+def registry(name: str):
+    task = TASK_CONFIGS[name]
+    return task.config, task.cache_key(PROMPT), task.contents(PROMPT)
+
+
+def measure(fn, name: str, calls: int) -> tuple[float, int]:
+    """(мс CPU на вызов, пик выделенной памяти на вызов в байтах)"""
+    fn(name)
+    started = time.process_time()
+    for _ in range(calls):
+        fn(name)
+    cpu_ms = (time.process_time() - started) / calls * 1000
+
+    # Аллокации отдельно: tracemalloc сильно замедляет сам замер времени
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(name)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - base
+    tracemalloc.stop()
+    return cpu_ms, allocated // calls
+
+
+def run(calls: int):
+    print(f"{calls} calls per task, prompt {len(PROMPT)} chars\n")
+    print(f"{'task':<40}{'mode':<10}{'ms/call':>10}{'KiB/call':>10}{'speedup':>10}")
+    totals = {"per-call": 0.0, "registry": 0.0}
+    for name in TASK_CONFIGS:
+        base_ms, base_bytes = measure(per_call, name, calls)
+        cached_ms, cached_bytes = measure(registry, name, calls)
+        totals["per-call"] += base_ms
+        totals["registry"] += cached_ms
+        print(f"{name:<40}{'per-call':<10}{base_ms:>10.3f}{base_bytes / 1024:>10.1f}{'':>10}")
+        print(f"{'':<40}{'registry':<10}{cached_ms:>10.3f}{cached_bytes / 1024:>10.1f}"
+              f"{base_ms / max(cached_ms, 1e-9):>9.1f}x")
+    print(f"\n{'all tasks':<40}{'per-call':<10}{totals['per-call']:>10.3f}")
+    print(f"{'':<40}{'registry':<10}{totals['registry']:>10.3f}"
+          f"{totals['per-call'] / max(totals['registry'], 1e-9):>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.calls)
@@ -0,0 +1,104 @@
+"""
+Benchmark: throughput and latency of the LLM and scraping part of resume processing
+(analyze_resume_hedged from process_file, then analyze_social from the analysis job)
+over synthetic resumes, served from record/replay fixtures (app/ai/replay.py).
+
+Record once against the real Gemini, OpenAI and BrightData APIs, then replay offline
+as often as needed; the same --seed produces the same resumes and fixture keys.
+
+    python -m benchmarks.replay_benchmark --mode record --resumes 10
+    python -m benchmarks.replay_benchmark --mode replay --resumes 10 --concurrency 5 --latency-scale 0.5
+"""
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+from app.ai.analyzer import analyze_resume_hedged
+from app.ai.brightdata import brightdata_client
+from app.ai.gateway import llm_gateway
+from app.ai.llm_cache import llm_cache
+from app.ai.replay import replay_harness
+from app.ai.social_analyzer import analyze_social
+from app.ai.telemetry import resume_trace
+from benchmarks.extraction_benchmark import NAMES, SKILLS, _experience_lines
+
+VACANCY = {
+    "title": "Продавец-консультант",
+    "description": "Консультирование покупателей в магазине одежды, работа с кассой и выкладка товара.",
+    "requirements": "Опыт продаж от 1 года, знание 1С, русский и кыргызский языки.",
+    "skills": [{"title": "Опыт продаж"}, {"title": "1С"}, {"title": "Работа с кассой"}, {"title": "Кыргызский язык"}],
+}
+
+
+def make_resume(rng: random.Random, index: int) -> str:
+    lines = [rng.choice(NAMES), f"Бишкек • +996 555 {rng.randint(100000, 999999)} • cv{index}@gmail.com"]
+    if rng.random() < 0.7:
+        lines.append(f"Instagram: https://instagram.com/cv_bench_{index}")
+    lines += ["", "Опыт работы"] + _experience_lines(rng) + ["", "Навыки: " + ", ".join(rng.sample(SKILLS, 4))]
+    return "\n".join(lines)
+
+
+async def process(index: int, text: str) -> tuple[float, int, str | None]:
+    """(секунды, число LLM-вызовов, ошибка)"""
+    started = time.perf_counter()
+    error = None
+    with resume_trace("benchmark", resume_id=index) as trace:
+        try:
+            await analyze_resume_hedged(text, VACANCY["skills"], VACANCY["requirements"])
+            await analyze_social(text, VACANCY["title"], VACANCY["description"], VACANCY["requirements"], index,
+                                 profession="salesman")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - started, len(trace.calls), error
+
+
+async def run(mode: str, directory: str, resumes: int, concurrency: int, latency: str, latency_scale: float,
+              seed: int):
+    replay_harness.mode = mode
+    replay_harness.directory = Path(directory)
+    replay_harness.latency = latency
+    replay_harness.latency_scale = latency_scale
+    # Каждый прогон должен доходить до моделей, а не до кэша ответов
+    llm_cache.enabled = False
+
+    rng = random.Random(seed)
+    texts = [make_resume(rng, i) for i in range(resumes)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int, text: str):
+        async with semaphore:
+            return await process(index, text)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[bounded(i, text) for i, text in enumerate(texts)])
+    elapsed = time.perf_counter() - started
+    await llm_gateway.close()
+    await brightdata_client.close()
+
+    latencies = sorted(seconds for seconds, _, _ in results)
+    errors = [error for _, _, error in results if error]
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    llm_calls = sum(calls for _, calls, _ in results)
+    print(f"mode={mode} resumes={resumes} concurrency={concurrency} latency={latency} x{latency_scale}\n")
+    print(f"{'wall s':>8}{'resumes/min':>13}{'p50 s':>8}{'p95 s':>8}{'max s':>8}{'LLM calls':>11}{'errors':>8}")
+    print(f"{elapsed:>8.1f}{resumes / elapsed * 60:>13.1f}{pick(0.5):>8.2f}{pick(0.95):>8.2f}{latencies[-1]:>8.2f}"
+          f"{llm_calls:>11}{len(errors):>8}")
+    print(f"\nharness: {replay_harness.snapshot()}")
+    for error in errors[:5]:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--dir", default="fixtures/replay")
+    parser.add_argument("--resumes", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", default="recorded", help='"recorded" or a fixed delay in seconds')
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.mode, args.dir, args.resumes, args.concurrency, args.latency, args.latency_scale,
+                    args.seed))
@@ -0,0 +1,57 @@
+"""
+Benchmark: SELLER_INSTRUCTION metrics from app/ai/soft_skill_engine.py, scoring
+candidates one by one vs in a single score_batch call, over synthetic scraped
+social-media texts.
+
+    python -m benchmarks.soft_skill_benchmark --candidates 500
+"""
+import time
+import random
+import argparse
+
+from app.ai.soft_skill_engine import score_batch, score_text
+
+POSTS = [
+    "Спасибо всем клиентам за доверие 😊 Новая коллекция уже в магазине!",
+    "Сегодня запустили акцию, достигли плана продаж на 120% 🎉",
+    "- скидки до 30%\n- новый ассортимент\n1. пишите в директ @shop_kg",
+    "Опять пробки, ненавижу это!!! 😡",
+    "ахаха, клиент спросил, есть ли платье как у принцессы 😂",
+    "Thank you for the support ❤️ have a great day 🙂",
+    "Clearly explained the product to a customer, closed the deal today",
+    "Однажды я придумала идею для витрины, словно из сказки ✨",
+]
+
+
+def make_text(rng: random.Random) -> str:
+    posts = [rng.choice(POSTS) for _ in range(rng.randint(3, 40))]
+    return '"instagram": {"biography": "Продавец-консультант", "posts": ' + repr(posts) + "}"
+
+
+def run(candidates: int, seed: int):
+    rng = random.Random(seed)
+    texts = [make_text(rng) for _ in range(candidates)]
+    score_batch(texts[:10])
+
+    started = time.perf_counter()
+    one_by_one = [score_text(text) for text in texts]
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = score_batch(texts)
+    batched = time.perf_counter() - started
+
+    assert [p.levels for p in one_by_one] == [p.levels for p in batch]
+    tokens = sum(p.total_tokens for p in batch)
+    print(f"{candidates} candidates, {tokens} tokens\n")
+    print(f"{'mode':<12}{'total ms':>10}{'ms/candidate':>14}")
+    for mode, elapsed in (("one-by-one", single), ("batch", batched)):
+        print(f"{mode:<12}{elapsed * 1000:>10.1f}{elapsed / candidates * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.candidates, args.seed)
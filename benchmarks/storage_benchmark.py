@@ -0,0 +1,100 @@
+"""
+Benchmark: throughput of the storage gateway and of the upload + extraction ingest
+pipeline, on the local-disk backend by default so it runs without any cloud service.
+
+    python -m benchmarks.storage_benchmark --cvs 40 --concurrency 8
+    STORAGE_BACKEND=gcs python -m benchmarks.storage_benchmark --backend gcs
+"""
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+from app.services.storage import GCSStorageGateway, LocalStorageGateway
+from app.services.text_extraction import ExtractionPool
+from benchmarks.extraction_benchmark import make_cv, LAYOUTS
+
+
+async def _timed(coro_factories, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(factory):
+        async with semaphore:
+            return await factory()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[bounded(factory) for factory in coro_factories])
+    return time.perf_counter() - started
+
+
+async def run(backend: str, cvs: int, pages: int, concurrency: int, chunk_kb: int, seed: int):
+    rng = random.Random(seed)
+    corpus = [make_cv(rng, pages, LAYOUTS[i % len(LAYOUTS)]) for i in range(cvs)]
+    total_mb = sum(len(pdf) for pdf in corpus) / 1024 / 1024
+
+    tmp = None
+    if backend == "local":
+        tmp = tempfile.TemporaryDirectory(prefix="storage-bench-")
+        gateway = LocalStorageGateway(root=tmp.name, bucket_name="bench", pool_size=concurrency)
+    else:
+        gateway = GCSStorageGateway(pool_size=concurrency)
+    pool = ExtractionPool(workers=concurrency)
+    await gateway.start()
+    await pool.start()
+
+    prefix = f"benchmarks/{int(time.time())}-{rng.randint(0, 10**6)}"
+    names = [f"{prefix}/cv-{i}.pdf" for i, _ in enumerate(corpus)]
+    uris = [gateway.uri_for(name) for name in names]
+    chunk_size = chunk_kb * 1024
+
+    async def drain(uri: str):
+        async for _ in gateway.stream(uri, chunk_size=chunk_size):
+            pass
+
+    results = {}
+    try:
+        results["upload"] = await _timed(
+            [lambda n=n, pdf=pdf: gateway.upload(n, pdf, "application/pdf") for n, pdf in zip(names, corpus)],
+            concurrency)
+        results["download"] = await _timed([lambda u=u: gateway.download(u) for u in uris], concurrency)
+        results["stream"] = await _timed([lambda u=u: drain(u) for u in uris], concurrency)
+        await gateway.delete_many(uris)
+
+        # Ingest как в process_file: сначала загрузка, потом разбор — и то же самое параллельно
+        async def sequential(n, pdf):
+            await gateway.upload(n, pdf, "application/pdf")
+            await pool.extract(pdf, ".pdf")
+
+        async def pipelined(n, pdf):
+            await asyncio.gather(gateway.upload(n, pdf, "application/pdf"), pool.extract(pdf, ".pdf"))
+
+        results["ingest sequential"] = await _timed(
+            [lambda n=n, pdf=pdf: sequential(n, pdf) for n, pdf in zip(names, corpus)], concurrency)
+        await gateway.delete_many(uris)
+        results["ingest pipelined"] = await _timed(
+            [lambda n=n, pdf=pdf: pipelined(n, pdf) for n, pdf in zip(names, corpus)], concurrency)
+        await gateway.delete_many(uris)
+    finally:
+        pool.shutdown()
+        gateway.close()
+        if tmp is not None:
+            tmp.cleanup()
+
+    print(f"{cvs} synthetic CVs x {pages} pages ({total_mb:.2f} MB), backend {gateway.name}, "
+          f"concurrency {concurrency}, stream chunk {chunk_kb} KB\n")
+    print(f"{'stage':<20}{'total s':>10}{'files/s':>10}{'MB/s':>10}")
+    for stage, elapsed in results.items():
+        print(f"{stage:<20}{elapsed:>10.3f}{cvs / elapsed:>10.1f}{total_mb / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("local", "gcs"), default="local")
+    parser.add_argument("--cvs", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.backend, args.cvs, args.pages, args.concurrency, args.chunk_kb, args.seed))
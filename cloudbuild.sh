@@ -22,6 +22,7 @@ SMTP_PORT="${SMTP_PORT}"
 SMTP_USERNAME="${SMTP_USERNAME}"
 SMTP_PASSWORD="${SMTP_PASSWORD}" # Sensitive!
 OPENAI_API_KEY="${OPENAI_API_KEY}" # Sensitive!
+BRIGHTDATA_API_KEY="${BRIGHTDATA_API_KEY}" # Sensitive!
 DB_USER="${DB_USER}"
 DB_PASSWORD="${DB_PASSWORD}" # Sensitive!
 DB_NAME="${DB_NAME}"
@@ -47,6 +48,7 @@ missing_vars=()
 [ -z "$SMTP_USERNAME" ] && missing_vars+=("SMTP_USERNAME")
 [ -z "$SMTP_PASSWORD" ] && missing_vars+=("SMTP_PASSWORD")
 [ -z "$OPENAI_API_KEY" ] && missing_vars+=("OPENAI_API_KEY")
+[ -z "$BRIGHTDATA_API_KEY" ] && missing_vars+=("BRIGHTDATA_API_KEY")
 [ -z "$DB_USER" ] && missing_vars+=("DB_USER")
 [ -z "$DB_PASSWORD" ] && missing_vars+=("DB_PASSWORD")
 [ -z "$DB_NAME" ] && missing_vars+=("DB_NAME")
@@ -72,7 +74,7 @@ echo "[INFO] GCS Bucket Name: ${GCS_BUCKET_NAME}"
 echo "[INFO] SMTP Host: ${SMTP_HOST}"
 echo "[INFO] SMTP Port: ${SMTP_PORT}"
 echo "[INFO] SMTP Username: ${SMTP_USERNAME}"
-echo "[INFO] Sensitive Keys (API_KEY, GEMINI_API_KEY, SMTP_PASSWORD, OPENAI_API_KEY, DB_PASSWORD): [SET]"
+echo "[INFO] Sensitive Keys (API_KEY, GEMINI_API_KEY, SMTP_PASSWORD, OPENAI_API_KEY, BRIGHTDATA_API_KEY, DB_PASSWORD): [SET]"
 # echo "[INFO] Google App Credentials Path: ${GOOGLE_APPLICATION_CREDENTIALS:-[NOT SET]}" # Uncomment if needed
 
 # --- Build Step ---
@@ -102,6 +104,7 @@ ENV_VARS+=",SMTP_PORT=${SMTP_PORT}"
 ENV_VARS+=",SMTP_USERNAME=${SMTP_USERNAME}"
 ENV_VARS+=",SMTP_PASSWORD=${SMTP_PASSWORD}"
 ENV_VARS+=",OPENAI_API_KEY=${OPENAI_API_KEY}"
+ENV_VARS+=",BRIGHTDATA_API_KEY=${BRIGHTDATA_API_KEY}"
 ENV_VARS+=",DB_USER=${DB_USER}"
 ENV_VARS+=",DB_PASSWORD=${DB_PASSWORD}"
 ENV_VARS+=",DB_NAME=${DB_NAME}"
@@ -0,0 +1,114 @@
+import asyncio
+
+from app.ai import social_analyzer
+from app.ai.contact_extractor import extract_contacts, extract_social_links
+
+HEADER = """Асанов Бакыт Маратович
+Продавец-консультант
+г. Бишкек, мкр. Джал
+Тел.: +996 (555) 12-34-56, 0700 123 456
+E-mail: bakyt.asanov@gmail.com"""
+
+EXPERIENCE = """Опыт работы
+03.2018–05.2021
+ОсОО Глобус, продавец
+консультирование покупателей, выкладка товара
+2019-2021 старший продавец"""
+
+
+def test_phones_are_normalized_and_dates_are_not_phones():
+    result = extract_contacts(HEADER + "\n" + EXPERIENCE)
+    assert result.phones == ["+996555123456", "0700123456"]
+
+
+def test_russian_phone_with_dashes():
+    assert extract_contacts("Телефон: 8-912-345-67-89").phones == ["89123456789"]
+
+
+def test_single_free_mail_address_is_the_candidate():
+    result = extract_contacts(HEADER + "\n" + EXPERIENCE)
+    assert result.employee_email == "bakyt.asanov@gmail.com"
+    assert result.employer_emails == []
+    assert not result.ambiguous
+
+
+def test_obfuscated_email_is_normalized():
+    result = extract_contacts("Почта: aigul.t собака mail.ru")
+    assert result.employee_email == "aigul.t@mail.ru"
+    result = extract_contacts("Email: aigul [at] globus [dot] kg")
+    assert result.employee_email == "aigul@globus.kg"
+
+
+def test_worked_at_domain_is_not_an_email():
+    assert extract_contacts("Worked at globus.kg as a cashier").employee_email is None
+
+
+def test_employer_domain_outside_header_goes_to_employers():
+    text = HEADER + "\n" + EXPERIENCE + "\nРекомендации: директор ОсОО Глобус, a.ivanov@globus.kg"
+    result = extract_contacts(text)
+    assert result.employee_email == "bakyt.asanov@gmail.com"
+    assert result.employer_emails == ["a.ivanov@globus.kg"]
+    assert not result.ambiguous
+
+
+def test_role_address_is_an_employer_even_in_header():
+    result = extract_contacts("Асанов Бакыт\nhr@narodnyi.kg\nbakyt@mail.ru")
+    assert result.employee_email == "bakyt@mail.ru"
+    assert result.employer_emails == ["hr@narodnyi.kg"]
+
+
+def test_second_free_mail_address_is_ambiguous():
+    # Второй личный адрес вне шапки: запасной адрес кандидата или рекомендатель — решает модель
+    text = HEADER + "\n" + EXPERIENCE + "\n\n\n\n\n\n\nДоп. контакт: nurlan.k@mail.ru"
+    result = extract_contacts(text)
+    assert result.employee_email == "bakyt.asanov@gmail.com"
+    assert result.ambiguous
+
+
+def test_several_addresses_outside_header_are_ambiguous():
+    text = "\n" * 15 + "Контакты: aibek@gmail.com, aibek.work@mail.ru"
+    result = extract_contacts(text)
+    assert result.employee_email is None
+    assert result.ambiguous
+
+
+def test_profile_urls_without_scheme_and_handles():
+    text = """LinkedIn: www.linkedin.com/in/bakyt-asanov/
+Instagram: @bakyt.shop
+Twitter — @bakyt_kg
+facebook.com/profile.php?id=100012345"""
+    assert extract_social_links(text) == {
+        "linkedin": "https://linkedin.com/in/bakyt-asanov",
+        "instagram": "https://instagram.com/bakyt.shop",
+        "x": "https://x.com/bakyt_kg",
+        "facebook": "https://facebook.com/profile.php?id=100012345",
+    }
+
+
+def test_service_paths_are_not_profiles():
+    links = extract_social_links("https://instagram.com/p/CxYz123 https://facebook.com/sharer.php?u=1 fox.com/news")
+    assert links == {}
+
+
+def test_mentioned_platform_without_link_is_unresolved():
+    result = extract_contacts("Веду страницу в инстаграме магазина, фейсбук — по запросу")
+    assert result.social_links == {}
+    assert result.unresolved_social
+
+
+def test_ambiguous_emails_fall_back_to_the_model(monkeypatch):
+    calls = []
+
+    async def fake_ai(text):
+        calls.append(text)
+        return {"employee_email": "aibek@gmail.com", "employer_emails": [], "social_links": {}}
+
+    monkeypatch.setattr(social_analyzer, "extract_contacts_ai", fake_ai)
+    clear = asyncio.run(social_analyzer.extract_emails_from_resume(HEADER))
+    assert clear == {"employee_email": "bakyt.asanov@gmail.com", "employer_emails": []}
+    assert calls == []
+
+    text = "\n" * 15 + "Контакты: aibek@gmail.com, aibek.work@mail.ru"
+    result = asyncio.run(social_analyzer.extract_emails_from_resume(text))
+    assert result == {"employee_email": "aibek@gmail.com", "employer_emails": []}
+    assert calls == [text]
@@ -0,0 +1,46 @@
+from app.ai.hard_skill_scorer import HardSkillScore, SkillScore, extract_indicators
+
+ADJACENT_JOBS = """Опыт работы
+03.2018–05.2021
+ОсОО Глобус, менеджер по продажам
+консультирование клиентов, выполнение плана
+06.2021–по настоящее время
+Кафе Нават, официант
+обслуживание гостей"""
+
+
+def test_adjacent_jobs_count_toward_their_own_category():
+    result = extract_indicators(ADJACENT_JOBS)
+    assert result.sales_years == 3.2
+    assert result.service_years < result.total_years
+    assert result.service_years >= 5.0
+
+
+def test_experience_followed_by_education_keeps_last_job():
+    plain = extract_indicators(ADJACENT_JOBS)
+    result = extract_indicators(ADJACENT_JOBS + "\nОбразование\nКГТУ, 2010–2014\nэкономист")
+    assert result.sales_years == plain.sales_years
+    assert result.service_years == plain.service_years
+    # Годы учёбы в стаж не входят
+    assert result.total_years == plain.total_years
+
+
+def test_several_jobs_on_one_line():
+    result = extract_indicators("Продавец — Глобус, 2015–2017; Кассир — Народный, 2018–2020")
+    assert result.sales_years == 2.0
+    assert result.service_years == 2.0
+    result = extract_indicators("2015–2017 продавец; 2018–2020 кассир")
+    assert result.sales_years == 2.0
+    assert result.service_years == 2.0
+
+
+def test_skill_missed_by_model_is_shown_with_zero_level():
+    score = HardSkillScore(
+        skills=[SkillScore("Опыт продаж", "sales", level=80, confident=True),
+                SkillScore("Знание кассы", None), SkillScore("Английский язык", None)],
+        multiplier=1.0, seniority_note="",
+    )
+    merged = score.merge({"skills": [{"title": "Знание кассы", "level": 70, "justification": "кассир"}]})
+    levels = {skill["title"]: skill["level"] for skill in merged["skills"]}
+    assert levels == {"Опыт продаж": 80, "Знание кассы": 70, "Английский язык": 0}
+    assert merged["hard_total"]["total"] == round(sum(levels.values()) / len(levels))
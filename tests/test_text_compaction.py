@@ -0,0 +1,31 @@
+from app.services.text_compaction import (
+    compact_resume_text, truncate_for_prompt, PAGE_BREAK, RESUME_MAX_CHARS, TRUNCATION_MARKER,
+)
+
+HEADER = "Иванов Иван — резюме продавца-консультанта"
+DUTY = "Консультирование покупателей и выкладка товара в зале"
+
+FIRST_PAGE = "\n".join([HEADER, "Опыт работы", "ОсОО Альфа, продавец", DUTY, "ОсОО Бета, продавец", DUTY,
+                        "Стр. 1 из 2"])
+SECOND_PAGE = "\n".join([HEADER, "Образование", "КГТУ, 2010–2014", "Стр. 2 из 2"])
+
+
+def test_repeated_page_header_is_kept_once():
+    text = compact_resume_text(FIRST_PAGE + PAGE_BREAK + SECOND_PAGE).text
+    assert text.count(HEADER) == 1
+    assert "Стр." not in text
+    assert "КГТУ, 2010–2014" in text
+
+
+def test_repeated_body_lines_are_kept():
+    text = compact_resume_text(FIRST_PAGE + PAGE_BREAK + SECOND_PAGE).text
+    assert text.count(DUTY) == 2
+
+
+def test_stored_text_is_not_truncated():
+    body = "\n".join(f"ОсОО Компания {i}, продавец-консультант, 2015–2016" for i in range(400))
+    text = compact_resume_text(body + "\nemail: ivan@gmail.com").text
+    assert text.endswith("ivan@gmail.com")
+    prompt = truncate_for_prompt(text)
+    assert len(prompt) <= RESUME_MAX_CHARS + len(TRUNCATION_MARKER) + 1
+    assert prompt.endswith(TRUNCATION_MARKER)